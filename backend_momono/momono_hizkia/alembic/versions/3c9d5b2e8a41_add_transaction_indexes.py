@@ -0,0 +1,82 @@
+"""Add transaction indexes and typed simple_transactions date
+
+Revision ID: 3c9d5b2e8a41
+Revises: f65f233ef164
+Create Date: 2025-06-14 10:12:37.201844
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9d5b2e8a41'
+down_revision: Union[str, None] = 'f65f233ef164'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (name, table, columns); the simple_* indexes match momono_hizkia.schema.SIMPLE_INDEXES
+TRANSACTION_INDEXES = [
+    ('ix_transactions_user_id_date_id', 'transactions', ['user_id', sa.text('date DESC'), sa.text('id DESC')]),
+    ('ix_transactions_user_id_category_id', 'transactions', ['user_id', 'category_id']),
+]
+SIMPLE_INDEXES = [
+    ('ix_simple_transactions_user_id_created_at_id', 'simple_transactions',
+     ['user_id', sa.text('created_at DESC'), sa.text('id DESC')]),
+    ('ix_simple_transactions_user_id_category', 'simple_transactions', ['user_id', 'category']),
+    ('ix_simple_transactions_budget_id', 'simple_transactions', ['budget_id']),
+    ('ix_simple_budgets_user_id', 'simple_budgets', ['user_id']),
+]
+
+
+def _indexes(tables):
+    # simple_* tables are created by the app's schema manager, not by Alembic
+    return TRANSACTION_INDEXES + [index for index in SIMPLE_INDEXES if index[1] in tables]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'simple_transactions' in tables and op.get_bind().dialect.name == 'postgresql':
+        # ISO text -> DATE so ranges and sorting use a typed, compact key
+        op.alter_column(
+            'simple_transactions', 'created_at',
+            type_=sa.Date(),
+            existing_type=sa.Text(),
+            existing_nullable=False,
+            postgresql_using='created_at::date',
+        )
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in _indexes(tables):
+            op.create_index(
+                name, table, columns,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(_indexes(tables)):
+            op.drop_index(
+                name, table_name=table,
+                if_exists=True,
+                postgresql_concurrently=True,
+            )
+
+    if 'simple_transactions' in tables and op.get_bind().dialect.name == 'postgresql':
+        op.alter_column(
+            'simple_transactions', 'created_at',
+            type_=sa.Text(),
+            existing_type=sa.Date(),
+            existing_nullable=False,
+            postgresql_using="to_char(created_at, 'YYYY-MM-DD')",
+        )
@@ -9,11 +9,21 @@ from zope.sqlalchemy import register
 import logging
 import os
 from dotenv import load_dotenv
-from .models.meta import Base, get_engine, get_session_factory
-from .security.security import JWTAuthenticationPolicy
+from .security.security import (
+    DEFAULT_ROLES,
+    DEFAULT_TOKEN_CACHE_SIZE,
+    DEFAULT_TOKEN_CACHE_TTL,
+    DEFAULT_TOKEN_VERSION_TTL,
+    JWTAuthenticationPolicy,
+    TokenCache,
+    TokenVersions,
+    role_permissions,
+)
 from .cors import cors_tween_factory
 from .models import User
 from .resources import RootFactory
+from .schema import schema_manager
+from .repository import detached_repository, get_storage
 
 # Konfigurasi logging
 logger = logging.getLogger('momono')
@@ -28,10 +38,6 @@ def main(global_config, **settings):
     try:
         logger.info('Starting MOMONO backend application')
         
-        # Database setup
-        engine = get_engine(settings)
-        Base.metadata.bind = engine
-        
         # Session factory
         session_factory = SignedCookieSessionFactory(
             SESSION_SECRET,
@@ -46,9 +52,27 @@ def main(global_config, **settings):
             root_factory=RootFactory
         )
         
+        # Token versions are read from the primary (auth:<user> scope) on a
+        # connection of their own: request.repo needs the authenticated user
+        # to pick its replica and write scopes, which needs this check
+        def load_token_version(request, user_id):
+            with detached_repository(request, primary=True) as repo:
+                return repo.token_version(user_id)
+
+        token_versions = TokenVersions(
+            load=load_token_version,
+            ttl=float(settings.get('jwt.version_check_seconds', DEFAULT_TOKEN_VERSION_TTL))
+        )
+        config.registry['momono.token_versions'] = token_versions
+        
         # Set authentication policy
         authn_policy = JWTAuthenticationPolicy(
-            secret=settings.get('jwt.secret', 'godblessyou')
+            secret=settings.get('jwt.secret', 'godblessyou'),
+            token_cache=TokenCache(
+                max_entries=int(settings.get('jwt.cache_max_entries', DEFAULT_TOKEN_CACHE_SIZE)),
+                ttl=float(settings.get('jwt.cache_ttl_seconds', DEFAULT_TOKEN_CACHE_TTL))
+            ),
+            token_versions=token_versions
         )
         config.set_authentication_policy(authn_policy)
         
@@ -81,10 +105,16 @@ def main(global_config, **settings):
         
         # Override effective_principals untuk menentukan permission berdasarkan role
         def get_user_permissions(request):
-            """Get user permissions."""
+            """Get user permissions, resolved once per request."""
+            permissions = getattr(request, '_momono_principals', None)
+            if permissions is None:
+                permissions = request._momono_principals = resolve_user_permissions(request)
+            return permissions
+        
+        def resolve_user_permissions(request):
             try:
                 # Always include public_access permission for everyone
-                base_permissions = ['public_access', 'NO_PERMISSION_REQUIRED']
+                base_permissions = [Everyone, 'public_access', 'NO_PERMISSION_REQUIRED']
                 
                 user_id = request.authenticated_userid
                 logger.info(f"User ID: {user_id}")
@@ -92,25 +122,19 @@ def main(global_config, **settings):
                 if not user_id:
                     logger.info("No user ID found")
                     return base_permissions
+                
+                # Roles are signed into the token, so the user is not loaded
+                roles = authn_policy.claims(request).get('roles')
+                if roles is None:
+                    # Tokens issued before roles were embedded
+                    user = request.dbsession.query(User).filter_by(id=user_id).first()
+                    if not user:
+                        logger.info(f"User with ID {user_id} not found")
+                        return base_permissions
+                    roles = DEFAULT_ROLES
                     
-                user = request.dbsession.query(User).filter_by(id=user_id).first()
-                if not user:
-                    logger.info(f"User with ID {user_id} not found")
-                    return base_permissions
-                    
-                # Set permission untuk semua user
-                permissions = [
-                    'authenticated',
-                    'user',
-                    'view_dashboard',
-                    'manage_budgets',
-                    'view',
-                    'create',
-                    'edit',
-                    'delete',
-                    'manage_users',
-                    'manage_settings'
-                ]
+                # Set permission berdasarkan role
+                permissions = [Authenticated] + role_permissions(roles)
                 
                 # Add base permissions to authenticated user permissions
                 permissions.extend(base_permissions)
@@ -127,12 +151,28 @@ def main(global_config, **settings):
         # CORS setup
         config.add_tween('momono_hizkia.cors.cors_tween_factory')
         
-        # Static files and templates
-        config.add_static_view('static', 'static', cache_max_age=3600)
+        # Compression tween, static files and templates
+        config.include('.compression')
         config.include('pyramid_jinja2')
+        config.include('.renderers')
         
         # Routes and models
+        config.include('.security.passwords')
+        config.include('.sqlite_pool')
         config.include('.models')
+        config.include('.repository')
+        config.include('.cache')
+        config.include('.ratelimit')
+        
+        # Repository tables are checked and migrated once per process
+        storage, sqlite_path = get_storage(settings)
+        if storage == 'postgresql':
+            schema_manager.ensure_engine(config.registry['dbengine'])
+        else:
+            schema_manager.ensure(sqlite_path)
+            router = config.registry['momono.replica_router']
+            for replica_path in (router.replicas if router else []):
+                schema_manager.ensure(replica_path)
         config.include('.routes')
         
         # Scan views
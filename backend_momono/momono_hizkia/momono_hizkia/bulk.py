@@ -0,0 +1,215 @@
+import csv
+import io
+import json
+import math
+from datetime import datetime
+
+from .filters import TRANSACTION_TYPES, UNCATEGORIZED, parse_transaction_filters
+
+# Constants
+DEFAULT_BULK_CHUNK_SIZE = 1000
+DEFAULT_BULK_MAX_ROWS = 50000
+CSV_TYPES = ('text/csv', 'application/csv')
+# Largest id list for bulk update/delete; keeps the IN list under SQLite's variable limit
+MAX_BULK_IDS = 10000
+
+# Columns a bulk update may set
+TRANSACTION_BULK_FIELDS = ('category', 'type', 'description', 'budget_id')
+BUDGET_BULK_FIELDS = ('name', 'description', 'category', 'amount')
+
+
+def bulk_settings(settings):
+    """Return ``(chunk_size, max_rows)`` from the ``momono.bulk_*`` settings."""
+    return (
+        int(settings.get('momono.bulk_chunk_size', DEFAULT_BULK_CHUNK_SIZE)),
+        int(settings.get('momono.bulk_max_rows', DEFAULT_BULK_MAX_ROWS)),
+    )
+
+
+def read_bulk_rows(request):
+    """Return the raw rows of a bulk request as a list of dicts.
+
+    Accepts a JSON array (or ``{"transactions": [...]}``), a ``text/csv``
+    body, or a multipart upload with the CSV in a ``file`` field. CSV files
+    need a header row naming the columns.
+
+    Raises ``ValueError`` when the payload cannot be read.
+    """
+    upload = request.POST.get('file') if request.content_type == 'multipart/form-data' else None
+    if upload is not None and hasattr(upload, 'file'):
+        return _read_csv(io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline=''))
+    if request.content_type in CSV_TYPES:
+        return _read_csv(io.StringIO(request.body.decode('utf-8-sig'), newline=''))
+
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        raise ValueError('Body must be a JSON array or a CSV file')
+    if isinstance(payload, dict):
+        payload = payload.get('transactions')
+    if not isinstance(payload, list):
+        raise ValueError('Body must be a JSON array or a CSV file')
+    return payload
+
+
+def _read_csv(stream):
+    reader = csv.DictReader(stream)
+    if not reader.fieldnames or 'amount' not in reader.fieldnames:
+        raise ValueError('CSV header must include an amount column')
+    return list(reader)
+
+
+def _text(value, name, default=''):
+    """Return ``value`` if it is a string, ``default`` if it is missing or empty."""
+    if value is None or value == '':
+        return default
+    if not isinstance(value, str):
+        raise ValueError(f'{name} must be a string')
+    return value
+
+
+def clean_bulk_row(raw, budget_ids, default_budget_id, today):
+    """Validate one raw row and return the values to insert.
+
+    Raises ``ValueError`` with a message for the client when the row is
+    unusable. Missing optional values get the same defaults as the single
+    transaction endpoint.
+    """
+    if not isinstance(raw, dict):
+        raise ValueError('row must be an object')
+
+    if raw.get('amount') in (None, ''):
+        raise ValueError('amount is required')
+    try:
+        amount = float(raw['amount'])
+    except (TypeError, ValueError):
+        raise ValueError('amount must be a number')
+    if not math.isfinite(amount):
+        raise ValueError('amount must be a number')
+
+    created_at = raw.get('date') or raw.get('created_at')
+    if created_at:
+        try:
+            created_at = datetime.strptime(str(created_at), '%Y-%m-%d').strftime('%Y-%m-%d')
+        except ValueError:
+            raise ValueError('date must be in YYYY-MM-DD format')
+    else:
+        created_at = today
+
+    transaction_type = raw.get('type') or 'expense'
+    if transaction_type not in TRANSACTION_TYPES:
+        raise ValueError('type must be income or expense')
+
+    budget_id = raw.get('budget_id')
+    if budget_id in (None, ''):
+        budget_id = default_budget_id
+    else:
+        try:
+            budget_id = int(budget_id)
+        except (TypeError, ValueError):
+            raise ValueError('budget_id must be an integer')
+        if budget_id not in budget_ids:
+            raise ValueError(f'budget {budget_id} not found')
+
+    return {
+        'amount': amount,
+        'description': _text(raw.get('description'), 'description'),
+        'created_at': created_at,
+        'category': _text(raw.get('category'), 'category', UNCATEGORIZED),
+        'type': transaction_type,
+        'budget_id': budget_id,
+    }
+
+
+def parse_bulk_selection(data):
+    """Return ``(ids, filter)`` from a bulk update/delete body.
+
+    The body names the rows with ``ids`` (a list), a ``filter`` object, or
+    both. Raises ``ValueError`` when neither is usable.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Body must be a JSON object')
+    ids = data.get('ids')
+    selection = data.get('filter') or {}
+    if not isinstance(selection, dict):
+        raise ValueError('filter must be an object')
+    if ids is not None:
+        if not isinstance(ids, list) or not ids:
+            raise ValueError('ids must be a non-empty list')
+        if len(ids) > MAX_BULK_IDS:
+            raise ValueError(f'At most {MAX_BULK_IDS} ids per request')
+        try:
+            ids = [int(value) for value in ids]
+        except (TypeError, ValueError):
+            raise ValueError('ids must be integers')
+    return ids, selection
+
+
+def parse_transaction_selection(data):
+    """Return ``(ids, filters)`` for a bulk transaction operation.
+
+    ``filter`` takes the listing parameters (``from``, ``to``, ``category``,
+    ``type``, ``min_amount``, ``max_amount``).
+    """
+    ids, selection = parse_bulk_selection(data)
+    filters = parse_transaction_filters(selection)
+    filters.pop('sort')
+    if ids is None and not filters:
+        raise ValueError('ids or filter is required')
+    return ids, filters
+
+
+def parse_budget_selection(data):
+    """Return ``(ids, category)`` for a bulk budget operation."""
+    ids, selection = parse_bulk_selection(data)
+    category = _text(selection.get('category'), 'category', None)
+    if ids is None and not category:
+        raise ValueError('ids or filter is required')
+    return ids, category
+
+
+def _changes(data, allowed):
+    changes = data.get('set') if isinstance(data, dict) else None
+    if not isinstance(changes, dict) or not changes:
+        raise ValueError('set must be a non-empty object')
+    unknown = set(changes) - set(allowed)
+    if unknown:
+        raise ValueError(f"set may only contain {', '.join(allowed)}")
+    return dict(changes)
+
+
+def _check_text_changes(changes, fields):
+    # null clears a column; anything but a string would reach the SQL parameters
+    for field in fields:
+        if changes.get(field) is not None and not isinstance(changes[field], str):
+            raise ValueError(f'{field} must be a string')
+
+
+def clean_transaction_changes(data):
+    """Return the validated ``set`` object of a bulk transaction update."""
+    changes = _changes(data, TRANSACTION_BULK_FIELDS)
+    _check_text_changes(changes, ('category', 'description'))
+    if 'type' in changes and changes['type'] not in TRANSACTION_TYPES:
+        raise ValueError('type must be income or expense')
+    if changes.get('budget_id') is not None:
+        try:
+            changes['budget_id'] = int(changes['budget_id'])
+        except (TypeError, ValueError):
+            raise ValueError('budget_id must be an integer')
+    return changes
+
+
+def clean_budget_changes(data):
+    """Return the validated ``set`` object of a bulk budget update."""
+    changes = _changes(data, BUDGET_BULK_FIELDS)
+    _check_text_changes(changes, ('name', 'description', 'category'))
+    if 'amount' in changes:
+        try:
+            changes['amount'] = float(changes['amount'])
+        except (TypeError, ValueError):
+            raise ValueError('amount must be a number')
+        if not math.isfinite(changes['amount']) or changes['amount'] <= 0:
+            raise ValueError('amount must be positive')
+    if 'name' in changes and not changes['name']:
+        raise ValueError('name must not be empty')
+    return changes
@@ -0,0 +1,203 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from pyramid.events import NewRequest
+from pyramid.response import Response
+from pyramid.settings import asbool
+
+from .repository import BUDGET_ROUTES, SAFE_METHODS, SHARED_ROUTES, request_user_key
+
+# Konfigurasi logging
+logger = logging.getLogger('momono.cache')
+logger.setLevel(logging.INFO)
+
+# Constants
+DEFAULT_CACHE_MAX_ENTRIES = 2000
+DEFAULT_CACHE_TTL_SECONDS = 30
+DEFAULT_CACHE_MAX_BODY_BYTES = 256 * 1024
+
+
+class _CachedResponse:
+    """The parts of a rendered response needed to serve it again."""
+
+    __slots__ = ('status', 'headerlist', 'body', 'version', 'expires')
+
+    def __init__(self, response, version, expires):
+        self.status = response.status
+        self.headerlist = [
+            (name, value) for name, value in response.headerlist if name.lower() != 'set-cookie'
+        ]
+        self.body = response.body
+        self.version = version
+        self.expires = expires
+
+    def to_response(self):
+        return Response(status=self.status, headerlist=list(self.headerlist), body=self.body)
+
+
+class ResponseCache:
+    """Bounded LRU + TTL cache of rendered GET responses.
+
+    Entries are keyed by ``(user, route, params)`` and remember the user's
+    data version when they were stored. A write bumps the version, so the
+    user's older entries are ignored (and dropped) on their next lookup
+    instead of having to be found and deleted. Entries of ``BUDGET_ROUTES``
+    also remember the budgets version, which any write changing a budget's
+    ``spent`` total bumps.
+    """
+
+    def __init__(self, max_entries=DEFAULT_CACHE_MAX_ENTRIES, ttl=DEFAULT_CACHE_TTL_SECONDS,
+                 max_body_bytes=DEFAULT_CACHE_MAX_BODY_BYTES):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_body_bytes = max_body_bytes
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._shared_version = 0
+        self._budgets_version = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def version(self, user_key, budgets=False):
+        if budgets:
+            return self._versions.get(user_key, 0), self._shared_version, self._budgets_version
+        return self._versions.get(user_key, 0), self._shared_version
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.version != version:
+                del self._entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            if entry.expires <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, version, response):
+        if len(response.body) > self.max_body_bytes:
+            return
+        entry = _CachedResponse(response, version, time.monotonic() + self.ttl)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def bump(self, user_key, shared=False, budgets=False):
+        """Invalidate everything cached for ``user_key``.
+
+        ``shared`` also invalidates everyone's entries, ``budgets`` everyone's
+        entries of ``BUDGET_ROUTES``.
+        """
+        with self._lock:
+            self._versions[user_key] = self._versions.get(user_key, 0) + 1
+            if shared:
+                self._shared_version += 1
+            if budgets:
+                self._budgets_version += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+            }
+
+
+def get_response_cache(registry):
+    return registry.get('momono.response_cache')
+
+
+def cached_view(view):
+    """View decorator that serves repeated GETs from the response cache.
+
+    Use it as ``@view_config(..., decorator=cached_view)``. Only complete
+    200 responses are stored; streamed bodies always go to the view.
+    """
+    def wrapper(context, request):
+        cache = get_response_cache(request.registry)
+        if cache is None or request.method not in SAFE_METHODS:
+            return view(context, request)
+
+        user_key = request_user_key(request)
+        matched_route = getattr(request, 'matched_route', None)
+        route = matched_route.name if matched_route else request.path_info
+        key = (user_key, route, tuple(sorted(request.params.items())), request.headers.get('Accept'))
+        version = cache.version(user_key, budgets=route in BUDGET_ROUTES)
+        entry = cache.get(key, version)
+        if entry is not None:
+            return entry.to_response()
+
+        response = view(context, request)
+        if response.status_code == 200 and isinstance(response.app_iter, list):
+            cache.set(key, version, response)
+        return response
+
+    return wrapper
+
+
+def invalidate_for_request(request):
+    """Bump the data version of the user making an unsafe ``request``."""
+    cache = get_response_cache(request.registry)
+    if cache is None or request.method in SAFE_METHODS:
+        return
+    matched_route = getattr(request, 'matched_route', None)
+    shared = matched_route is not None and matched_route.name in SHARED_ROUTES
+    # Only look at a repository the request already has; reading request.repo
+    # here would open a connection for nothing
+    repo = request.__dict__.get('repo')
+    budgets = repo is not None and repo.budgets_changed
+    cache.bump(request_user_key(request), shared=shared, budgets=budgets)
+
+
+def _watch_writes(event):
+    # Finished callbacks run after pyramid_tm has committed, so a bumped
+    # version never lets a reader cache data from before the write
+    if event.request.method not in SAFE_METHODS:
+        event.request.add_finished_callback(invalidate_for_request)
+
+
+def includeme(config):
+    """Set up the response cache from the ``momono.cache_*`` settings.
+
+    Activate this setup using ``config.include('.cache')``.
+    """
+    settings = config.get_settings()
+    if not asbool(settings.get('momono.cache_enabled', True)):
+        config.registry['momono.response_cache'] = None
+        logger.info('Response cache disabled')
+        return
+    cache = ResponseCache(
+        max_entries=int(settings.get('momono.cache_max_entries', DEFAULT_CACHE_MAX_ENTRIES)),
+        ttl=float(settings.get('momono.cache_ttl_seconds', DEFAULT_CACHE_TTL_SECONDS)),
+        max_body_bytes=int(settings.get('momono.cache_max_body_bytes', DEFAULT_CACHE_MAX_BODY_BYTES)),
+    )
+    config.registry['momono.response_cache'] = cache
+    config.add_subscriber(_watch_writes, NewRequest)
+    logger.info(f'Response cache: {cache.max_entries} entries, {cache.ttl}s TTL')
@@ -0,0 +1,140 @@
+import gzip
+import logging
+import re
+
+from pyramid.events import NewResponse
+from pyramid.settings import asbool
+from pyramid.tweens import INGRESS
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Konfigurasi logging
+logger = logging.getLogger('momono.compression')
+logger.setLevel(logging.INFO)
+
+# Constants
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_BROTLI_QUALITY = 4
+DEFAULT_STATIC_MAX_AGE = 3600
+IMMUTABLE_MAX_AGE = 31536000
+
+COMPRESSIBLE_TYPES = (
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'text/csv',
+    'text/css',
+    'text/html',
+    'text/plain',
+)
+
+# Build tools put a content hash in the file name, e.g. app.3f9a2b1c.js
+HASHED_ASSET = re.compile(r'\.[0-9a-f]{8,}\.[A-Za-z0-9]+$')
+
+
+def available_encodings():
+    """Return the content codings this process can produce, preferred first."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress(body, encoding, gzip_level=DEFAULT_GZIP_LEVEL, brotli_quality=DEFAULT_BROTLI_QUALITY):
+    if encoding == 'br':
+        return brotli.compress(body, quality=brotli_quality)
+    # mtime=0 keeps the output identical for identical bodies
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+def _add_vary(response, header):
+    vary = tuple(response.vary or ())
+    if header not in vary:
+        response.vary = vary + (header,)
+
+
+def compression_tween_factory(handler, registry):
+    """Compress JSON and text responses the client accepts in gzip or brotli.
+
+    Only complete bodies of at least ``compression.min_size`` bytes are
+    compressed; streamed bodies (NDJSON listings, CSV exports) and files
+    served through ``wsgi.file_wrapper`` are passed through unchanged.
+    """
+    settings = registry.settings
+    if not asbool(settings.get('compression.enabled', True)):
+        return handler
+    min_size = int(settings.get('compression.min_size', DEFAULT_MIN_SIZE))
+    gzip_level = int(settings.get('compression.gzip_level', DEFAULT_GZIP_LEVEL))
+    brotli_quality = int(settings.get('compression.brotli_quality', DEFAULT_BROTLI_QUALITY))
+    encodings = available_encodings()
+
+    def compression_tween(request):
+        response = handler(request)
+        if response.content_type not in COMPRESSIBLE_TYPES or response.content_encoding:
+            return response
+        _add_vary(response, 'Accept-Encoding')
+        if (
+            request.method == 'HEAD'
+            or response.status_code in (204, 304)
+            or not isinstance(response.app_iter, list)
+            or 'Accept-Encoding' not in request.headers
+        ):
+            return response
+
+        body = response.body
+        if len(body) < min_size:
+            return response
+        offers = request.accept_encoding.acceptable_offers(encodings)
+        if not offers:
+            return response
+
+        encoding = offers[0][0]
+        response.body = compress(body, encoding, gzip_level, brotli_quality)
+        response.content_encoding = encoding
+        return response
+
+    return compression_tween
+
+
+def _cache_hashed_assets(event):
+    request, response = event.request, event.response
+    prefix = request.registry.get('momono.static_prefix')
+    if (
+        prefix
+        and response.status_code == 200
+        and request.path_info.startswith(prefix)
+        and HASHED_ASSET.search(request.path_info)
+    ):
+        # A hashed name changes whenever the content does, so it never goes stale
+        response.cache_control = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+
+
+def add_static_assets(config, name, path):
+    """Serve ``path`` at ``/name`` with precompressed siblings and long caching.
+
+    ``file.css.br`` / ``file.css.gz`` next to ``file.css`` (see the
+    ``precompress_momono_static`` script) are sent when the client accepts
+    that coding. Files with a content hash in their name are marked
+    immutable for a year; the rest use ``static.cache_max_age``.
+    """
+    settings = config.get_settings()
+    config.add_static_view(
+        name,
+        path,
+        cache_max_age=int(settings.get('static.cache_max_age', DEFAULT_STATIC_MAX_AGE)),
+        # Precompressed files need no encoder at runtime, so br is always offered
+        content_encodings=['br', 'gzip'],
+    )
+    config.registry['momono.static_prefix'] = f'/{name}/'
+    config.add_subscriber(_cache_hashed_assets, NewResponse)
+
+
+def includeme(config):
+    """Add the compression tween and the ``/static`` assets.
+
+    Activate this setup using ``config.include('.compression')``.
+    """
+    config.add_tween('momono_hizkia.compression.compression_tween_factory', under=INGRESS)
+    add_static_assets(config, 'static', 'momono_hizkia:static')
+    logger.info(f"Response compression: {', '.join(available_encodings())}")
@@ -0,0 +1,67 @@
+import logging
+
+from pyramid.httpexceptions import HTTPNotModified
+
+from .repository import SAFE_METHODS, request_read_scopes, request_user_key
+
+# Konfigurasi logging
+logger = logging.getLogger('momono.conditional')
+logger.setLevel(logging.INFO)
+
+# Representations differ per user and per Accept (JSON vs NDJSON)
+VARY = ('Authorization', 'Accept')
+
+
+def data_etag(request):
+    """Return the entity tag for the requesting user's current data.
+
+    It is built from the user's and the shared data versions (plus the
+    budgets version on routes showing other users' budgets), which every
+    committed write bumps, so computing it is one primary-key lookup and
+    never touches the response body. The user is part of the tag so a
+    client switching accounts cannot get a 304 for the other user's data.
+    """
+    scopes = request_read_scopes(request)
+    versions = request.repo.data_versions(scopes)
+    return f'u{request_user_key(request)}-' + '-'.join(str(versions[scope]) for scope in scopes)
+
+
+def etag_view(view):
+    """View decorator answering ``If-None-Match`` with ``304 Not Modified``.
+
+    Use it as the outermost decorator, e.g.
+    ``@view_config(..., decorator=(etag_view, cached_view))``, so unchanged
+    polls return before the view, the cache or the serializer run. The tag
+    is weak because the body may be re-encoded on the way out.
+    """
+    return _etag_wrapper(view)
+
+
+def etag_view_with(validator):
+    """Return an ``etag_view`` whose tag also includes ``validator(request)``.
+
+    For views over data written outside the app, which no data version
+    covers, like the notifications listing.
+    """
+    return lambda view: _etag_wrapper(view, validator)
+
+
+def _etag_wrapper(view, validator=None):
+    def wrapper(context, request):
+        if request.method not in SAFE_METHODS:
+            return view(context, request)
+
+        etag = data_etag(request)
+        if validator is not None:
+            etag = f'{etag}-{validator(request)}'
+        if etag in request.if_none_match:
+            response = HTTPNotModified()
+        else:
+            response = view(context, request)
+            if response.status_code != 200:
+                return response
+        response.headers['ETag'] = f'W/"{etag}"'
+        response.vary = VARY
+        return response
+
+    return wrapper
@@ -0,0 +1,199 @@
+import csv
+import io
+import logging
+import re
+import tempfile
+import zipfile
+from xml.sax.saxutils import escape
+
+from pyramid.response import FileIter, Response
+
+from .repository import detached_repository
+
+# Konfigurasi logging
+logger = logging.getLogger('momono.export')
+logger.setLevel(logging.INFO)
+
+# Constants
+EXPORT_FORMATS = ('csv', 'xlsx')
+EXPORT_COLUMNS = ('id', 'date', 'type', 'category', 'description', 'amount', 'budget_id')
+XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+FILE_BLOCK_SIZE = 64 * 1024
+
+# Spreadsheet apps run cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+# Characters XML 1.0 does not allow, even escaped
+INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def export_row(row):
+    """Return the export values of a simple_transactions row, in column order."""
+    return (
+        row['id'],
+        str(row['created_at']),
+        row['type'] or 'expense',
+        _safe_text(row['category'] or 'Uncategorized'),
+        _safe_text(row['description'] or ''),
+        row['amount'],
+        row['budget_id'],
+    )
+
+
+def _safe_text(value):
+    return "'" + value if value.startswith(FORMULA_PREFIXES) else value
+
+
+def csv_export_response(request, batches, filename):
+    """Stream a CSV file while rows are fetched, one batch at a time.
+
+    ``batches(repo)`` yields lists of rows, like ``repo.stream_transactions``.
+    Only one batch is held in memory; the repository connection is held
+    while the body is being written (see ``detached_repository``).
+    """
+    opener = detached_repository(request)
+
+    def app_iter():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        with opener as repo:
+            for rows in batches(repo):
+                writer.writerows(export_row(row) for row in rows)
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+
+    response = Response(app_iter=app_iter(), content_type='text/csv', charset='utf-8')
+    response.content_disposition = f'attachment; filename="{filename}"'
+    return response
+
+
+def xlsx_export_response(request, batches, filename):
+    """Write an XLSX workbook to a temporary file and serve it as a file.
+
+    A workbook is a zip archive, which cannot be sent before it is complete,
+    so rows are streamed into a temporary file on disk instead. The finished
+    file goes out through the server's ``wsgi.file_wrapper`` (sendfile on
+    most servers) and is removed once it has been sent.
+    """
+    handle = tempfile.TemporaryFile()
+    try:
+        with XlsxWriter(handle) as workbook:
+            workbook.write_row(EXPORT_COLUMNS)
+            for rows in batches(request.repo):
+                for row in rows:
+                    workbook.write_row(export_row(row))
+        size = handle.tell()
+        handle.seek(0)
+    except Exception:
+        handle.close()
+        raise
+
+    file_wrapper = request.environ.get('wsgi.file_wrapper', FileIter)
+    response = Response(
+        app_iter=file_wrapper(handle, FILE_BLOCK_SIZE),
+        content_type=XLSX,
+        content_length=size,
+    )
+    response.content_disposition = f'attachment; filename="{filename}"'
+    logger.info(f'Prepared {filename} ({size} bytes)')
+    return response
+
+
+class XlsxWriter:
+    """Minimal write-only XLSX (Office Open XML) writer with one worksheet.
+
+    Cells are written as inline strings or numbers straight into the
+    compressed worksheet entry, so memory use does not grow with the
+    number of rows.
+    """
+
+    CONTENT_TYPES = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    )
+    ROOT_RELS = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    )
+    WORKBOOK = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Transactions" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    )
+    WORKBOOK_RELS = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    )
+    SHEET_START = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+    )
+    SHEET_END = '</sheetData></worksheet>'
+
+    def __init__(self, fileobj):
+        self.zip = zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED)
+        self.zip.writestr('[Content_Types].xml', self.CONTENT_TYPES)
+        self.zip.writestr('_rels/.rels', self.ROOT_RELS)
+        self.zip.writestr('xl/workbook.xml', self.WORKBOOK)
+        self.zip.writestr('xl/_rels/workbook.xml.rels', self.WORKBOOK_RELS)
+        self.sheet = self.zip.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True)
+        self.sheet.write(self.SHEET_START.encode('utf-8'))
+        self.rows = 0
+
+    def write_row(self, values):
+        self.rows += 1
+        cells = ''.join(
+            self._cell(f'{column_letter(index)}{self.rows}', value)
+            for index, value in enumerate(values)
+            if value is not None
+        )
+        self.sheet.write(f'<row r="{self.rows}">{cells}</row>'.encode('utf-8'))
+
+    @staticmethod
+    def _cell(ref, value):
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return f'<c r="{ref}"><v>{value!r}</v></c>'
+        text = escape(INVALID_XML_CHARS.sub('', str(value)))
+        return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+    def close(self):
+        self.sheet.write(self.SHEET_END.encode('utf-8'))
+        self.sheet.close()
+        self.zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def column_letter(index):
+    """Return the spreadsheet column name (A, B, ..., AA) of a 0-based index."""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
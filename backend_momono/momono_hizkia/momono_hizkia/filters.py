@@ -0,0 +1,134 @@
+from datetime import datetime, timedelta
+
+# Constants
+TRANSACTION_TYPES = ('income', 'expense')
+UNCATEGORIZED = 'Uncategorized'
+
+# sort parameter -> (column, direction); id breaks ties so keyset paging is stable
+TRANSACTION_SORTS = {
+    '-date': ('created_at', 'DESC'),
+    'date': ('created_at', 'ASC'),
+    '-amount': ('amount', 'DESC'),
+    'amount': ('amount', 'ASC'),
+}
+DEFAULT_SORT = '-date'
+
+# Longest ``from``/``to`` month range the stats endpoints will answer
+MAX_STATS_MONTHS = 120
+
+
+def _parse_date(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be a date in YYYY-MM-DD format')
+
+
+def _parse_amount(value, name):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be a number')
+
+
+def parse_month(value, name):
+    """Return ``(year, month)`` from a ``YYYY-MM`` string."""
+    try:
+        parsed = datetime.strptime(value, '%Y-%m')
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be a month in YYYY-MM format')
+    return parsed.year, parsed.month
+
+
+def month_span(start, end):
+    """Return every ``(year, month)`` from ``start`` to ``end`` inclusive."""
+    first = start[0] * 12 + start[1] - 1
+    last = end[0] * 12 + end[1] - 1
+    return [(index // 12, index % 12 + 1) for index in range(first, last + 1)]
+
+
+def parse_month_range(params, required=False):
+    """Return ``(start, end)`` months from ``from``/``to`` query parameters.
+
+    Either bound is ``None`` when missing, unless ``required`` is set.
+    Raises ``ValueError`` for malformed, reversed or overly long ranges.
+    """
+    start = parse_month(params['from'], 'from') if params.get('from') else None
+    end = parse_month(params['to'], 'to') if params.get('to') else None
+    if required and (start is None or end is None):
+        raise ValueError('from and to are required')
+    if start is not None and end is not None:
+        if end < start:
+            raise ValueError('to must not be before from')
+        if (end[0] - start[0]) * 12 + end[1] - start[1] >= MAX_STATS_MONTHS:
+            raise ValueError(f'range must not exceed {MAX_STATS_MONTHS} months')
+    return start, end
+
+
+def parse_transaction_filters(params):
+    """Turn listing query parameters into repository filters.
+
+    Supported parameters are ``from`` and ``to`` (inclusive dates),
+    ``category``, ``type``, ``min_amount``, ``max_amount`` and ``sort``.
+    Dates are returned as a half-open ``[start, end)`` range so they can be
+    compared directly against the indexed ``created_at`` column.
+
+    Raises ``ValueError`` for values that cannot be used.
+    """
+    filters = {'sort': params.get('sort') or DEFAULT_SORT}
+    # JSON bulk filters may hold any type, query strings only strings
+    if not isinstance(filters['sort'], str) or filters['sort'] not in TRANSACTION_SORTS:
+        raise ValueError(f"sort must be one of {', '.join(TRANSACTION_SORTS)}")
+
+    if params.get('from'):
+        filters['start'] = _parse_date(params['from'], 'from').isoformat()
+    if params.get('to'):
+        filters['end'] = (_parse_date(params['to'], 'to') + timedelta(days=1)).isoformat()
+
+    if params.get('category') and params['category'] != 'all':
+        if not isinstance(params['category'], str):
+            raise ValueError('category must be a string')
+        filters['category'] = params['category']
+
+    if params.get('type') and params['type'] != 'all':
+        if params['type'] not in TRANSACTION_TYPES:
+            raise ValueError('type must be income or expense')
+        filters['type'] = params['type']
+
+    if params.get('min_amount'):
+        filters['min_amount'] = _parse_amount(params['min_amount'], 'min_amount')
+    if params.get('max_amount'):
+        filters['max_amount'] = _parse_amount(params['max_amount'], 'max_amount')
+
+    return filters
+
+
+def transaction_filter_sql(filters):
+    """Return ``(where_fragments, params)`` for ``parse_transaction_filters`` output."""
+    where = []
+    params = {}
+    if 'start' in filters:
+        where.append("created_at >= :start")
+        params['start'] = filters['start']
+    if 'end' in filters:
+        where.append("created_at < :end")
+        params['end'] = filters['end']
+    if 'category' in filters:
+        if filters['category'] == UNCATEGORIZED:
+            where.append("(category = :category OR category IS NULL)")
+        else:
+            where.append("category = :category")
+        params['category'] = filters['category']
+    if 'type' in filters:
+        if filters['type'] == 'expense':
+            where.append("(type = :type OR type IS NULL)")
+        else:
+            where.append("type = :type")
+        params['type'] = filters['type']
+    if 'min_amount' in filters:
+        where.append("amount >= :min_amount")
+        params['min_amount'] = filters['min_amount']
+    if 'max_amount' in filters:
+        where.append("amount <= :max_amount")
+        params['max_amount'] = filters['max_amount']
+    return where, params
@@ -1,11 +1,6 @@
-from sqlalchemy import engine_from_config
-from sqlalchemy.orm import sessionmaker, configure_mappers
-import zope.sqlalchemy
+from sqlalchemy.orm import configure_mappers
 import logging
 
-# Constants
-DATABASE_URL = 'sqlite:///momono.db'
-
 # Configure logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -18,56 +13,18 @@ from .models import (
     Transaction
 )
 
+from .meta import (
+    get_engine,
+    get_session_factory,
+    get_tm_session,
+    pool_metrics,
+)
+
 # run configure_mappers after defining all of the models to ensure
 # all relationships can be setup
 configure_mappers()
 
 
-def get_engine():
-    """Return SQLAlchemy engine instance."""
-    try:
-        engine = engine_from_config({
-            'sqlalchemy.url': DATABASE_URL
-        }, prefix='sqlalchemy.')
-        return engine
-    except Exception as e:
-        logger.error(f'Error creating database engine: {str(e)}')
-        raise
-
-
-def get_session_factory(engine):
-    factory = sessionmaker()
-    factory.configure(bind=engine)
-    return factory
-
-
-def get_tm_session(session_factory, transaction_manager):
-    """
-    Get a ``sqlalchemy.orm.Session`` instance backed by a transaction.
-
-    This function will hook the session to the transaction manager which
-    will take care of committing any changes.
-
-    - When using pyramid_tm it will automatically be committed or aborted
-      depending on whether an exception is raised.
-
-    - When using scripts you should wrap the session in a manager yourself.
-      For example::
-
-          import transaction
-
-          engine = get_engine(settings)
-          session_factory = get_session_factory(engine)
-          with transaction.manager:
-              dbsession = get_tm_session(session_factory, transaction.manager)
-
-    """
-    dbsession = session_factory()
-    zope.sqlalchemy.register(
-        dbsession, transaction_manager=transaction_manager)
-    return dbsession
-
-
 def includeme(config):
     """Initialize the model for a Pyramid app.
 
@@ -82,8 +39,10 @@ def includeme(config):
     # use pyramid_retry to retry a request when transient exceptions occur
     config.include('pyramid_retry')
 
-    # configure session factory
-    session_factory = get_session_factory(get_engine())
+    # configure engine and session factory from the app settings
+    engine = get_engine(settings)
+    config.registry['dbengine'] = engine
+    session_factory = get_session_factory(engine)
     config.registry['dbsession_factory'] = session_factory
 
     # make request.dbsession available for use in Pyramid
@@ -1,9 +1,11 @@
-from sqlalchemy import engine_from_config, MetaData
+from pyramid.settings import asbool
+from sqlalchemy import create_engine, event, MetaData
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, scoped_session
 from zope.sqlalchemy import register
 import logging
 import os
+import threading
 from dotenv import load_dotenv
 
 # Konfigurasi logging
@@ -26,43 +28,113 @@ NAMING_CONVENTION = {
 metadata.naming_convention = NAMING_CONVENTION
 Base.metadata = metadata
 
+# Engine options read from ``<prefix><name>`` settings
+ENGINE_OPTIONS = {
+    'pool_size': int,
+    'max_overflow': int,
+    'pool_timeout': int,
+    'pool_recycle': int,
+    'pool_pre_ping': asbool,
+    'query_cache_size': int,  # compiled statement cache entries
+    'echo': asbool,
+}
+
+
+class PoolMetrics:
+    """Connection pool checkout counters for one engine."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self._lock = threading.Lock()
+        event.listen(engine, 'connect', self._on_connect)
+        event.listen(engine, 'checkout', self._on_checkout)
+        event.listen(engine, 'checkin', self._on_checkin)
+        event.listen(engine, 'invalidate', self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checkins += 1
+            self.checked_out = max(self.checked_out - 1, 0)
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'invalidations': self.invalidations,
+                'checked_out': self.checked_out,
+                'peak_checked_out': self.peak_checked_out,
+                'pool_status': self.engine.pool.status(),
+            }
+
+
+def get_database_url(settings, prefix='sqlalchemy.'):
+    """Return ``<prefix>url`` from settings, falling back to the DB_* environment."""
+    url = settings.get(f'{prefix}url')
+    if url:
+        return url
+    logger.info('No sqlalchemy.url configured, loading database configuration from environment variables')
+    load_dotenv()
+    return (
+        f"postgresql+psycopg2://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
+        f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
+    )
+
+
 def get_engine(settings, prefix='sqlalchemy.'):
-    """Get SQLAlchemy engine from settings."""
+    """Get SQLAlchemy engine from settings.
+
+    Pool options (``pool_size``, ``max_overflow``, ``pool_pre_ping``,
+    ``pool_recycle``, ``query_cache_size``...) are taken from settings with
+    the same prefix. Tables are only created when ``models.create_all`` is
+    true; normally the schema is managed by Alembic.
+    """
     try:
-        # Log database configuration
-        logger.info('Loading database configuration from environment variables')
-        
-        # Load environment variables
-        load_dotenv()
-        
-        # Get database configuration from env
-        db_user = os.getenv('DB_USER')
-        db_password = os.getenv('DB_PASSWORD')
-        db_host = os.getenv('DB_HOST')
-        db_port = os.getenv('DB_PORT')
-        db_name = os.getenv('DB_NAME')
-        
-        # Log configuration values (except password)
-        logger.info(f'Database configuration - User: {db_user}, Host: {db_host}, Port: {db_port}, DB: {db_name}')
-        
-        # Create database URL
-        db_url = f'postgresql+psycopg2://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}'
-        
-        # Create engine
-        engine = engine_from_config({
-            f'{prefix}url': db_url
-        })
-        logger.info('Database engine created successfully')
-        
-        # Create all tables if they don't exist
-        Base.metadata.create_all(engine)
-        logger.info('Database tables created successfully')
-        
+        options = {}
+        for name, convert in ENGINE_OPTIONS.items():
+            value = settings.get(f'{prefix}{name}')
+            if value not in (None, ''):
+                options[name] = convert(value)
+
+        engine = create_engine(get_database_url(settings, prefix), **options)
+        engine.pool_metrics = PoolMetrics(engine)
+        logger.info(f'Database engine created successfully: {engine.url!r} {options}')
+
+        if asbool(settings.get('models.create_all', False)):
+            Base.metadata.create_all(engine)
+            logger.info('Database tables created successfully')
+
         return engine
     except Exception as e:
         logger.error(f'Error creating database engine: {str(e)}')
         raise
 
+
+def pool_metrics(engine):
+    """Return checkout counters and pool status for ``engine``."""
+    return engine.pool_metrics.as_dict()
+
 def get_session_factory(engine):
     """Get SQLAlchemy session factory from engine."""
     try:
@@ -83,32 +155,3 @@ def get_tm_session(session_factory, transaction_manager):
     except Exception as e:
         logger.error(f'Error registering session: {str(e)}')
         raise
-
-def includeme(config):
-    """Initialize the model for a Pyramid app.
-    Activate this setup using ``config.include('momono_hizkia.momono_hizkia.models')``.
-    """
-    try:
-        settings = config.get_settings()
-        settings['tm.manager_hook'] = 'pyramid_tm.explicit_manager'
-
-        # use pyramid_tm to hook the transaction lifecycle to the request
-        config.include('pyramid_tm')
-
-        # use pyramid_retry to retry a request when transient exceptions occur
-        config.include('pyramid_retry')
-
-        session_factory = get_session_factory(get_engine(settings))
-        config.registry['dbsession_factory'] = session_factory
-
-        # make request.dbsession available for use in Pyramid
-        config.add_request_method(
-            # r.tm is the transaction manager used by pyramid_tm
-            lambda r: get_tm_session(session_factory, r.tm),
-            'dbsession',
-            reify=True
-        )
-        logger.info('Models configuration completed successfully')
-    except Exception as e:
-        logger.error(f'Error in models configuration: {str(e)}')
-        raise
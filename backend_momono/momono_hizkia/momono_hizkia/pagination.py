@@ -0,0 +1,45 @@
+import base64
+import json
+
+# Constants
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(sort_value, row_id):
+    """Return an opaque cursor pointing just after ``(sort_value, row_id)``."""
+    if hasattr(sort_value, 'isoformat'):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, row_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return ``(sort_value, row_id)`` from a cursor made by ``encode_cursor``."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(sort_value, (str, int, float)):
+            raise ValueError('Invalid cursor')
+        return sort_value, int(row_id)
+    except (ValueError, TypeError, UnicodeEncodeError):
+        raise ValueError('Invalid cursor')
+
+
+def parse_page_params(params):
+    """Return ``(limit, after)`` from ``limit``/``after`` query parameters.
+
+    Both are ``None`` when the client did not ask for a page, so existing
+    callers keep getting the full listing.
+    """
+    limit = params.get('limit')
+    after = params.get('after')
+    if limit is None and after is None:
+        return None, None
+    try:
+        limit = int(limit) if limit is not None else DEFAULT_PAGE_SIZE
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, MAX_PAGE_SIZE), decode_cursor(after) if after else None
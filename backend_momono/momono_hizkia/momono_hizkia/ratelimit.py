@@ -0,0 +1,174 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from pyramid.httpexceptions import HTTPTooManyRequests
+from pyramid.settings import asbool
+
+# Konfigurasi logging
+logger = logging.getLogger('momono.ratelimit')
+logger.setLevel(logging.INFO)
+
+# Constants
+DEFAULT_IP_PER_MINUTE = 20
+DEFAULT_IP_BURST = 10
+DEFAULT_EMAIL_PER_MINUTE = 5
+DEFAULT_EMAIL_BURST = 5
+DEFAULT_MAX_KEYS = 100000
+
+
+class TokenBucketStore:
+    """In-memory token buckets, one per key.
+
+    Each bucket holds up to ``burst`` tokens and refills at ``rate``
+    tokens per second; an attempt takes one token. Buckets are kept in
+    LRU order and the least recently used are evicted beyond
+    ``max_keys``, so memory stays bounded under traffic from many
+    addresses. An evicted bucket comes back full, which is also what an
+    idle bucket refills to.
+    """
+
+    def __init__(self, rate, burst, max_keys=DEFAULT_MAX_KEYS):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.rejected = 0
+        self.evictions = 0
+
+    def take(self, key):
+        """Take a token for ``key``; return 0 if allowed, else seconds until one is free."""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = self.burst
+            else:
+                tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                self._buckets.move_to_end(key)
+            if tokens >= 1:
+                self._buckets[key] = [tokens - 1, now]
+                self.allowed += 1
+                retry_after = 0
+            else:
+                self._buckets[key] = [tokens, now]
+                self.rejected += 1
+                retry_after = (1 - tokens) / self.rate
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+                self.evictions += 1
+        return retry_after
+
+    def stats(self):
+        with self._lock:
+            return {
+                'keys': len(self._buckets),
+                'allowed': self.allowed,
+                'rejected': self.rejected,
+                'evictions': self.evictions,
+            }
+
+
+class RateLimiter:
+    """Login/registration limits per client address and per email.
+
+    ``trusted_proxies`` is the number of proxies in front of the app that
+    append to ``X-Forwarded-For``. The client address is the entry the
+    outermost of them appended; entries before it come from the client
+    and could be changed on every attempt to get a fresh bucket.
+    """
+
+    def __init__(self, by_ip, by_email, trusted_proxies=0):
+        self.by_ip = by_ip
+        self.by_email = by_email
+        self.trusted_proxies = trusted_proxies
+
+    def client_ip(self, request):
+        if self.trusted_proxies:
+            forwarded = [
+                entry.strip() for entry in request.headers.get('X-Forwarded-For', '').split(',') if entry.strip()
+            ]
+            if len(forwarded) >= self.trusted_proxies:
+                return forwarded[-self.trusted_proxies]
+        return request.remote_addr
+
+    def check(self, request):
+        """Return seconds to wait before ``request`` may be served, 0 if it may now."""
+        retry_after = self.by_ip.take(f'ip:{self.client_ip(request)}')
+        if retry_after:
+            return retry_after
+        email = _request_email(request)
+        if email:
+            return self.by_email.take(f'email:{email}')
+        return 0
+
+
+def _request_email(request):
+    try:
+        data = request.json_body
+    except ValueError:
+        return None
+    email = data.get('email') if isinstance(data, dict) else None
+    return email.strip().lower() if isinstance(email, str) else None
+
+
+def get_rate_limiter(registry):
+    return registry.get('momono.rate_limiter')
+
+
+def rate_limited(view):
+    """View decorator answering 429 once a client or email is over its limit.
+
+    Use it as ``@view_config(..., decorator=rate_limited)``. The check runs
+    before the view, so rejected attempts cost no database or bcrypt work.
+    """
+    def wrapper(context, request):
+        limiter = get_rate_limiter(request.registry)
+        if limiter is not None:
+            retry_after = limiter.check(request)
+            if retry_after:
+                logger.warning(f'Rate limit hit on {request.path_info} from {limiter.client_ip(request)}')
+                raise HTTPTooManyRequests(
+                    json_body={'error': 'Too many attempts, please try again later'},
+                    headers={'Retry-After': str(math.ceil(retry_after))}
+                )
+        return view(context, request)
+
+    return wrapper
+
+
+def includeme(config):
+    """Set up the login/registration limits from the ``ratelimit.*`` settings.
+
+    Activate this setup using ``config.include('.ratelimit')``.
+    """
+    settings = config.get_settings()
+    if not asbool(settings.get('ratelimit.enabled', True)):
+        config.registry['momono.rate_limiter'] = None
+        logger.info('Rate limiting disabled')
+        return
+    max_keys = int(settings.get('ratelimit.max_keys', DEFAULT_MAX_KEYS))
+    # ratelimit.trust_forwarded = true is the older spelling of one proxy
+    default_proxies = 1 if asbool(settings.get('ratelimit.trust_forwarded', False)) else 0
+    limiter = RateLimiter(
+        by_ip=TokenBucketStore(
+            rate=float(settings.get('ratelimit.ip_per_minute', DEFAULT_IP_PER_MINUTE)) / 60,
+            burst=int(settings.get('ratelimit.ip_burst', DEFAULT_IP_BURST)),
+            max_keys=max_keys,
+        ),
+        by_email=TokenBucketStore(
+            rate=float(settings.get('ratelimit.email_per_minute', DEFAULT_EMAIL_PER_MINUTE)) / 60,
+            burst=int(settings.get('ratelimit.email_burst', DEFAULT_EMAIL_BURST)),
+            max_keys=max_keys,
+        ),
+        trusted_proxies=int(settings.get('ratelimit.trusted_proxies', default_proxies)),
+    )
+    config.registry['momono.rate_limiter'] = limiter
+    logger.info(
+        f'Rate limits: {limiter.by_ip.burst} burst + {limiter.by_ip.rate * 60:g}/min per IP, '
+        f'{limiter.by_email.burst} burst + {limiter.by_email.rate * 60:g}/min per email'
+    )
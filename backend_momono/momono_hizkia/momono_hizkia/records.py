@@ -0,0 +1,228 @@
+from dataclasses import dataclass
+from operator import itemgetter
+
+# Constants
+DEFAULT_CATEGORY = 'Uncategorized'
+DEFAULT_TYPE = 'expense'
+
+# (kind, record type, field names) -> generated function, see ``_compile``
+_SERIALIZERS = {}
+# record type -> its all-fields serializer, for ``as_dict``
+_FULL_SERIALIZERS = {}
+
+
+def _row_reader(*columns):
+    """Return a function reading ``columns`` from a row as one tuple."""
+    getter = itemgetter(*columns)
+    if len(columns) == 1:
+        return lambda row: (getter(row),)
+    return getter
+
+
+class Record:
+    """Base of the API record types.
+
+    Records are slotted dataclasses (no per-instance ``__dict__``) built
+    with ``from_row``. Fields can also be read by key, like the rows and
+    dicts views used to return. The JSON renderer encodes them with the
+    generated ``serializer`` of their type.
+
+    ``sources`` maps a field to its ``(column, default)`` in repository
+    rows; types whose fields all come straight from columns can be
+    serialized from rows with ``row_serializer``, without building records.
+    """
+
+    __slots__ = ()
+    sources = None
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+
+@dataclass
+class TransactionRecord(Record):
+    """A simple_transactions row as the API returns it.
+
+    ``date`` repeats ``created_at`` for the frontend; both point at the
+    same object, so the copy costs no allocation.
+    """
+
+    __slots__ = ('id', 'amount', 'description', 'date', 'created_at', 'category', 'type', 'budget_id')
+
+    id: int
+    amount: float
+    description: str
+    date: object
+    created_at: object
+    category: str
+    type: str
+    budget_id: int
+
+    sources = {
+        'id': ('id', None),
+        'amount': ('amount', None),
+        'description': ('description', None),
+        'date': ('created_at', None),
+        'created_at': ('created_at', None),
+        'category': ('category', DEFAULT_CATEGORY),
+        'type': ('type', DEFAULT_TYPE),
+        'budget_id': ('budget_id', None),
+    }
+    _read = staticmethod(_row_reader('id', 'amount', 'description', 'created_at', 'category', 'type', 'budget_id'))
+
+    @classmethod
+    def from_row(cls, row):
+        return cls.new(*cls._read(row))
+
+    @classmethod
+    def new(cls, id, amount, description, created_at, category, type, budget_id):
+        """Build a record from column values, e.g. those just inserted."""
+        return cls(
+            id, amount, description, created_at, created_at,
+            category or DEFAULT_CATEGORY, type or DEFAULT_TYPE, budget_id
+        )
+
+
+@dataclass
+class BudgetRecord(Record):
+    """A simple_budgets row with its spent/remaining/utilization figures."""
+
+    __slots__ = ('id', 'user_id', 'amount', 'name', 'description', 'category', 'spent', 'remaining', 'utilization')
+
+    id: int
+    user_id: int
+    amount: float
+    name: str
+    description: str
+    category: str
+    spent: float
+    remaining: float
+    utilization: float
+
+    _read = staticmethod(_row_reader('id', 'user_id', 'amount', 'name', 'description', 'category', 'spent'))
+
+    @classmethod
+    def from_row(cls, row):
+        return cls.new(*cls._read(row))
+
+    @classmethod
+    def new(cls, id, user_id, amount, name, description='', category='', spent=0):
+        """Build a record from column values, e.g. those just inserted."""
+        total = float(amount or 0)
+        spent = float(spent or 0)
+        # Fraction of the budget used; 0 for budgets without an amount
+        utilization = round(spent / total, 4) if total else 0
+        return cls(id, user_id, amount, name, description, category, spent, total - spent, utilization)
+
+
+@dataclass
+class CategoryRecord(Record):
+    __slots__ = ('id', 'name', 'type')
+
+    id: int
+    name: str
+    type: str
+
+    sources = {'id': ('id', None), 'name': ('name', None), 'type': ('type', None)}
+    _read = staticmethod(_row_reader('id', 'name', 'type'))
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*cls._read(row))
+
+
+@dataclass
+class NotificationRecord(Record):
+    __slots__ = ('id', 'message', 'date')
+
+    id: int
+    message: str
+    date: str
+
+    _read = staticmethod(_row_reader('id', 'message', 'date'))
+
+    @classmethod
+    def from_row(cls, row):
+        id, message, date = cls._read(row)
+        # Both backends render the date as "YYYY-MM-DD..." so the prefix is the day
+        return cls(id, message, str(date)[:10])
+
+
+def _compile(kind, record_type, fields):
+    """Generate and cache a function returning ``{field: value}`` dicts.
+
+    The body is a single dict display, the cheapest way to build a dict
+    in CPython, so serializing a row costs one allocation and no per-field
+    Python calls. ``kind`` is ``'record'`` (read attributes) or ``'row'``
+    (read ``record_type.sources`` columns from a repository row).
+    """
+    fields = tuple(fields or record_type.__slots__)
+    key = (kind, record_type, fields)
+    serialize = _SERIALIZERS.get(key)
+    if serialize is not None:
+        return serialize
+
+    namespace = {}
+    lines = []
+    items = []
+    if kind == 'record':
+        for field in fields:
+            if field not in record_type.__slots__:
+                raise ValueError(f'{record_type.__name__} has no field {field!r}')
+            items.append(f'{field!r}: obj.{field}')
+    else:
+        if not record_type.sources:
+            raise ValueError(f'{record_type.__name__} cannot be serialized from rows')
+        read = {}
+        for index, field in enumerate(fields):
+            if field not in record_type.sources:
+                raise ValueError(f'{record_type.__name__} has no field {field!r}')
+            column, default = record_type.sources[field]
+            if column not in read:
+                # Each column is read once, even when two fields share it
+                read[column] = f'c{len(read)}'
+                lines.append(f'    {read[column]} = obj[{column!r}]')
+            value = read[column]
+            if default is not None:
+                namespace[f'd{index}'] = default
+                value = f'{value} or d{index}'
+            items.append(f'{field!r}: {value}')
+    lines.append('    return {' + ', '.join(items) + '}')
+    exec('def serialize(obj):\n' + '\n'.join(lines), namespace)
+    serialize = namespace['serialize']
+    _SERIALIZERS[key] = serialize
+    return serialize
+
+
+def serializer(record_type, fields=None):
+    """Return a function turning ``record_type`` instances into dicts.
+
+    Built once per ``(record_type, fields)``; ``fields`` defaults to all
+    of them. Views returning records do not need to call it: the JSON
+    renderer uses it. It is for views exposing only some ``fields``.
+    """
+    return _compile('record', record_type, fields)
+
+
+def row_serializer(record_type, fields=None):
+    """Return a function turning repository rows straight into API dicts.
+
+    Gives the same dicts as ``serializer`` on ``from_row`` records but
+    skips building the record, for listings that only encode their rows.
+    """
+    return _compile('row', record_type, fields)
+
+
+def as_dict(record):
+    """Return all fields of ``record`` as a dict."""
+    record_type = type(record)
+    serialize = _FULL_SERIALIZERS.get(record_type)
+    if serialize is None:
+        serialize = _FULL_SERIALIZERS[record_type] = serializer(record_type)
+    return serialize(record)
@@ -0,0 +1,110 @@
+import dataclasses
+import datetime
+import decimal
+import enum
+import json
+import logging
+from collections.abc import Mapping
+
+from .records import Record, as_dict
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib encoder is the fallback
+    orjson = None
+
+# Konfigurasi logging
+logger = logging.getLogger('momono.renderers')
+logger.setLevel(logging.INFO)
+
+# Constants
+# stdlib json turns int keys into strings; orjson needs to be told to.
+# Records go through ``default``: their generated serializers are faster
+# than orjson's own dataclass path.
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS if orjson is not None else 0
+
+
+def default(obj):
+    """Convert values neither encoder handles on its own.
+
+    orjson already writes datetime, date and enum values natively; the
+    stdlib fallback gets the same output through this hook.
+    """
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    if isinstance(obj, Record):
+        return as_dict(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if isinstance(obj, Mapping):
+        # SQLAlchemy RowMapping (PostgreSQL repository rows)
+        return dict(obj)
+    if hasattr(obj, '_asdict'):
+        # SQLAlchemy Row and namedtuples
+        return obj._asdict()
+    if hasattr(obj, 'keys'):
+        # sqlite3.Row (SQLite repository rows)
+        return {key: obj[key] for key in obj.keys()}
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def dumps(value):
+    """Serialize ``value`` to compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(value, default=default, option=ORJSON_OPTIONS)
+    return json.dumps(value, default=default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+class FastJSON:
+    """JSON renderer backed by orjson when it is installed.
+
+    Registered as the ``json`` renderer, so views keep using
+    ``renderer="json"`` and may return rows, dates, Decimals and enums
+    directly. Use ``add_adapter`` for other types, like Pyramid's own
+    ``JSON`` renderer.
+    """
+
+    def __init__(self):
+        self.adapters = []
+
+    def add_adapter(self, type_or_iface, adapter):
+        self.adapters.append((type_or_iface, adapter))
+
+    def _default(self, obj):
+        for type_, adapter in self.adapters:
+            if isinstance(obj, type_):
+                return adapter(obj, None)
+        return default(obj)
+
+    def dumps(self, value):
+        if not self.adapters:
+            return dumps(value)
+        if orjson is not None:
+            return orjson.dumps(value, default=self._default, option=ORJSON_OPTIONS)
+        return json.dumps(value, default=self._default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+    def __call__(self, info):
+        def _render(value, system):
+            request = system.get('request')
+            if request is not None:
+                response = request.response
+                if response.content_type == response.default_content_type:
+                    response.content_type = 'application/json'
+            return self.dumps(value)
+
+        return _render
+
+
+def includeme(config):
+    """Replace the stdlib ``json`` renderer with ``FastJSON``.
+
+    Activate this setup using ``config.include('.renderers')``.
+    """
+    config.add_renderer('json', FastJSON())
+    logger.info(f"JSON renderer: {'orjson' if orjson is not None else 'stdlib json'}")
@@ -0,0 +1,854 @@
+import itertools
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from pyramid.settings import aslist
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from .filters import DEFAULT_SORT, TRANSACTION_SORTS, UNCATEGORIZED, transaction_filter_sql
+from .sqlite_pool import get_pool, request_connection
+
+# Konfigurasi logging
+logger = logging.getLogger('momono.repository')
+logger.setLevel(logging.INFO)
+
+# Constants
+DEFAULT_STORAGE = 'sqlite'
+DEFAULT_SQLITE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'momono.sqlite')
+
+DEFAULT_READ_YOUR_WRITES_SECONDS = 5
+DEFAULT_STREAM_BATCH_SIZE = 500
+SAFE_METHODS = ('GET', 'HEAD')
+
+# Routes whose data is not strictly per user (categories are global and the
+# simple budget views always act as user 1); writes through them also bump
+# the shared data version
+SHARED_ROUTES = (
+    'categories', 'category',
+    'simple_budgets', 'simple_budget',
+    'budgets', 'budget', 'budgets_bulk', 'named_budget',
+)
+SHARED_SCOPE = 'shared'
+# Budget ``spent`` totals move with every expense written, whoever writes
+# it. Routes showing budgets that need not be the caller's also depend on
+# this scope, which commits bump after touching a ``spent`` total
+BUDGETS_SCOPE = 'budgets'
+BUDGET_ROUTES = ('simple_budgets', 'simple_budget')
+
+BUDGET_COLUMNS = 'id, user_id, amount, name, description, category, spent'
+TRANSACTION_COLUMNS = 'id, user_id, amount, description, created_at, category, type, budget_id'
+# Changing any of these moves a transaction to another rollup cell or budget
+ROLLUP_FIELDS = ('amount', 'created_at', 'category', 'type', 'budget_id')
+
+
+class BaseRepository:
+    """Data access for budgets, transactions, categories and notifications.
+
+    All statements use ``:name`` parameters so the same SQL runs on both
+    backends. Subclasses only differ in how a statement is executed and how
+    the id of an inserted row is returned.
+    """
+
+    dialect = None
+    # Data-version scopes bumped on commit; set by get_repository for writes
+    write_scopes = ()
+    # Set once a ``spent`` total was changed in this unit of work
+    budgets_changed = False
+
+    def _execute(self, sql, params=None):
+        raise NotImplementedError
+
+    def _insert(self, sql, params):
+        raise NotImplementedError
+
+    def _executemany(self, sql, params_list):
+        raise NotImplementedError
+
+    def commit(self):
+        """Commit the unit of work, bumping the data versions of ``write_scopes``."""
+        for scope in self.write_scopes:
+            self._bump_data_version(scope)
+        if self.budgets_changed:
+            self._bump_data_version(BUDGETS_SCOPE)
+        self._commit()
+
+    def _commit(self):
+        raise NotImplementedError
+
+    def _fetchall(self, sql, params=None):
+        return self._execute(sql, params).fetchall()
+
+    def _fetchone(self, sql, params=None):
+        return self._execute(sql, params).fetchone()
+
+    def _stream(self, sql, params=None, batch_size=DEFAULT_STREAM_BATCH_SIZE):
+        """Yield lists of at most ``batch_size`` rows without loading the whole result."""
+        cursor = self._execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+
+    # Budgets
+
+    def list_budgets(self, user_id):
+        return self._fetchall(
+            f"SELECT {BUDGET_COLUMNS} FROM simple_budgets WHERE user_id = :user_id",
+            {"user_id": user_id}
+        )
+
+    def stream_budgets(self, user_id, batch_size=DEFAULT_STREAM_BATCH_SIZE):
+        return self._stream(
+            f"SELECT {BUDGET_COLUMNS} FROM simple_budgets WHERE user_id = :user_id",
+            {"user_id": user_id},
+            batch_size
+        )
+
+    def get_budget(self, budget_id):
+        return self._fetchone(
+            f"SELECT {BUDGET_COLUMNS} FROM simple_budgets WHERE id = :id",
+            {"id": budget_id}
+        )
+
+    def create_budget(self, user_id, amount, name, description='', category=''):
+        return self._insert(
+            "INSERT INTO simple_budgets (user_id, amount, name, description, category) "
+            "VALUES (:user_id, :amount, :name, :description, :category)",
+            {
+                "user_id": user_id,
+                "amount": amount,
+                "name": name,
+                "description": description,
+                "category": category
+            }
+        )
+
+    def update_budget(self, budget_id, amount, name, description, category):
+        return self._execute(
+            "UPDATE simple_budgets SET amount = :amount, description = :description, "
+            "name = :name, category = :category WHERE id = :id",
+            {
+                "id": budget_id,
+                "amount": amount,
+                "name": name,
+                "description": description,
+                "category": category
+            }
+        ).rowcount
+
+    def delete_budget(self, budget_id):
+        return self._execute(
+            "DELETE FROM simple_budgets WHERE id = :id", {"id": budget_id}
+        ).rowcount
+
+    def bulk_update_budgets(self, user_id, fields, ids=None, category=None):
+        """Set ``fields`` on the selected budgets with one UPDATE; returns the row count."""
+        where, params = _budget_selection(user_id, ids, category)
+        assignments = ', '.join(f"{column} = :set_{column}" for column in fields)
+        params.update({f"set_{column}": value for column, value in fields.items()})
+        return self._execute(
+            f"UPDATE simple_budgets SET {assignments} WHERE {where}", params
+        ).rowcount
+
+    def bulk_delete_budgets(self, user_id, ids=None, category=None):
+        """Delete the selected budgets with one DELETE; returns the row count."""
+        where, params = _budget_selection(user_id, ids, category)
+        return self._execute(f"DELETE FROM simple_budgets WHERE {where}", params).rowcount
+
+    def get_or_create_default_budget(self, user_id):
+        """Return the id of the user's first budget, creating one if needed."""
+        row = self._fetchone(
+            "SELECT id FROM simple_budgets WHERE user_id = :user_id ORDER BY id LIMIT 1",
+            {"user_id": user_id}
+        )
+        if row:
+            return row["id"]
+        return self.create_budget(
+            user_id,
+            0,
+            f"Default Budget {datetime.now().strftime('%B %Y')}",
+            "Default budget created automatically"
+        )
+
+    # Transactions
+
+    def list_transactions(self, user_id, limit=None, after=None, filters=None):
+        """Return transactions, newest first unless ``filters`` sets a sort.
+
+        ``filters`` comes from ``parse_transaction_filters``. ``after`` is a
+        ``(sort_value, id)`` keyset position; only rows that sort strictly
+        after it are returned, so every page costs the same.
+        """
+        return self._fetchall(*self._transactions_query(user_id, limit, after, filters))
+
+    def stream_transactions(self, user_id, limit=None, after=None, filters=None,
+                            batch_size=DEFAULT_STREAM_BATCH_SIZE):
+        sql, params = self._transactions_query(user_id, limit, after, filters)
+        return self._stream(sql, params, batch_size)
+
+    def _transactions_query(self, user_id, limit, after, filters):
+        filters = filters or {}
+        column, direction = TRANSACTION_SORTS[filters.get('sort', DEFAULT_SORT)]
+        where, params = transaction_filter_sql(filters)
+        where.insert(0, "user_id = :user_id")
+        params["user_id"] = user_id
+        if after is not None:
+            operator = "<" if direction == "DESC" else ">"
+            where.append(f"({column}, id) {operator} (:after_value, :after_id)")
+            params["after_value"], params["after_id"] = after
+        sql = (
+            f"SELECT {TRANSACTION_COLUMNS} FROM simple_transactions "
+            f"WHERE {' AND '.join(where)} ORDER BY {column} {direction}, id {direction}"
+        )
+        if limit is not None:
+            sql += " LIMIT :limit"
+            params["limit"] = limit
+        return sql, params
+
+    def get_transaction(self, transaction_id, user_id):
+        return self._fetchone(
+            f"SELECT {TRANSACTION_COLUMNS} FROM simple_transactions "
+            "WHERE id = :id AND user_id = :user_id",
+            {"id": transaction_id, "user_id": user_id}
+        )
+
+    def bulk_create_transactions(self, user_id, rows):
+        """Insert many transactions with one ``executemany``.
+
+        ``rows`` are dicts with the ``create_transaction`` arguments. The
+        rollup and budget counters are updated once per affected cell or
+        budget rather than once per row. Returns the number of rows inserted.
+        """
+        if not rows:
+            return 0
+        self._executemany(
+            "INSERT INTO simple_transactions "
+            "(user_id, amount, description, created_at, category, type, budget_id) "
+            "VALUES (:user_id, :amount, :description, :created_at, :category, :type, :budget_id)",
+            [dict(row, user_id=user_id) for row in rows]
+        )
+        cells = {}
+        spent = {}
+        for row in rows:
+            key = (rollup_period(row["created_at"]), row["category"], row["type"])
+            total, count = cells.get(key, (0, 0))
+            cells[key] = (total + row["amount"], count + 1)
+            if row["budget_id"] is not None and (row["type"] or "expense") == "expense":
+                spent[row["budget_id"]] = spent.get(row["budget_id"], 0) + row["amount"]
+        for ((year, month), category, type), (total, count) in cells.items():
+            self._bump_rollup_cell(user_id, year, month, category, type, total, count)
+        for budget_id, amount in spent.items():
+            self._bump_budget_spent(budget_id, "expense", amount)
+        return len(rows)
+
+    def _lock_transaction(self, transaction_id, user_id):
+        """Return the current row of a transaction that is about to change."""
+        return self.get_transaction(transaction_id, user_id)
+
+    def create_transaction(self, user_id, amount, description, created_at, category, type, budget_id):
+        transaction_id = self._insert(
+            "INSERT INTO simple_transactions "
+            "(user_id, amount, description, created_at, category, type, budget_id) "
+            "VALUES (:user_id, :amount, :description, :created_at, :category, :type, :budget_id)",
+            {
+                "user_id": user_id,
+                "amount": amount,
+                "description": description,
+                "created_at": created_at,
+                "category": category,
+                "type": type,
+                "budget_id": budget_id
+            }
+        )
+        self._bump_rollup(user_id, created_at, category, type, amount, 1)
+        self._bump_budget_spent(budget_id, type, amount)
+        return transaction_id
+
+    def update_transaction(self, transaction_id, user_id, fields):
+        """Update the given columns of a transaction; ``fields`` maps column to value."""
+        old = self._lock_transaction(transaction_id, user_id)
+        if old is None:
+            return 0
+        assignments = ', '.join(f"{column} = :{column}" for column in fields)
+        params = dict(fields, id=transaction_id, user_id=user_id)
+        rowcount = self._execute(
+            f"UPDATE simple_transactions SET {assignments} WHERE id = :id AND user_id = :user_id",
+            params
+        ).rowcount
+        if any(column in fields for column in ROLLUP_FIELDS):
+            new = dict(old, **fields)
+            self._bump_rollup(user_id, old["created_at"], old["category"], old["type"], -old["amount"], -1)
+            self._bump_rollup(user_id, new["created_at"], new["category"], new["type"], new["amount"], 1)
+            self._bump_budget_spent(old["budget_id"], old["type"], -old["amount"])
+            self._bump_budget_spent(new["budget_id"], new["type"], new["amount"])
+        return rowcount
+
+    def delete_transaction(self, transaction_id, user_id):
+        old = self._lock_transaction(transaction_id, user_id)
+        if old is None:
+            return 0
+        rowcount = self._execute(
+            "DELETE FROM simple_transactions WHERE id = :id AND user_id = :user_id",
+            {"id": transaction_id, "user_id": user_id}
+        ).rowcount
+        self._bump_rollup(user_id, old["created_at"], old["category"], old["type"], -old["amount"], -1)
+        self._bump_budget_spent(old["budget_id"], old["type"], -old["amount"])
+        return rowcount
+
+    def bulk_update_transactions(self, user_id, fields, ids=None, filters=None):
+        """Set ``fields`` on every selected transaction with one UPDATE.
+
+        Transactions are selected by ``ids`` and/or ``parse_transaction_filters``
+        output. The rollup and budget counters are moved per group of
+        affected rows, not per row. Returns the number of rows updated.
+        """
+        where, params = _transaction_selection(user_id, ids, filters)
+        self._lock_rows(where, params)
+        groups = self._transaction_groups(where, params) if any(c in fields for c in ROLLUP_FIELDS) else []
+        assignments = ', '.join(f"{column} = :set_{column}" for column in fields)
+        update_params = dict(params, **{f"set_{column}": value for column, value in fields.items()})
+        rowcount = self._execute(
+            f"UPDATE simple_transactions SET {assignments} WHERE {where}", update_params
+        ).rowcount
+        for group in groups:
+            new = dict(group, **fields)
+            self._bump_rollup(user_id, group["created_at"], group["category"], group["type"],
+                              -group["total"], -group["count"])
+            self._bump_rollup(user_id, new["created_at"], new["category"], new["type"],
+                              new["total"], new["count"])
+            self._bump_budget_spent(group["budget_id"], group["type"], -group["total"])
+            self._bump_budget_spent(new["budget_id"], new["type"], new["total"])
+        return rowcount
+
+    def bulk_delete_transactions(self, user_id, ids=None, filters=None):
+        """Delete every selected transaction with one DELETE; returns the row count."""
+        where, params = _transaction_selection(user_id, ids, filters)
+        self._lock_rows(where, params)
+        groups = self._transaction_groups(where, params)
+        rowcount = self._execute(f"DELETE FROM simple_transactions WHERE {where}", params).rowcount
+        for group in groups:
+            self._bump_rollup(user_id, group["created_at"], group["category"], group["type"],
+                              -group["total"], -group["count"])
+            self._bump_budget_spent(group["budget_id"], group["type"], -group["total"])
+        return rowcount
+
+    def _lock_rows(self, where, params):
+        """Lock the selected transactions before their counters are read."""
+
+    def _transaction_groups(self, where, params):
+        # One row per distinct (day, category, type, budget) among the selection
+        return [
+            dict(row) for row in self._fetchall(
+                "SELECT created_at, category, type, budget_id, SUM(amount) AS total, COUNT(*) AS count "
+                f"FROM simple_transactions WHERE {where} "
+                "GROUP BY created_at, category, type, budget_id",
+                params
+            )
+        ]
+
+    # Rollups
+
+    def _bump_budget_spent(self, budget_id, type, amount):
+        """Add an expense of ``amount`` to the budget's running ``spent`` total."""
+        if budget_id is None or (type or "expense") != "expense":
+            return
+        self._execute(
+            "UPDATE simple_budgets SET spent = spent + :amount WHERE id = :id",
+            {"id": budget_id, "amount": amount}
+        )
+        self.budgets_changed = True
+
+    def _bump_rollup(self, user_id, created_at, category, type, amount, count):
+        """Add ``amount`` and ``count`` to the rollup cell of one transaction."""
+        year, month = rollup_period(created_at)
+        self._bump_rollup_cell(user_id, year, month, category, type, amount, count)
+
+    def _bump_rollup_cell(self, user_id, year, month, category, type, amount, count):
+        """Add ``amount`` and ``count`` to one rollup cell.
+
+        Cells whose count drops to zero are removed so that the stats
+        queries only ever see months and categories that have data.
+        """
+        params = {
+            "user_id": user_id,
+            "year": year,
+            "month": month,
+            "category": category or UNCATEGORIZED,
+            "type": type or "expense",
+            "total": amount,
+            "transaction_count": count
+        }
+        self._execute(
+            "INSERT INTO transaction_rollups "
+            "(user_id, year, month, category, type, total, transaction_count) "
+            "VALUES (:user_id, :year, :month, :category, :type, :total, :transaction_count) "
+            "ON CONFLICT (user_id, year, month, category, type) DO UPDATE SET "
+            "total = transaction_rollups.total + excluded.total, "
+            "transaction_count = transaction_rollups.transaction_count + excluded.transaction_count",
+            params
+        )
+        if count < 0:
+            self._execute(
+                "DELETE FROM transaction_rollups WHERE user_id = :user_id AND year = :year "
+                "AND month = :month AND category = :category AND type = :type "
+                "AND transaction_count <= 0",
+                params
+            )
+
+    # Stats
+
+    def monthly_totals(self, user_id, year, month):
+        """Return ``{type: total}`` for one month."""
+        return {
+            row["type"]: row["total"]
+            for row in self.monthly_series(user_id, (year, month), (year, month))
+        }
+
+    def lifetime_totals(self, user_id):
+        """Return ``{type: total}`` over all of the user's transactions."""
+        rows = self._fetchall(
+            "SELECT type, SUM(total) AS total FROM transaction_rollups "
+            "WHERE user_id = :user_id GROUP BY type",
+            {"user_id": user_id}
+        )
+        return {row["type"]: row["total"] for row in rows}
+
+    def monthly_series(self, user_id, start, end):
+        """Return ``(year, month, type, total)`` rows for the inclusive ``(year, month)`` range."""
+        return self._fetchall(
+            "SELECT year, month, type, SUM(total) AS total FROM transaction_rollups "
+            "WHERE user_id = :user_id AND (year, month) >= (:start_year, :start_month) "
+            "AND (year, month) <= (:end_year, :end_month) "
+            "GROUP BY year, month, type ORDER BY year, month",
+            {
+                "user_id": user_id,
+                "start_year": start[0],
+                "start_month": start[1],
+                "end_year": end[0],
+                "end_month": end[1]
+            }
+        )
+
+    def daily_totals(self, user_id, start, end):
+        """Return ``(day, type, total)`` rows for transactions dated in ``[start, end)``.
+
+        One statement, so every bucket comes from the same snapshot.
+        """
+        return self._fetchall(
+            "SELECT created_at AS day, type, SUM(amount) AS total FROM simple_transactions "
+            "WHERE user_id = :user_id AND created_at >= :start AND created_at < :end "
+            "GROUP BY created_at, type ORDER BY created_at",
+            {"user_id": user_id, "start": start, "end": end}
+        )
+
+    def totals_by_category(self, user_id, start=None, end=None, type=None, limit=None):
+        """Return ``(category, total)`` rows, optionally for a ``(year, month)`` range.
+
+        With ``limit`` only the largest categories are returned, biggest first.
+        """
+        where = ["user_id = :user_id"]
+        params = {"user_id": user_id}
+        if type is not None:
+            where.append("type = :type")
+            params["type"] = type
+        if start is not None:
+            where.append("(year, month) >= (:start_year, :start_month)")
+            params["start_year"], params["start_month"] = start
+        if end is not None:
+            where.append("(year, month) <= (:end_year, :end_month)")
+            params["end_year"], params["end_month"] = end
+        sql = (
+            "SELECT category, SUM(total) AS total FROM transaction_rollups "
+            f"WHERE {' AND '.join(where)} GROUP BY category"
+        )
+        if limit is not None:
+            sql += " ORDER BY total DESC, category LIMIT :limit"
+            params["limit"] = limit
+        else:
+            sql += " ORDER BY category"
+        return self._fetchall(sql, params)
+
+    # Data versions
+
+    def data_versions(self, scopes):
+        """Return ``{scope: version}``; scopes never written to are at 0."""
+        params = {f"scope_{index}": scope for index, scope in enumerate(scopes)}
+        rows = self._fetchall(
+            "SELECT scope, version FROM data_versions "
+            f"WHERE scope IN ({', '.join(':' + name for name in params)})",
+            params
+        )
+        versions = dict.fromkeys(scopes, 0)
+        versions.update((row["scope"], row["version"]) for row in rows)
+        return versions
+
+    def token_version(self, user_id):
+        """Return the user's token version (see ``security.TokenVersions``)."""
+        scope = auth_scope(user_id)
+        return self.data_versions([scope])[scope]
+
+    def revoke_tokens(self, user_id):
+        """Revoke every token issued to the user so far; returns the new version."""
+        self._bump_data_version(auth_scope(user_id))
+        return self.token_version(user_id)
+
+    def _bump_data_version(self, scope):
+        self._execute(
+            "INSERT INTO data_versions (scope, version) VALUES (:scope, 1) "
+            "ON CONFLICT (scope) DO UPDATE SET version = data_versions.version + 1",
+            {"scope": scope}
+        )
+
+    # Categories
+
+    def list_categories(self):
+        return self._fetchall("SELECT id, name, type FROM categories")
+
+    def get_category_by_name(self, name):
+        return self._fetchone(
+            "SELECT id, name, type FROM categories WHERE name = :name", {"name": name}
+        )
+
+    def create_category(self, user_id, name, type):
+        return self._insert(
+            "INSERT INTO categories (user_id, name, type, created_at) "
+            "VALUES (:user_id, :name, :type, :created_at)",
+            {"user_id": user_id, "name": name, "type": type, "created_at": datetime.utcnow()}
+        )
+
+    # Notifications
+
+    def list_notifications(self, user_id):
+        return self._fetchall(
+            "SELECT id, message, date FROM notifications "
+            "WHERE user_id = :user_id ORDER BY date DESC",
+            {"user_id": user_id}
+        )
+
+    def notifications_version(self, user_id):
+        """Return a value that changes when the user's notifications are added or removed.
+
+        Notifications are written outside the app, so no data version
+        tracks them; their count and highest id stand in for one.
+        """
+        row = self._fetchone(
+            "SELECT COUNT(*) AS count, MAX(id) AS last_id FROM notifications WHERE user_id = :user_id",
+            {"user_id": user_id}
+        )
+        return f"{row['count']}.{row['last_id'] or 0}"
+
+
+class SQLiteRepository(BaseRepository):
+    """Repository over a pooled ``sqlite3`` connection."""
+
+    dialect = 'sqlite'
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def _execute(self, sql, params=None):
+        return self.conn.execute(sql, params or {})
+
+    def _insert(self, sql, params):
+        return self.conn.execute(sql, params).lastrowid
+
+    def _executemany(self, sql, params_list):
+        self.conn.executemany(sql, params_list)
+
+    def _lock_transaction(self, transaction_id, user_id):
+        # Take the write lock before reading so the rollup sees the row we change
+        self._lock_rows(None, None)
+        return self.get_transaction(transaction_id, user_id)
+
+    def _lock_rows(self, where, params):
+        # SQLite locks the whole database; the selection does not matter
+        if not self.conn.in_transaction:
+            self.conn.execute("BEGIN IMMEDIATE")
+
+    def _commit(self):
+        self.conn.commit()
+
+
+class PostgresRepository(BaseRepository):
+    """Repository over the request's SQLAlchemy session (PostgreSQL).
+
+    Commits are left to pyramid_tm; ``commit()`` only flushes so that
+    statements are sent in order.
+    """
+
+    dialect = 'postgresql'
+
+    def __init__(self, dbsession):
+        self.dbsession = dbsession
+
+    def _execute(self, sql, params=None):
+        result = self.dbsession.execute(text(sql), params or {})
+        if result.returns_rows:
+            return _MappingResult(result)
+        return result
+
+    def _insert(self, sql, params):
+        return self.dbsession.execute(text(sql + " RETURNING id"), params).scalar()
+
+    def _executemany(self, sql, params_list):
+        # A list of parameter sets makes SQLAlchemy use the driver's executemany
+        self.dbsession.execute(text(sql), params_list)
+
+    def _lock_transaction(self, transaction_id, user_id):
+        return self._fetchone(
+            f"SELECT {TRANSACTION_COLUMNS} FROM simple_transactions "
+            "WHERE id = :id AND user_id = :user_id FOR UPDATE",
+            {"id": transaction_id, "user_id": user_id}
+        )
+
+    def _lock_rows(self, where, params):
+        self._execute(f"SELECT id FROM simple_transactions WHERE {where} FOR UPDATE", params).fetchall()
+
+    def _stream(self, sql, params=None, batch_size=DEFAULT_STREAM_BATCH_SIZE):
+        # Server-side cursor so only one batch is buffered at a time
+        result = self.dbsession.execute(
+            text(sql), params or {}, execution_options={"yield_per": batch_size}
+        )
+        for rows in result.mappings().partitions(batch_size):
+            yield rows
+
+    def _commit(self):
+        self.dbsession.flush()
+
+
+class _MappingResult:
+    """Give SQLAlchemy results the same row access as ``sqlite3.Row``."""
+
+    def __init__(self, result):
+        self.result = result
+        self.rowcount = result.rowcount
+
+    def fetchall(self):
+        return self.result.mappings().fetchall()
+
+    def fetchone(self):
+        return self.result.mappings().fetchone()
+
+    def fetchmany(self, size):
+        return self.result.mappings().fetchmany(size)
+
+
+class ReplicaRouter:
+    """Pick a read replica for safe requests.
+
+    Replicas are used round-robin. A user who wrote through the repository
+    is pinned to the primary for ``read_your_writes_seconds`` so they always
+    see their own changes.
+    """
+
+    MAX_TRACKED_WRITERS = 10000
+
+    def __init__(self, replicas, read_your_writes_seconds=DEFAULT_READ_YOUR_WRITES_SECONDS):
+        self.replicas = list(replicas)
+        self.read_your_writes_seconds = read_your_writes_seconds
+        self._cycle = itertools.cycle(self.replicas)
+        self._last_write = {}
+        self._lock = threading.Lock()
+
+    def choose(self, request):
+        """Return a replica for ``request`` or ``None`` to use the primary."""
+        if not self.replicas or request.method not in SAFE_METHODS:
+            return None
+        last_write = self._last_write.get(request_user_key(request))
+        if last_write is not None and time.monotonic() - last_write < self.read_your_writes_seconds:
+            return None
+        with self._lock:
+            return next(self._cycle)
+
+    def mark_write(self, user_key):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._last_write) >= self.MAX_TRACKED_WRITERS:
+                cutoff = now - self.read_your_writes_seconds
+                self._last_write = {
+                    key: written for key, written in self._last_write.items() if written >= cutoff
+                }
+            self._last_write[user_key] = now
+
+
+def _id_list_sql(ids, params):
+    placeholders = []
+    for index, value in enumerate(ids):
+        params[f"id_{index}"] = value
+        placeholders.append(f":id_{index}")
+    return f"id IN ({', '.join(placeholders)})"
+
+
+def _transaction_selection(user_id, ids=None, filters=None):
+    """Return ``(where_sql, params)`` for a bulk transaction selection."""
+    where, params = transaction_filter_sql(filters or {})
+    where.insert(0, "user_id = :user_id")
+    params["user_id"] = user_id
+    if ids is not None:
+        where.append(_id_list_sql(ids, params))
+    return ' AND '.join(where), params
+
+
+def _budget_selection(user_id, ids=None, category=None):
+    """Return ``(where_sql, params)`` for a bulk budget selection."""
+    where = ["user_id = :user_id"]
+    params = {"user_id": user_id}
+    if ids is not None:
+        where.append(_id_list_sql(ids, params))
+    if category is not None:
+        where.append("category = :category")
+        params["category"] = category
+    return ' AND '.join(where), params
+
+
+def rollup_period(created_at):
+    """Return ``(year, month)`` of a transaction date (``date`` or ISO string)."""
+    if hasattr(created_at, 'year'):
+        return created_at.year, created_at.month
+    return int(created_at[:4]), int(created_at[5:7])
+
+
+def request_user_key(request):
+    # Unauthenticated requests act as the default user 1, like the views do
+    return request.authenticated_userid or 1
+
+
+def user_scope(user_key):
+    return f'user:{user_key}'
+
+
+def auth_scope(user_id):
+    # Token version of the user; kept apart from the data scopes
+    return f'auth:{user_id}'
+
+
+def request_read_scopes(request):
+    """Return the data-version scopes a safe ``request``'s response depends on."""
+    scopes = [user_scope(request_user_key(request)), SHARED_SCOPE]
+    matched_route = getattr(request, 'matched_route', None)
+    if matched_route is not None and matched_route.name in BUDGET_ROUTES:
+        scopes.append(BUDGETS_SCOPE)
+    return scopes
+
+
+def request_write_scopes(request):
+    """Return the data-version scopes an unsafe ``request`` writes to."""
+    scopes = [user_scope(request_user_key(request))]
+    matched_route = getattr(request, 'matched_route', None)
+    if matched_route is not None and matched_route.name in SHARED_ROUTES:
+        scopes.append(SHARED_SCOPE)
+    return scopes
+
+
+def get_storage(settings):
+    """Return ``(backend, sqlite_path)`` from the ``momono.*`` settings."""
+    backend = settings.get('momono.storage', DEFAULT_STORAGE)
+    if backend not in ('sqlite', 'postgresql'):
+        raise ValueError(f'Unsupported momono.storage: {backend}')
+    return backend, settings.get('momono.sqlite_path', DEFAULT_SQLITE_PATH)
+
+
+def get_replica_router(settings):
+    """Build the replica router from ``momono.replica_*`` settings, if any."""
+    backend, sqlite_path = get_storage(settings)
+    window = float(settings.get('momono.read_your_writes_seconds', DEFAULT_READ_YOUR_WRITES_SECONDS))
+    if backend == 'postgresql':
+        from .models.meta import get_engine
+        replicas = [
+            sessionmaker(bind=get_engine(dict(settings, **{'sqlalchemy.url': url, 'models.create_all': 'false'})))
+            for url in aslist(settings.get('momono.replica_urls', ''))
+        ]
+    else:
+        replicas = aslist(settings.get('momono.replica_sqlite_paths', ''))
+    if not replicas:
+        return None
+    return ReplicaRouter(replicas, window)
+
+
+def get_repository(request):
+    """Return the repository for ``request``'s configured storage backend.
+
+    Safe requests may be routed to a read replica; unsafe requests record a
+    write so the same user reads from the primary for a while afterwards.
+    """
+    backend, sqlite_path = get_storage(request.registry.settings)
+    router = request.registry.get('momono.replica_router')
+    replica = None
+    if router is not None:
+        replica = router.choose(request)
+        if request.method not in SAFE_METHODS:
+            user_key = request_user_key(request)
+            request.add_finished_callback(lambda request: router.mark_write(user_key))
+
+    if backend == 'postgresql':
+        if replica is not None:
+            dbsession = replica()
+            request.add_finished_callback(lambda request: dbsession.close())
+            repo = PostgresRepository(dbsession)
+        else:
+            repo = PostgresRepository(request.dbsession)
+    else:
+        repo = SQLiteRepository(request_connection(request, replica or sqlite_path))
+    if request.method not in SAFE_METHODS:
+        repo.write_scopes = request_write_scopes(request)
+    return repo
+
+
+class detached_repository:
+    """Context manager for a repository that outlives the request.
+
+    Streaming responses are iterated by the WSGI server after pyramid_tm and
+    the finished callbacks have already released the request's connection,
+    so they need their own. The backend and replica are chosen eagerly,
+    while the request is still being handled::
+
+        opener = detached_repository(request)
+
+        def app_iter():
+            with opener as repo:
+                ...
+
+    ``primary=True`` always uses the primary database and never looks at
+    the request's user, so it is safe while the user is being authenticated.
+    """
+
+    def __init__(self, request, primary=False):
+        self.backend, self.sqlite_path = get_storage(request.registry.settings)
+        router = request.registry.get('momono.replica_router')
+        self.replica = router.choose(request) if router is not None and not primary else None
+        self.session_factory = request.registry.get('dbsession_factory')
+        self._release = None
+
+    def __enter__(self):
+        if self.backend == 'postgresql':
+            dbsession = (self.replica or self.session_factory)()
+            self._release = dbsession.close
+            return PostgresRepository(dbsession)
+        pool = get_pool(self.replica or self.sqlite_path)
+        conn = pool.acquire()
+        self._release = lambda: pool.release(conn)
+        return SQLiteRepository(conn)
+
+    def __exit__(self, exc_type, exc, tb):
+        self._release()
+        return False
+
+
+def includeme(config):
+    """Make ``request.repo`` available for use in Pyramid.
+
+    Activate this setup using ``config.include('.repository')``.
+    """
+    settings = config.get_settings()
+    backend, sqlite_path = get_storage(settings)
+    router = get_replica_router(settings)
+    config.registry['momono.replica_router'] = router
+    config.add_request_method(get_repository, 'repo', reify=True)
+    logger.info(f'Repository storage: {backend}' + (f' ({sqlite_path})' if backend == 'sqlite' else ''))
+    if router is not None:
+        logger.info(f'Routing safe requests to {len(router.replicas)} read replica(s)')
@@ -19,6 +19,9 @@ def includeme(config):
         
         # Transaction routes
         config.add_route('transactions', '/api/transactions')
+        # Must come before /api/transactions/{id} so "bulk"/"export" are not taken as ids
+        config.add_route('transactions_bulk', '/api/transactions/bulk')
+        config.add_route('transactions_export', '/api/transactions/export')
         config.add_route('transaction', '/api/transactions/{id}')
         
         # Category routes
@@ -27,6 +30,8 @@ def includeme(config):
         
         # Budget routes
         config.add_route('budgets', '/api/budgets')
+        # Must come before /api/budgets/{id} so "bulk" is not taken as an id
+        config.add_route('budgets_bulk', '/api/budgets/bulk')
         config.add_route('budget', '/api/budgets/{id}')
         config.add_route('named_budget', '/api/named-budgets')
         
@@ -41,6 +46,10 @@ def includeme(config):
         # Stats routes
         config.add_route('stats_monthly', '/api/stats/monthly')
         config.add_route('stats_by_category', '/api/stats/by-category')
+        config.add_route('stats_range', '/api/stats/range')
+        
+        # Dashboard route (all dashboard data in one response)
+        config.add_route('dashboard', '/api/dashboard')
         
         # Notification routes
         config.add_route('notifications', '/api/notifications')
@@ -0,0 +1,257 @@
+import logging
+import sqlite3
+import threading
+
+from sqlalchemy import inspect, text
+
+# Konfigurasi logging
+logger = logging.getLogger('momono.schema')
+logger.setLevel(logging.INFO)
+
+# Column types that differ between the supported backends
+DIALECT_TYPES = {
+    # SQLite has no date type; ISO-8601 text sorts and compares correctly
+    'sqlite': {'pk': 'INTEGER PRIMARY KEY AUTOINCREMENT', 'real': 'REAL', 'date': 'TEXT', 'datetime': 'DATETIME'},
+    'postgresql': {'pk': 'SERIAL PRIMARY KEY', 'real': 'DOUBLE PRECISION', 'date': 'DATE', 'datetime': 'TIMESTAMP'},
+}
+
+# Tables used by the repository, rendered per dialect
+SIMPLE_TABLES = {
+    'simple_budgets': '''
+        CREATE TABLE simple_budgets (
+            id {pk},
+            user_id INTEGER NOT NULL,
+            amount {real} NOT NULL,
+            name TEXT NOT NULL,
+            description TEXT,
+            category TEXT,
+            spent {real} NOT NULL DEFAULT 0
+        )
+    ''',
+    'simple_transactions': '''
+        CREATE TABLE simple_transactions (
+            id {pk},
+            user_id INTEGER NOT NULL,
+            amount {real} NOT NULL,
+            description TEXT,
+            created_at {date} NOT NULL,
+            category TEXT,
+            type TEXT DEFAULT 'expense',
+            budget_id INTEGER
+        )
+    ''',
+    # Per-month totals kept in step with simple_transactions by the repository
+    'transaction_rollups': '''
+        CREATE TABLE transaction_rollups (
+            user_id INTEGER NOT NULL,
+            year INTEGER NOT NULL,
+            month INTEGER NOT NULL,
+            category TEXT NOT NULL,
+            type TEXT NOT NULL,
+            total {real} NOT NULL DEFAULT 0,
+            transaction_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, year, month, category, type)
+        )
+    ''',
+    # Per-user (and shared) data versions, bumped with every write; used as
+    # cheap ETag validators
+    'data_versions': '''
+        CREATE TABLE data_versions (
+            scope TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''',
+}
+
+# Year and month of simple_transactions.created_at, per dialect
+PERIOD_EXPRESSIONS = {
+    'sqlite': {
+        'year': 'CAST(substr(created_at, 1, 4) AS INTEGER)',
+        'month': 'CAST(substr(created_at, 6, 2) AS INTEGER)',
+    },
+    'postgresql': {
+        'year': 'CAST(EXTRACT(YEAR FROM created_at) AS INTEGER)',
+        'month': 'CAST(EXTRACT(MONTH FROM created_at) AS INTEGER)',
+    },
+}
+
+# Fills a new transaction_rollups table from the existing transactions
+ROLLUP_BACKFILL = '''
+    INSERT INTO transaction_rollups (user_id, year, month, category, type, total, transaction_count)
+    SELECT user_id, {year}, {month}, COALESCE(category, 'Uncategorized'), COALESCE(type, 'expense'),
+           SUM(amount), COUNT(*)
+    FROM simple_transactions
+    GROUP BY user_id, {year}, {month}, COALESCE(category, 'Uncategorized'), COALESCE(type, 'expense')
+'''
+
+# On PostgreSQL these tables belong to the ORM models and Alembic
+SQLITE_ONLY_TABLES = {
+    'categories': '''
+        CREATE TABLE categories (
+            id {pk},
+            user_id INTEGER NOT NULL,
+            name VARCHAR(100) NOT NULL,
+            type VARCHAR(7),
+            created_at {datetime}
+        )
+    ''',
+    'notifications': '''
+        CREATE TABLE notifications (
+            id {pk},
+            user_id INTEGER NOT NULL,
+            message VARCHAR(255) NOT NULL,
+            date {datetime}
+        )
+    ''',
+}
+
+# Secondary indexes for the listing, filter and budget lookups. On
+# PostgreSQL they are only created together with a new table; existing
+# tables get them online through the Alembic migration 3c9d5b2e8a41.
+SIMPLE_INDEXES = {
+    'ix_simple_transactions_user_id_created_at_id': ('simple_transactions', 'user_id, created_at DESC, id DESC'),
+    'ix_simple_transactions_user_id_category': ('simple_transactions', 'user_id, category'),
+    'ix_simple_transactions_budget_id': ('simple_transactions', 'budget_id'),
+    'ix_simple_budgets_user_id': ('simple_budgets', 'user_id'),
+}
+
+# Recomputes simple_budgets.spent (expenses booked against each budget)
+BUDGET_SPENT_BACKFILL = '''
+    UPDATE simple_budgets SET spent = (
+        SELECT COALESCE(SUM(amount), 0) FROM simple_transactions
+        WHERE simple_transactions.budget_id = simple_budgets.id
+        AND COALESCE(simple_transactions.type, 'expense') = 'expense'
+    )
+'''
+
+# Columns added after the first release; older databases get them via ALTER TABLE
+SIMPLE_COLUMNS = {
+    'simple_budgets': {
+        'category': 'TEXT',
+        'spent': '{real} NOT NULL DEFAULT 0',
+    },
+    'simple_transactions': {
+        'category': 'TEXT',
+        'type': "TEXT DEFAULT 'expense'",
+        'budget_id': 'INTEGER',
+    },
+}
+
+
+class SimpleSchemaManager:
+    """Create and migrate the repository tables once per database.
+
+    The result is remembered for the life of the process so that request
+    handlers never have to look at ``sqlite_master`` or ``PRAGMA table_info``.
+    """
+
+    def __init__(self):
+        self._ready = set()
+        self._lock = threading.Lock()
+
+    def is_ready(self, path):
+        return path in self._ready
+
+    def ensure(self, path):
+        """Create missing tables and columns in the database at ``path``."""
+        if path in self._ready:
+            return
+        with self._lock:
+            if path in self._ready:
+                return
+            conn = sqlite3.connect(path)
+            try:
+                self._migrate(_SQLiteConnection(conn), 'sqlite')
+                conn.commit()
+            finally:
+                conn.close()
+            self._ready.add(path)
+            logger.info(f'Simple schema ready in {path}')
+
+    def ensure_engine(self, engine):
+        """Create missing simple_* tables and columns through a SQLAlchemy engine."""
+        key = str(engine.url)
+        if key in self._ready:
+            return
+        with self._lock:
+            if key in self._ready:
+                return
+            with engine.begin() as conn:
+                self._migrate(_EngineConnection(conn), engine.dialect.name)
+            self._ready.add(key)
+            logger.info(f'Simple schema ready in {engine.url!r}')
+
+    def reset(self):
+        """Forget which databases were checked (used by tests)."""
+        with self._lock:
+            self._ready.clear()
+
+    def _migrate(self, conn, dialect):
+        if dialect == 'sqlite':
+            tables = dict(SIMPLE_TABLES, **SQLITE_ONLY_TABLES)
+        else:
+            tables = SIMPLE_TABLES
+        types = DIALECT_TYPES[dialect]
+        existing = conn.table_names()
+        created = set()
+        backfill_spent = False
+        for table, ddl in tables.items():
+            if table not in existing:
+                conn.execute(ddl.format(**types))
+                created.add(table)
+                logger.info(f'Created {table} table')
+                continue
+            columns = conn.column_names(table)
+            for column, column_type in SIMPLE_COLUMNS.get(table, {}).items():
+                if column not in columns:
+                    conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {column_type.format(**types)}')
+                    logger.info(f'Added {column} column to {table} table')
+                    if (table, column) == ('simple_budgets', 'spent'):
+                        backfill_spent = True
+
+        if backfill_spent and 'simple_transactions' in existing:
+            conn.execute(BUDGET_SPENT_BACKFILL)
+            logger.info('Backfilled simple_budgets.spent from simple_transactions')
+
+        if 'transaction_rollups' in created and 'simple_transactions' not in created:
+            conn.execute(ROLLUP_BACKFILL.format(**PERIOD_EXPRESSIONS[dialect]))
+            logger.info('Backfilled transaction_rollups from simple_transactions')
+
+        for name, (table, columns) in SIMPLE_INDEXES.items():
+            if dialect == 'sqlite' or table in created:
+                conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})')
+
+
+class _SQLiteConnection:
+    """Catalog lookups for a ``sqlite3`` connection."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql):
+        return self.conn.execute(sql)
+
+    def table_names(self):
+        return {row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+
+    def column_names(self, table):
+        return {row[1] for row in self.conn.execute(f'PRAGMA table_info({table})')}
+
+
+class _EngineConnection:
+    """Catalog lookups for a SQLAlchemy connection."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql):
+        return self.conn.execute(text(sql))
+
+    def table_names(self):
+        return set(inspect(self.conn).get_table_names())
+
+    def column_names(self, table):
+        return {column['name'] for column in inspect(self.conn).get_columns(table)}
+
+
+schema_manager = SimpleSchemaManager()
@@ -0,0 +1,79 @@
+import argparse
+import datetime
+import decimal
+import json
+import sys
+import timeit
+
+from .. import renderers
+from ..models.models import TransactionType
+
+# Constants
+DEFAULT_ROWS = 1000
+DEFAULT_REPEAT = 50
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description='Compare the stdlib JSON renderer with the FastJSON renderer.'
+    )
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS, help='Transactions per payload')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='Renders per measurement')
+    return parser.parse_args(argv[1:])
+
+
+def sample_rows(count):
+    """Return rows shaped like a transaction listing, with native values."""
+    today = datetime.date(2025, 5, 1)
+    return [
+        {
+            'id': i,
+            'amount': decimal.Decimal(f'{i % 500}.25'),
+            'description': f'Transaction {i}',
+            'date': today - datetime.timedelta(days=i % 365),
+            'created_at': datetime.datetime(2025, 5, 1, 12, 30) - datetime.timedelta(minutes=i),
+            'category': ('Food', 'Transport', 'Bills')[i % 3],
+            'type': TransactionType.expense if i % 4 else TransactionType.income,
+            'budget_id': i % 7 or None,
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def stdlib_render(rows):
+    """What views did before: convert every field by hand, then json.dumps."""
+    payload = {
+        'transactions': [
+            dict(
+                row,
+                amount=float(row['amount']),
+                date=row['date'].isoformat(),
+                created_at=row['created_at'].isoformat(),
+                type=row['type'].value,
+            )
+            for row in rows
+        ]
+    }
+    return json.dumps(payload).encode('utf-8')
+
+
+def fast_render(rows):
+    return renderers.dumps({'transactions': rows})
+
+
+def main(argv=sys.argv):
+    args = parse_args(argv)
+    rows = sample_rows(args.rows)
+    if json.loads(stdlib_render(rows)) != json.loads(fast_render(rows)):
+        print('Renderers disagree on the sample payload')
+        return 1
+
+    encoder = 'orjson' if renderers.orjson is not None else 'stdlib json (orjson not installed)'
+    print(f'{args.rows} rows x {args.repeat} renders, FastJSON using {encoder}')
+    results = {}
+    for name, render in (('stdlib', stdlib_render), ('fast', fast_render)):
+        seconds = min(timeit.repeat(lambda: render(rows), number=args.repeat, repeat=3))
+        results[name] = seconds
+        print(f'  {name:<7} {seconds / args.repeat * 1000:8.3f} ms per render')
+    print(f'  speedup {results["stdlib"] / results["fast"]:.1f}x')
+    return 0
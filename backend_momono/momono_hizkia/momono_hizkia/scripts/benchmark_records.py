@@ -0,0 +1,96 @@
+import argparse
+import sqlite3
+import sys
+import timeit
+import tracemalloc
+
+from .. import renderers
+from ..records import TransactionRecord, row_serializer
+
+# Constants
+DEFAULT_ROWS = 10000
+DEFAULT_REPEAT = 20
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description='Compare ways of serializing transaction rows: allocations and encode time.'
+    )
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS, help='Rows per listing')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='Encodes per measurement')
+    return parser.parse_args(argv[1:])
+
+
+def sample_rows(count):
+    """Return sqlite3.Row rows shaped like simple_transactions rows."""
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    conn.execute(
+        'CREATE TABLE simple_transactions '
+        '(id, user_id, amount, description, created_at, category, type, budget_id)'
+    )
+    conn.executemany(
+        'INSERT INTO simple_transactions VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        [
+            (
+                i, 1, float(i % 500), f'Transaction {i}', f'2025-05-{i % 28 + 1:02d}',
+                ('Food', 'Transport', None)[i % 3], None if i % 5 else 'income', i % 7 or None,
+            )
+            for i in range(1, count + 1)
+        ]
+    )
+    rows = conn.execute('SELECT * FROM simple_transactions').fetchall()
+    conn.close()
+    return rows
+
+
+def row_to_dict(row):
+    """The per-view conversion the record layer replaced."""
+    return {
+        'id': row['id'],
+        'amount': row['amount'],
+        'description': row['description'],
+        'date': str(row['created_at']),
+        'created_at': str(row['created_at']),
+        'category': row['category'] or 'Uncategorized',
+        'type': row['type'] or 'expense',
+        'budget_id': row['budget_id'],
+    }
+
+
+def allocated(convert, rows):
+    """Return ``(blocks, bytes)`` still held by the converted listing."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    converted = [convert(row) for row in rows]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, 'filename')
+    del converted
+    return sum(stat.count_diff for stat in stats), sum(stat.size_diff for stat in stats)
+
+
+def main(argv=sys.argv):
+    args = parse_args(argv)
+    rows = sample_rows(args.rows)
+    candidates = (
+        ('dict', row_to_dict),
+        ('record', TransactionRecord.from_row),
+        ('row_ser', row_serializer(TransactionRecord)),
+    )
+    encoded = {renderers.dumps([convert(row) for row in rows]) for name, convert in candidates}
+    if len(encoded) != 1:
+        print('Serializers disagree on the sample rows')
+        return 1
+
+    encoder = 'orjson' if renderers.orjson is not None else 'stdlib json (orjson not installed)'
+    print(f'{args.rows} rows, encoding with {encoder}')
+    for name, convert in candidates:
+        blocks, size = allocated(convert, rows)
+        seconds = min(timeit.repeat(
+            lambda: renderers.dumps([convert(row) for row in rows]), number=args.repeat, repeat=3
+        ))
+        per_row = seconds / args.repeat / args.rows * 1e6
+        print(f'  {name:<7} {blocks / args.rows:5.2f} blocks/row  {size / args.rows:7.1f} bytes/row'
+              f'  {per_row:6.3f} us/row (convert + encode)')
+    return 0
@@ -0,0 +1,103 @@
+import argparse
+import os
+import sqlite3
+import sys
+
+from pyramid.paster import bootstrap, setup_logging
+
+from ..repository import BUDGETS_SCOPE, SHARED_SCOPE, user_scope
+
+# Constants
+# Where the simple_* views kept their tables before the repository layer
+LEGACY_FILENAME = 'momono_hizkia.sqlite'
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description='Copy budgets and transactions from the pre-repository SQLite file, once.'
+    )
+    parser.add_argument(
+        'config_uri',
+        help='Configuration file, e.g., development.ini',
+    )
+    parser.add_argument(
+        '--source',
+        help=f'Old database (default: {LEGACY_FILENAME} next to the configuration file)',
+    )
+    return parser.parse_args(argv[1:])
+
+
+def import_scope(source):
+    # Marks a finished import in data_versions, so running again is a no-op
+    return f'legacy_import:{os.path.basename(source)}'
+
+
+def _rows(conn, table):
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    if table not in tables:
+        return []
+    cursor = conn.execute(f'SELECT * FROM {table} ORDER BY id')
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor]
+
+
+def import_legacy(repo, source):
+    """Copy ``simple_budgets``/``simple_transactions`` of ``source`` into ``repo``.
+
+    Rows get new ids; transactions keep pointing at their copied budget.
+    They go through the repository, so budget ``spent`` totals and the
+    rollups are kept up to date. Returns ``(budgets, transactions)``
+    copied, or ``None`` when ``source`` was imported before.
+    """
+    scope = import_scope(source)
+    if repo.data_versions([scope])[scope]:
+        return None
+
+    conn = sqlite3.connect(f'file:{source}?mode=ro', uri=True)
+    try:
+        budgets = _rows(conn, 'simple_budgets')
+        transactions = _rows(conn, 'simple_transactions')
+    finally:
+        conn.close()
+
+    budget_ids = {}
+    users = set()
+    for budget in budgets:
+        budget_ids[budget['id']] = repo.create_budget(
+            budget['user_id'], budget['amount'], budget['name'],
+            budget.get('description') or '', budget.get('category') or ''
+        )
+        users.add(budget['user_id'])
+    for row in transactions:
+        # Old tables named the column date; the budget link came later
+        created_at = row.get('created_at') or row.get('date')
+        repo.create_transaction(
+            row['user_id'], row['amount'], row.get('description') or '', created_at,
+            row.get('category'), row.get('type'), budget_ids.get(row.get('budget_id'))
+        )
+        users.add(row['user_id'])
+
+    repo.write_scopes = [user_scope(user_id) for user_id in sorted(users)] + [SHARED_SCOPE, BUDGETS_SCOPE, scope]
+    repo.commit()
+    return len(budgets), len(transactions)
+
+
+def main(argv=sys.argv):
+    args = parse_args(argv)
+    setup_logging(args.config_uri)
+    source = args.source or os.path.join(os.path.dirname(os.path.abspath(args.config_uri)), LEGACY_FILENAME)
+    if not os.path.exists(source):
+        print(f'Nothing to import: {source} does not exist')
+        return
+
+    env = bootstrap(args.config_uri)
+    try:
+        # The transaction manager commits for PostgreSQL storage
+        with env['request'].tm:
+            copied = import_legacy(env['request'].repo, source)
+    finally:
+        env['closer']()
+    if copied is None:
+        print(f'{source} was already imported')
+    else:
+        print(f'Imported {copied[0]} budget(s) and {copied[1]} transaction(s) from {source}')
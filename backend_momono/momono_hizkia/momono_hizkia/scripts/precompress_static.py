@@ -0,0 +1,55 @@
+import argparse
+import os
+import sys
+
+from ..compression import brotli, compress
+
+# Constants
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.mjs', '.json', '.map', '.svg', '.html', '.txt', '.csv')
+DEFAULT_STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+MIN_SIZE = 1024
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description='Write .gz (and .br when brotli is installed) siblings of static files.'
+    )
+    parser.add_argument(
+        'directory',
+        nargs='?',
+        default=DEFAULT_STATIC_DIR,
+        help='Static directory (default: the package static directory)',
+    )
+    return parser.parse_args(argv[1:])
+
+
+def precompress(directory):
+    """Compress every text asset in ``directory`` whose siblings are missing or older."""
+    encodings = [('.gz', 'gzip')] + ([('.br', 'br')] if brotli is not None else [])
+    written = 0
+    for root, dirs, files in os.walk(directory):
+        for filename in files:
+            if not filename.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            path = os.path.join(root, filename)
+            if os.path.getsize(path) < MIN_SIZE:
+                continue
+            with open(path, 'rb') as f:
+                body = None
+                for suffix, encoding in encodings:
+                    target = path + suffix
+                    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                        continue
+                    if body is None:
+                        body = f.read()
+                    # Assets are compressed once, so use the slowest, smallest settings
+                    with open(target, 'wb') as out:
+                        out.write(compress(body, encoding, gzip_level=9, brotli_quality=11))
+                    written += 1
+    return written
+
+
+def main(argv=sys.argv):
+    args = parse_args(argv)
+    written = precompress(args.directory)
+    print(f'Wrote {written} precompressed file(s) in {args.directory}')
@@ -0,0 +1,193 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import bcrypt
+
+# Konfigurasi logging
+logger = logging.getLogger('momono.security.passwords')
+logger.setLevel(logging.INFO)
+
+# Constants
+DEFAULT_BCRYPT_ROUNDS = 12
+DEFAULT_BCRYPT_WORKERS = min(4, os.cpu_count() or 1)
+DEFAULT_BCRYPT_MAX_QUEUE = 16
+DEFAULT_BCRYPT_TIMEOUT = 10.0
+
+# One hasher per process, replaced by ``configure``
+_hasher = None
+_hasher_lock = threading.Lock()
+
+
+class PasswordBusy(Exception):
+    """Raised when the password queue is full or a job waited too long."""
+
+
+class _Timing:
+    """Count, total and maximum of a duration, in seconds."""
+
+    __slots__ = ('count', 'total', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def as_dict(self):
+        average = self.total / self.count if self.count else 0.0
+        return {'count': self.count, 'avg_ms': average * 1000, 'max_ms': self.max * 1000}
+
+
+class PasswordHasher:
+    """bcrypt hashing on a small, bounded pool of worker threads.
+
+    bcrypt releases the GIL while it works, so ``workers`` threads keep at
+    most that many cores busy with password work whatever the number of
+    request threads. At most ``max_queue`` more jobs may wait for a
+    worker; beyond that, or after waiting ``timeout`` seconds, callers get
+    ``PasswordBusy`` at once instead of tying up their request thread.
+    """
+
+    def __init__(self, rounds=DEFAULT_BCRYPT_ROUNDS, workers=DEFAULT_BCRYPT_WORKERS,
+                 max_queue=DEFAULT_BCRYPT_MAX_QUEUE, timeout=DEFAULT_BCRYPT_TIMEOUT):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.queue_wait = _Timing()
+        self.hash_time = _Timing()
+        self.verify_time = _Timing()
+
+    def hash(self, password):
+        """Return the bcrypt hash of ``password`` with the configured cost."""
+        return self._run(self.hash_time, _hash, password, self.rounds)
+
+    def verify(self, password, hashed):
+        return self._run(self.verify_time, _verify, password, hashed)
+
+    def needs_rehash(self, hashed):
+        """Whether ``hashed`` was made with a cost other than the configured one."""
+        try:
+            # $2b$12$<salt+hash>
+            return int(hashed.split('$')[2]) != self.rounds
+        except (AttributeError, IndexError, ValueError):
+            return True
+
+    def _run(self, timing, func, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            logger.warning(f'Password queue full ({self._pending} jobs)')
+            raise PasswordBusy('Too many password operations in progress')
+
+        queued_at = time.monotonic()
+
+        def job():
+            started = time.monotonic()
+            try:
+                return func(*args)
+            finally:
+                finished = time.monotonic()
+                with self._lock:
+                    self.queue_wait.add(started - queued_at)
+                    timing.add(finished - started)
+
+        with self._lock:
+            self._pending += 1
+        future = self._executor.submit(job)
+        future.add_done_callback(self._done)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # Drop the job if no worker picked it up yet
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            raise PasswordBusy('Password operation timed out')
+
+    def _done(self, future):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def stats(self):
+        """Return queue counters and hashing/queue-wait latencies."""
+        with self._lock:
+            return {
+                'rounds': self.rounds,
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'pending': self._pending,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+                'queue_wait': self.queue_wait.as_dict(),
+                'hash': self.hash_time.as_dict(),
+                'verify': self.verify_time.as_dict(),
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _verify(password, hashed):
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+
+def get_hasher():
+    """Return the process hasher, creating one with default settings if needed."""
+    global _hasher
+    if _hasher is None:
+        with _hasher_lock:
+            if _hasher is None:
+                _hasher = PasswordHasher()
+    return _hasher
+
+
+def password_stats():
+    """Return the counters of the process hasher."""
+    return get_hasher().stats()
+
+
+def configure(settings):
+    """Replace the process hasher according to the ``security.bcrypt_*`` settings."""
+    global _hasher
+    hasher = PasswordHasher(
+        rounds=int(settings.get('security.bcrypt_rounds', DEFAULT_BCRYPT_ROUNDS)),
+        workers=int(settings.get('security.bcrypt_workers', DEFAULT_BCRYPT_WORKERS)),
+        max_queue=int(settings.get('security.bcrypt_max_queue', DEFAULT_BCRYPT_MAX_QUEUE)),
+        timeout=float(settings.get('security.bcrypt_timeout', DEFAULT_BCRYPT_TIMEOUT)),
+    )
+    with _hasher_lock:
+        previous, _hasher = _hasher, hasher
+    if previous is not None:
+        previous.shutdown()
+    logger.info(
+        f'Password hashing: bcrypt cost {hasher.rounds}, {hasher.workers} workers, '
+        f'queue {hasher.max_queue}'
+    )
+    return hasher
+
+
+def includeme(config):
+    """Configure the bcrypt worker pool.
+
+    Activate this setup using ``config.include('.security.passwords')``.
+    """
+    configure(config.get_settings())
@@ -1,8 +1,13 @@
-import bcrypt
 import jwt
 import datetime
+import hashlib
 import logging
-from pyramid.httpexceptions import HTTPUnauthorized, HTTPForbidden
+import threading
+import time
+from collections import OrderedDict
+
+from .passwords import PasswordBusy, get_hasher
+from pyramid.httpexceptions import HTTPUnauthorized, HTTPForbidden, HTTPServiceUnavailable
 from pyramid.security import Allow, Deny, Everyone, Authenticated
 
 # Konfigurasi logging
@@ -12,6 +17,28 @@ logger.setLevel(logging.INFO)
 # Constants
 SECRET_KEY = 'godblessyou'  # Ganti dengan secret yang aman
 TOKEN_EXPIRY_HOURS = 1
+DEFAULT_TOKEN_CACHE_SIZE = 10000
+# Lifetime of cached claims of tokens that carry no exp
+DEFAULT_TOKEN_CACHE_TTL = 300
+# How long a user's token version is trusted before it is read again
+DEFAULT_TOKEN_VERSION_TTL = 30
+
+# Roles carried in the token and the permissions they grant
+DEFAULT_ROLES = ('user',)
+ROLE_PERMISSIONS = {
+    'user': (
+        'authenticated',
+        'user',
+        'view_dashboard',
+        'manage_budgets',
+        'view',
+        'create',
+        'edit',
+        'delete',
+        'manage_users',
+        'manage_settings',
+    ),
+}
 
 # Permission constants
 PERMISSIONS = {
@@ -26,13 +53,22 @@ PERMISSIONS = {
     'MANAGE_SETTINGS': 'manage_settings'
 }
 
+def _password_busy():
+    return HTTPServiceUnavailable(
+        json_body={'error': 'Server busy, please retry'},
+        headers={'Retry-After': '1'}
+    )
+
 def hash_password(plain_password: str) -> str:
-    """Hash password menggunakan bcrypt."""
+    """Hash password menggunakan bcrypt (on the password worker pool)."""
     try:
         logger.info('Hashing password')
-        hashed = bcrypt.hashpw(plain_password.encode('utf-8'), bcrypt.gensalt())
+        hashed = get_hasher().hash(plain_password)
         logger.info('Password hashed successfully')
-        return hashed.decode('utf-8')
+        return hashed
+    except PasswordBusy as e:
+        logger.warning(f'Password hashing rejected: {str(e)}')
+        raise _password_busy()
     except Exception as e:
         logger.error(f'Error hashing password: {str(e)}')
         raise HTTPForbidden('Password hashing failed')
@@ -41,19 +77,34 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify password dengan hash yang ada."""
     try:
         logger.info('Verifying password')
-        result = bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+        result = get_hasher().verify(plain_password, hashed_password)
         logger.info(f'Password verification result: {result}')
         return result
+    except PasswordBusy as e:
+        logger.warning(f'Password verification rejected: {str(e)}')
+        raise _password_busy()
     except Exception as e:
         logger.error(f'Error verifying password: {str(e)}')
         raise HTTPForbidden('Password verification failed')
 
-def create_jwt_token(user_id: str, expire_hours: int = TOKEN_EXPIRY_HOURS) -> str:
-    """Create JWT token untuk user."""
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Whether the hash was made with a bcrypt cost other than the configured one."""
+    return get_hasher().needs_rehash(hashed_password)
+
+def create_jwt_token(user_id: str, expire_hours: int = TOKEN_EXPIRY_HOURS,
+                     roles=DEFAULT_ROLES, version: int = 0) -> str:
+    """Create JWT token untuk user.
+
+    The signed ``roles`` and token ``ver`` claims let requests be
+    authorized without loading the user (see ``TokenVersions``).
+    """
     try:
         logger.info(f'Creating JWT token for user_id: {user_id}')
         payload = {
-            'sub': user_id,
+            # PyJWT only accepts string subjects (RFC 7519)
+            'sub': str(user_id),
+            'roles': list(roles),
+            'ver': version,
             'iat': datetime.datetime.utcnow(),
             'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=expire_hours)
         }
@@ -81,6 +132,21 @@ def decode_jwt_token(token: str) -> dict:
         logger.error(f'Error decoding JWT token: {str(e)}')
         raise HTTPUnauthorized('Invalid token')
 
+def issue_token(request, user_id: int) -> str:
+    """Create a token for ``user_id`` carrying their current token version."""
+    versions = request.registry.get('momono.token_versions')
+    version = versions.current(request, user_id, refresh=True) if versions is not None else 0
+    return create_jwt_token(user_id, version=version)
+
+def role_permissions(roles):
+    """Return the permissions granted by ``roles``, without duplicates."""
+    permissions = []
+    for role in roles:
+        for permission in ROLE_PERMISSIONS.get(role, ()):
+            if permission not in permissions:
+                permissions.append(permission)
+    return permissions
+
 def groupfinder(user_id, request):
     """Function to find user groups/roles."""
     try:
@@ -93,92 +159,155 @@ def groupfinder(user_id, request):
         logger.error(f'Error in groupfinder: {str(e)}')
         return []
 
+class TokenCache:
+    """Bounded, process-wide LRU of verified token -> claims.
+
+    Entries are keyed by the SHA-256 of the token, so tokens are not kept
+    in memory, and expire with the token's ``exp`` (or after ``ttl``
+    seconds for tokens without one). Only tokens that passed
+    ``jwt.decode`` are stored.
+    """
+
+    def __init__(self, max_entries=DEFAULT_TOKEN_CACHE_SIZE, ttl=DEFAULT_TOKEN_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(token):
+        return hashlib.sha256(token.encode('utf-8')).digest()
+
+    def get(self, token):
+        key = self.key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            claims, expires = entry
+            if expires <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return claims
+
+    def set(self, token, claims):
+        if self.max_entries <= 0:
+            return
+        exp = claims.get('exp')
+        expires = exp if isinstance(exp, (int, float)) else time.time() + self.ttl
+        key = self.key(token)
+        with self._lock:
+            self._entries[key] = (claims, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+            }
+
+
+class TokenVersions:
+    """In-memory cache of each user's current token version.
+
+    Tokens carry the version their user had when they were issued (the
+    ``ver`` claim); bumping the version (logout) revokes all of them.
+    ``load(request, user_id)`` reads the stored version and is called at
+    most once per ``ttl`` seconds per user, so a revocation made by
+    another process is seen within ``ttl`` seconds and one made by this
+    process immediately.
+    """
+
+    def __init__(self, load, ttl=DEFAULT_TOKEN_VERSION_TTL):
+        self.load = load
+        self.ttl = ttl
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def current(self, request, user_id, refresh=False):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._versions.get(user_id)
+        if entry is not None and not refresh and entry[1] > now:
+            return entry[0]
+        version = self.load(request, user_id)
+        self.loads += 1
+        self.remember(user_id, version)
+        return version
+
+    def remember(self, user_id, version):
+        with self._lock:
+            self._versions[user_id] = (version, time.monotonic() + self.ttl)
+
+    def is_current(self, request, user_id, claims):
+        return claims.get('ver', 0) >= self.current(request, user_id)
+
+
+# Marks a request whose token was already looked at (the claims may be None)
+_UNSET = object()
+
+
 class JWTAuthenticationPolicy:
-    def __init__(self, secret: str):
+    def __init__(self, secret: str, token_cache: TokenCache = None, token_versions: TokenVersions = None):
         """Initialize JWT authentication policy."""
         self.secret = secret
+        self.token_cache = token_cache if token_cache is not None else TokenCache()
+        self.token_versions = token_versions
         self.logger = logging.getLogger('momono.security.jwt')
         self.logger.setLevel(logging.INFO)
-        
-    def unauthenticated_userid(self, request):
-        """Get user ID from JWT token."""
-        try:
-            auth = request.headers.get('Authorization')
-            if not auth:
-                self.logger.warning('No Authorization header found')
-                return None
-                
-            if not auth.startswith('Bearer '):
-                self.logger.warning('Invalid authorization header format')
-                return None
-                
-            token = auth.split(' ')[1]
-            if not token:
-                self.logger.warning('No token found in authorization header')
-                return None
-                
-            try:
-                payload = jwt.decode(token, self.secret, algorithms=['HS256'])
-                user_id = payload.get('sub')
-                self.logger.info(f'Successfully authenticated user_id: {user_id}')
-                return user_id
-                
-            except jwt.ExpiredSignatureError:
-                self.logger.error('Token has expired')
-                raise HTTPUnauthorized('Token has expired')
-                
-            except jwt.InvalidTokenError:
-                self.logger.error('Invalid token')
-                raise HTTPUnauthorized('Invalid token')
-                
-            except Exception as e:
-                self.logger.error(f'Error decoding JWT token: {str(e)}')
-                raise HTTPUnauthorized('Invalid token')
-                
-        except Exception as e:
-            self.logger.error(f'Error in unauthenticated_userid: {str(e)}')
-            return None
 
-    def authenticated_userid(self, request):
-        """Get authenticated user ID."""
-        return self.unauthenticated_userid(request)
+    def claims(self, request):
+        """Return the verified claims of the request's bearer token, or None.
 
-    def effective_principals(self, request):
-        """Get effective principals (permissions) for user."""
+        The result is kept on the request, so the header is parsed once per
+        request however often the user id is asked for, and verified
+        tokens are kept in ``token_cache`` so a token is verified once
+        until it expires. Tokens of a revoked version count as no token.
+        """
+        claims = getattr(request, '_momono_jwt_claims', _UNSET)
+        if claims is _UNSET:
+            claims = self._decode(request)
+            if claims and not self._is_current(request, claims):
+                claims = None
+            request._momono_jwt_claims = claims
+        return claims
+
+    def _is_current(self, request, claims):
+        if self.token_versions is None or 'ver' not in claims:
+            return True
+        user_id = self._user_id(claims)
         try:
-            user_id = self.authenticated_userid(request)
-            if not user_id:
-                self.logger.info('No authenticated user')
-                return [Everyone]
-                
-            user = request.dbsession.query(User).filter_by(id=user_id).first()
-            if not user:
-                self.logger.error(f'User with ID {user_id} not found')
-                return [Everyone]
-                
-            principals = [
-                Everyone,
-                Authenticated,
-                'authenticated',
-                'user',
-                'view',
-                'create',
-                'edit',
-                'delete',
-                'view_dashboard',
-                'manage_budgets',
-                'manage_users',
-                'manage_settings'
-            ]
-            
-            self.logger.info(f'User {user_id} has principals: {principals}')
-            return principals
-            
+            if self.token_versions.is_current(request, user_id, claims):
+                return True
         except Exception as e:
-            self.logger.error(f'Error getting effective principals: {str(e)}')
-            return [Everyone]
+            self.logger.error(f'Error checking token version: {str(e)}')
+            return False
+        self.logger.warning(f'Revoked token for user_id: {user_id}')
+        return False
 
-    def unauthenticated_userid(self, request):
+    @staticmethod
+    def _user_id(claims):
+        user_id = claims.get('sub')
+        # Subjects are strings in the token; user ids are integers everywhere else
+        return int(user_id) if isinstance(user_id, str) and user_id.isdigit() else user_id
+
+    def _decode(self, request):
         try:
             auth = request.headers.get('Authorization')
             if not auth:
@@ -190,11 +319,15 @@ class JWTAuthenticationPolicy:
                 self.logger.warning('Invalid token format')
                 return None
             
+            claims = self.token_cache.get(token)
+            if claims is not None:
+                return claims
+            
             try:
-                payload = jwt.decode(token, self.secret, algorithms=['HS256'])
-                user_id = payload.get('sub')
-                self.logger.info(f'Successfully authenticated user_id: {user_id}')
-                return user_id
+                claims = jwt.decode(token, self.secret, algorithms=['HS256'])
+                self.token_cache.set(token, claims)
+                self.logger.info(f"Successfully authenticated user_id: {claims.get('sub')}")
+                return claims
                 
             except jwt.ExpiredSignatureError:
                 self.logger.error('Token has expired')
@@ -212,6 +345,12 @@ class JWTAuthenticationPolicy:
             self.logger.error(f'Error in unauthenticated_userid: {str(e)}')
             return None
 
+    def unauthenticated_userid(self, request):
+        claims = self.claims(request)
+        if not claims:
+            return None
+        return self._user_id(claims)
+
     def authenticated_userid(self, request):
         return self.unauthenticated_userid(request)
 
@@ -222,4 +361,4 @@ class JWTAuthenticationPolicy:
             principals.append(Authenticated)
             principals.append(f'user:{user_id}')
             self.logger.info(f'User {user_id} has principals: {principals}')
-        return principals
\ No newline at end of file
+        return principals
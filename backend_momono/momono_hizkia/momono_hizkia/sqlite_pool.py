@@ -0,0 +1,212 @@
+import logging
+import queue
+import sqlite3
+import threading
+
+# Konfigurasi logging
+logger = logging.getLogger('momono.sqlite_pool')
+logger.setLevel(logging.INFO)
+
+# Constants
+DEFAULT_POOL_SIZE = 5
+DEFAULT_POOL_TIMEOUT = 30.0
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 268435456,   # 256 MB
+    'cache_size': -20000,     # ~20 MB (negative value = KiB)
+    'busy_timeout': 5000,     # ms
+}
+
+# Pools are shared per database file for the whole process
+_pools = {}
+_pools_lock = threading.Lock()
+_pool_settings = {
+    'size': DEFAULT_POOL_SIZE,
+    'timeout': DEFAULT_POOL_TIMEOUT,
+    'pragmas': dict(DEFAULT_PRAGMAS),
+}
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the pool timeout."""
+
+
+class SQLitePool:
+    """Thread-aware pool of warm, pre-configured SQLite connections.
+
+    Connections are created lazily up to ``size`` and configured once with
+    the pool PRAGMAs. Idle connections are reused LIFO so the hottest page
+    cache is handed out first.
+    """
+
+    def __init__(self, path, size=DEFAULT_POOL_SIZE, timeout=DEFAULT_POOL_TIMEOUT, pragmas=None):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        logger.info(f'Opened pooled SQLite connection to {self.path}')
+        return conn
+
+    def acquire(self):
+        """Check out a connection, creating or waiting for one if needed."""
+        try:
+            conn = self._idle.get_nowait()
+            with self._lock:
+                self.hits += 1
+                self._in_use += 1
+            return conn
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+                self.misses += 1
+                self._in_use += 1
+            else:
+                self.waits += 1
+
+        if can_create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                    self._in_use -= 1
+                raise
+
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise PoolTimeout(f'No SQLite connection available for {self.path} after {self.timeout}s')
+        with self._lock:
+            self._in_use += 1
+        return conn
+
+    def release(self, conn):
+        """Return a connection to the pool, discarding any open transaction."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error as e:
+            logger.error(f'Discarding broken SQLite connection: {str(e)}')
+            conn.close()
+            with self._lock:
+                self._created -= 1
+                self._in_use -= 1
+            return
+        with self._lock:
+            self._in_use -= 1
+        self._idle.put(conn)
+
+    def stats(self):
+        """Return pool counters."""
+        with self._lock:
+            return {
+                'path': self.path,
+                'size': self.size,
+                'created': self._created,
+                'in_use': self._in_use,
+                'idle': self._idle.qsize(),
+                'hits': self.hits,
+                'misses': self.misses,
+                'waits': self.waits,
+            }
+
+    def close(self):
+        """Close all idle connections."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+def get_pool(path):
+    """Return the process-wide pool for ``path``, creating it on first use."""
+    pool = _pools.get(path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(path)
+            if pool is None:
+                pool = SQLitePool(
+                    path,
+                    size=_pool_settings['size'],
+                    timeout=_pool_settings['timeout'],
+                    pragmas=_pool_settings['pragmas'],
+                )
+                _pools[path] = pool
+    return pool
+
+
+def pool_stats():
+    """Return counters for every pool in the process."""
+    return [pool.stats() for pool in list(_pools.values())]
+
+
+def close_pools():
+    """Close and forget every pool (used by tests and shutdown)."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+def request_connection(request, path):
+    """Return a pooled connection bound to ``request``.
+
+    The same connection is reused for the whole request and returned to the
+    pool from a finished callback, so views never have to close it.
+    """
+    connections = request.environ.setdefault('momono.sqlite_connections', {})
+    conn = connections.get(path)
+    if conn is None:
+        pool = get_pool(path)
+        conn = pool.acquire()
+        connections[path] = conn
+
+        def release(request, pool=pool, conn=conn, path=path):
+            connections.pop(path, None)
+            pool.release(conn)
+
+        request.add_finished_callback(release)
+    return conn
+
+
+def configure(settings):
+    """Apply ``sqlite.*`` settings to pools created from now on."""
+    _pool_settings['size'] = int(settings.get('sqlite.pool_size', DEFAULT_POOL_SIZE))
+    _pool_settings['timeout'] = float(settings.get('sqlite.pool_timeout', DEFAULT_POOL_TIMEOUT))
+    pragmas = dict(DEFAULT_PRAGMAS)
+    for name in DEFAULT_PRAGMAS:
+        value = settings.get(f'sqlite.{name}')
+        if value is not None:
+            pragmas[name] = value
+    _pool_settings['pragmas'] = pragmas
+    logger.info(f"SQLite pool configured: size={_pool_settings['size']}, pragmas={pragmas}")
+
+
+def includeme(config):
+    """Configure SQLite pooling for a Pyramid app.
+
+    Activate this setup using ``config.include('.sqlite_pool')``.
+    """
+    configure(config.get_settings())
@@ -0,0 +1,49 @@
+from datetime import date, timedelta
+
+# Constants
+STATS_GRANULARITIES = ('day', 'week')
+
+
+def month_bounds(year, month):
+    """Return the half-open ``[start, next_month_start)`` range of a month."""
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+def bucket_totals(rows, start, end, granularity):
+    """Group ``(day, type, total)`` rows into zero-filled day or week buckets.
+
+    Weeks start on Monday and are labelled with that Monday, which may fall
+    in the previous month. Returns ``(buckets, totals)`` where ``totals``
+    maps each type to the sum over the whole range.
+    """
+    def bucket_of(day):
+        if granularity == 'week':
+            return day - timedelta(days=day.weekday())
+        return day
+
+    buckets = {}
+    day = start
+    while day < end:
+        buckets.setdefault(bucket_of(day), {'income': 0, 'expense': 0})
+        day += timedelta(days=1)
+
+    totals = {'income': 0, 'expense': 0}
+    for row in rows:
+        # SQLite returns ISO text, PostgreSQL a date
+        day = date.fromisoformat(str(row['day'])[:10])
+        transaction_type = row['type'] or 'expense'
+        if transaction_type not in totals:
+            continue
+        buckets[bucket_of(day)][transaction_type] += row['total']
+        totals[transaction_type] += row['total']
+
+    return [
+        {
+            'date': bucket.isoformat(),
+            'total_income': values['income'],
+            'total_expense': values['expense'],
+        }
+        for bucket, values in sorted(buckets.items())
+    ], totals
@@ -0,0 +1,61 @@
+import logging
+
+from pyramid.response import Response
+
+from .renderers import dumps
+from .repository import detached_repository
+
+# Konfigurasi logging
+logger = logging.getLogger('momono.streaming')
+logger.setLevel(logging.INFO)
+
+# Constants
+NDJSON = 'application/x-ndjson'
+
+
+def stream_mode(request):
+    """Return ``'ndjson'``, ``'json'`` or ``None`` for a listing request.
+
+    ``Accept: application/x-ndjson`` or ``?stream=ndjson`` gives one JSON
+    object per line; ``?stream=1`` gives the usual JSON document written
+    incrementally.
+    """
+    stream = request.params.get('stream')
+    if NDJSON in request.headers.get('Accept', '') or stream == 'ndjson':
+        return 'ndjson'
+    if stream in ('1', 'true', 'json'):
+        return 'json'
+    return None
+
+
+def streaming_response(request, mode, key, batches, serialize):
+    """Return a response whose body is written while rows are fetched.
+
+    ``batches(repo)`` yields lists of rows (see ``BaseRepository._stream``)
+    and ``serialize(row)`` turns one row into a JSON-ready dict. The
+    repository connection is held only while the body is being iterated.
+    """
+    opener = detached_repository(request)
+
+    def app_iter():
+        with opener as repo:
+            if mode == 'json':
+                yield f'{{"{key}": ['.encode('utf-8')
+            first = True
+            for rows in batches(repo):
+                if mode == 'ndjson':
+                    chunk = b''.join(dumps(serialize(row)) + b'\n' for row in rows)
+                else:
+                    chunk = b', '.join(dumps(serialize(row)) for row in rows)
+                    if not first:
+                        chunk = b', ' + chunk
+                first = False
+                yield chunk
+            if mode == 'json':
+                yield b']}'
+
+    return Response(
+        app_iter=app_iter(),
+        content_type=NDJSON if mode == 'ndjson' else 'application/json',
+        charset='utf-8'
+    )
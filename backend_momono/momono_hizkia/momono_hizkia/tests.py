@@ -63,3 +63,1179 @@ class TestMyViewFailureCondition(BaseTest):
         from .views.default import my_view
         info = my_view(dummy_request(self.session))
         self.assertEqual(info.status_int, 500)
+
+
+class TestSQLitePool(unittest.TestCase):
+
+    def setUp(self):
+        import tempfile
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = self.tmpdir.name + '/pool.sqlite'
+
+    def tearDown(self):
+        from .sqlite_pool import close_pools
+        close_pools()
+        self.tmpdir.cleanup()
+
+    def test_connections_are_configured_and_reused(self):
+        from .sqlite_pool import SQLitePool
+        pool = SQLitePool(self.path, size=2)
+        conn = pool.acquire()
+        self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+        self.assertEqual(conn.execute('PRAGMA busy_timeout').fetchone()[0], 5000)
+        pool.release(conn)
+        self.assertIs(pool.acquire(), conn)
+        stats = pool.stats()
+        self.assertEqual((stats['misses'], stats['hits'], stats['in_use']), (1, 1, 1))
+
+    def test_exhausted_pool_waits_then_times_out(self):
+        from .sqlite_pool import SQLitePool, PoolTimeout
+        pool = SQLitePool(self.path, size=1, timeout=0.01)
+        pool.acquire()
+        self.assertRaises(PoolTimeout, pool.acquire)
+        self.assertEqual(pool.stats()['waits'], 1)
+
+    def test_request_connection_released_on_teardown(self):
+        from .sqlite_pool import request_connection, get_pool
+        request = testing.DummyRequest()
+        conn = request_connection(request, self.path)
+        self.assertIs(request_connection(request, self.path), conn)
+        conn.execute('CREATE TABLE t (x INTEGER)')
+        conn.execute('INSERT INTO t VALUES (1)')
+        request._process_finished_callbacks()
+        stats = get_pool(self.path).stats()
+        self.assertEqual((stats['in_use'], stats['idle']), (0, 1))
+        self.assertFalse(conn.in_transaction)
+
+
+class TestSimpleSchemaManager(unittest.TestCase):
+
+    def setUp(self):
+        import tempfile
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = self.tmpdir.name + '/schema.sqlite'
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _columns(self, table):
+        import sqlite3
+        conn = sqlite3.connect(self.path)
+        try:
+            return {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+        finally:
+            conn.close()
+
+    def test_creates_missing_tables_once(self):
+        from .schema import SimpleSchemaManager
+        manager = SimpleSchemaManager()
+        manager.ensure(self.path)
+        self.assertTrue(manager.is_ready(self.path))
+        self.assertIn('category', self._columns('simple_budgets'))
+        self.assertIn('budget_id', self._columns('simple_transactions'))
+
+    def test_adds_missing_columns_to_old_tables(self):
+        import sqlite3
+        from .schema import SimpleSchemaManager
+        conn = sqlite3.connect(self.path)
+        conn.execute(
+            'CREATE TABLE simple_budgets (id INTEGER PRIMARY KEY AUTOINCREMENT, '
+            'user_id INTEGER NOT NULL, amount REAL NOT NULL, name TEXT NOT NULL, description TEXT)'
+        )
+        conn.commit()
+        conn.close()
+        SimpleSchemaManager().ensure(self.path)
+        self.assertIn('category', self._columns('simple_budgets'))
+
+    def test_listing_query_uses_composite_index(self):
+        import sqlite3
+        from .schema import SimpleSchemaManager
+        from .repository import SQLiteRepository
+        SimpleSchemaManager().ensure(self.path)
+        conn = sqlite3.connect(self.path)
+        sql, params = SQLiteRepository(conn)._transactions_query(1, 10, ('2025-05-01', 3), {})
+        plan = ' '.join(row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params))
+        conn.close()
+        self.assertIn('ix_simple_transactions_user_id_created_at_id', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class RepositoryTest(unittest.TestCase):
+
+    def setUp(self):
+        import tempfile
+        from .schema import SimpleSchemaManager
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = self.tmpdir.name + '/repo.sqlite'
+        SimpleSchemaManager().ensure(self.path)
+        self.config = testing.setUp(settings={
+            'momono.storage': 'sqlite',
+            'momono.sqlite_path': self.path,
+        })
+        self.requests = []
+
+    def tearDown(self):
+        from .sqlite_pool import close_pools
+        for request in self.requests:
+            request._process_finished_callbacks()
+        testing.tearDown()
+        close_pools()
+        self.tmpdir.cleanup()
+
+    def make_request(self, json_body=None, params=None, matchdict=None, method='GET', headers=None):
+        from .repository import get_repository
+        request = testing.DummyRequest(
+            json_body=json_body, params=params or {}, method=method, headers=headers or {}
+        )
+        request.matchdict = matchdict or {}
+        request.repo = get_repository(request)
+        self.requests.append(request)
+        return request
+
+
+class TestRepository(RepositoryTest):
+
+    def test_transactions_and_budgets_share_one_database(self):
+        repo = self.make_request().repo
+        budget_id = repo.get_or_create_default_budget(1)
+        self.assertEqual(repo.get_or_create_default_budget(1), budget_id)
+        transaction_id = repo.create_transaction(1, 25.0, 'Lunch', '2025-05-02', 'Food', 'expense', budget_id)
+        repo.commit()
+        row = repo.get_transaction(transaction_id, 1)
+        self.assertEqual(row['budget_id'], budget_id)
+        self.assertIsNone(repo.get_transaction(transaction_id, 2))
+
+    def test_monthly_totals_stay_within_the_month(self):
+        repo = self.make_request().repo
+        repo.create_transaction(1, 100.0, '', '2025-05-01', 'Salary', 'income', None)
+        repo.create_transaction(1, 30.0, '', '2025-05-31', 'Food', 'expense', None)
+        repo.create_transaction(1, 99.0, '', '2025-06-01', 'Food', 'expense', None)
+        totals = repo.monthly_totals(1, 2025, 5)
+        self.assertEqual(totals, {'income': 100.0, 'expense': 30.0})
+
+
+class TestLegacyImport(RepositoryTest):
+
+    def test_old_file_is_copied_once(self):
+        import sqlite3
+        from .scripts.import_legacy_sqlite import import_legacy
+        source = self.tmpdir.name + '/momono_hizkia.sqlite'
+        conn = sqlite3.connect(source)
+        conn.execute(
+            'CREATE TABLE simple_budgets (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, '
+            'amount REAL NOT NULL, name TEXT NOT NULL, description TEXT, category TEXT)'
+        )
+        conn.execute(
+            'CREATE TABLE simple_transactions (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, '
+            'amount REAL NOT NULL, description TEXT, date TEXT, category TEXT, type TEXT)'
+        )
+        conn.execute("INSERT INTO simple_budgets VALUES (4, 1, 1500.0, 'Budget for Food', '', 'Food')")
+        conn.execute("INSERT INTO simple_budgets VALUES (8, 2, 250.0, 'Budget for Fun', NULL, NULL)")
+        conn.execute("INSERT INTO simple_transactions VALUES (1, 1, 20.0, 'Lunch', '2025-05-02', 'Food', 'expense')")
+        conn.commit()
+        conn.close()
+
+        repo = self.make_request().repo
+        repo.create_budget(1, 100.0, 'Existing')
+        repo.commit()
+        self.assertEqual(import_legacy(repo, source), (2, 1))
+        self.assertEqual(
+            [(row['name'], row['amount'], row['category']) for row in repo.list_budgets(1)],
+            [('Existing', 100.0, ''), ('Budget for Food', 1500.0, 'Food')]
+        )
+        self.assertEqual([row['name'] for row in repo.list_budgets(2)], ['Budget for Fun'])
+        self.assertEqual(repo.monthly_totals(1, 2025, 5), {'expense': 20.0})
+        self.assertIsNone(import_legacy(self.make_request().repo, source))
+        self.assertEqual(len(repo.list_budgets(1)), 2)
+
+
+class TestSimpleTransactionViews(RepositoryTest):
+
+    def test_create_then_list(self):
+        from .records import as_dict
+        from .views.simple_transaction import create_simple_transaction, get_simple_transactions
+        created = create_simple_transaction(self.make_request(json_body={
+            'amount': 12.5, 'description': 'Coffee', 'date': '2025-05-03', 'category': 'Food'
+        }))
+        self.assertTrue(created['success'])
+        listed = get_simple_transactions(self.make_request())
+        self.assertEqual([t['id'] for t in listed['transactions']], [created['transaction']['id']])
+        self.assertEqual(listed['transactions'][0]['budget_id'], created['transaction']['budget_id'])
+        self.assertEqual(as_dict(created['transaction']), listed['transactions'][0])
+
+    def test_stats_monthly_reads_simple_transactions(self):
+        from .views.simple_transaction import create_simple_transaction
+        from .views.default import stats_monthly
+        create_simple_transaction(self.make_request(json_body={
+            'amount': 50, 'date': '2025-12-10', 'type': 'income'
+        }))
+        info = stats_monthly(self.make_request(params={'month': '12', 'year': '2025'}))
+        self.assertEqual((info['total_income'], info['total_expense']), (50, 0))
+
+
+class TestGetEngine(unittest.TestCase):
+
+    def setUp(self):
+        import tempfile
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.url = f'sqlite:///{self.tmpdir.name}/engine.sqlite'
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_pool_options_come_from_settings(self):
+        from .models.meta import get_engine
+        engine = get_engine({
+            'sqlalchemy.url': self.url,
+            'sqlalchemy.pool_size': '3',
+            'sqlalchemy.max_overflow': '2',
+            'sqlalchemy.pool_pre_ping': 'true',
+        })
+        self.assertEqual(engine.pool.size(), 3)
+        self.assertEqual(engine.pool._max_overflow, 2)
+        self.assertTrue(engine.pool._pre_ping)
+        engine.dispose()
+
+    def test_create_all_is_opt_in_and_checkouts_are_counted(self):
+        from sqlalchemy import inspect
+        from .models.meta import get_engine, pool_metrics
+        engine = get_engine({'sqlalchemy.url': self.url})
+        self.assertEqual(inspect(engine).get_table_names(), [])
+        metrics = pool_metrics(engine)
+        self.assertGreaterEqual(metrics['checkouts'], 1)
+        self.assertEqual(metrics['checked_out'], 0)
+        engine.dispose()
+
+
+class TestReplicaRouting(RepositoryTest):
+
+    def setUp(self):
+        super(TestReplicaRouting, self).setUp()
+        from .repository import ReplicaRouter
+        from .schema import SimpleSchemaManager
+        self.replica_path = self.tmpdir.name + '/replica.sqlite'
+        SimpleSchemaManager().ensure(self.replica_path)
+        self.router = ReplicaRouter([self.replica_path], read_your_writes_seconds=60)
+        self.config.registry['momono.replica_router'] = self.router
+
+    def _database(self, request):
+        return request.repo.conn.execute('PRAGMA database_list').fetchone()['file']
+
+    def test_safe_requests_use_replica(self):
+        self.assertEqual(self._database(self.make_request()), self.replica_path)
+        self.assertEqual(self._database(self.make_request(method='POST')), self.path)
+
+    def test_writer_reads_own_writes_from_primary(self):
+        request = self.make_request(method='POST')
+        request._process_finished_callbacks()
+        self.requests.remove(request)
+        self.assertEqual(self._database(self.make_request()), self.path)
+
+
+class TestTransactionPagination(RepositoryTest):
+
+    def setUp(self):
+        super(TestTransactionPagination, self).setUp()
+        repo = self.make_request().repo
+        for day in (1, 2, 2, 3, 4):
+            repo.create_transaction(1, float(day), '', f'2025-05-0{day}', 'Food', 'expense', None)
+        repo.commit()
+
+    def test_pages_walk_all_rows_once(self):
+        from .views.simple_transaction import get_simple_transactions
+        seen, after = [], None
+        while True:
+            params = {'limit': '2'}
+            if after:
+                params['after'] = after
+            page = get_simple_transactions(self.make_request(params=params))
+            seen.extend(t['id'] for t in page['transactions'])
+            after = page['next_cursor']
+            if not after:
+                break
+        self.assertEqual(seen, [5, 4, 3, 2, 1])
+
+    def test_without_limit_returns_everything(self):
+        from .views.simple_transaction import get_simple_transactions
+        page = get_simple_transactions(self.make_request())
+        self.assertEqual(len(page['transactions']), 5)
+        self.assertIsNone(page['next_cursor'])
+
+    def test_invalid_cursor_is_rejected(self):
+        from pyramid.httpexceptions import HTTPBadRequest
+        from .views.simple_transaction import get_simple_transactions
+        request = self.make_request(params={'after': 'not-a-cursor'})
+        self.assertRaises(HTTPBadRequest, get_simple_transactions, request)
+
+
+class TestStreamingListings(RepositoryTest):
+
+    def setUp(self):
+        super(TestStreamingListings, self).setUp()
+        repo = self.make_request().repo
+        for day in range(1, 4):
+            repo.create_transaction(1, float(day), '', f'2025-05-0{day}', 'Food', 'expense', None)
+        repo.commit()
+
+    def test_ndjson_writes_one_object_per_line(self):
+        import json
+        from .sqlite_pool import get_pool
+        from .views.simple_transaction import get_simple_transactions
+        request = self.make_request(headers={'Accept': 'application/x-ndjson'})
+        response = get_simple_transactions(request)
+        self.assertEqual(response.content_type, 'application/x-ndjson')
+        in_use = get_pool(self.path).stats()['in_use']
+        lines = b''.join(response.app_iter).decode('utf-8').splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [3, 2, 1])
+        self.assertEqual(get_pool(self.path).stats()['in_use'], in_use)
+
+    def test_stream_param_writes_regular_json_document(self):
+        import json
+        from .views.simple_budget import get_simple_budgets
+        repo = self.make_request().repo
+        repo.create_budget(1, 100, 'Food')
+        repo.commit()
+        response = get_simple_budgets(self.make_request(params={'stream': '1'}))
+        body = json.loads(b''.join(response.app_iter))
+        self.assertEqual([b['name'] for b in body['budgets']], ['Food'])
+
+
+class TestTransactionFilters(RepositoryTest):
+
+    def setUp(self):
+        super(TestTransactionFilters, self).setUp()
+        repo = self.make_request().repo
+        repo.create_transaction(1, 10.0, '', '2025-05-01', 'Food', 'expense', None)
+        repo.create_transaction(1, 500.0, '', '2025-05-15', 'Salary', 'income', None)
+        repo.create_transaction(1, 40.0, '', '2025-05-31', 'Food', 'expense', None)
+        repo.create_transaction(1, 20.0, '', '2025-06-01', None, 'expense', None)
+        repo.commit()
+
+    def _ids(self, **params):
+        from .views.simple_transaction import get_simple_transactions
+        result = get_simple_transactions(self.make_request(params=params))
+        return [t['id'] for t in result['transactions']]
+
+    def test_date_range_is_inclusive(self):
+        self.assertEqual(self._ids(**{'from': '2025-05-01', 'to': '2025-05-31'}), [3, 2, 1])
+
+    def test_category_type_and_amount(self):
+        self.assertEqual(self._ids(category='Food', min_amount='20'), [3])
+        self.assertEqual(self._ids(type='income'), [2])
+        self.assertEqual(self._ids(category='Uncategorized'), [4])
+
+    def test_sort_by_amount_with_keyset_pages(self):
+        from .views.simple_transaction import get_simple_transactions
+        first = get_simple_transactions(self.make_request(params={'sort': 'amount', 'limit': '2'}))
+        self.assertEqual([t['id'] for t in first['transactions']], [1, 4])
+        second = self._ids(sort='amount', limit='2', after=first['next_cursor'])
+        self.assertEqual(second, [3, 2])
+
+    def test_invalid_filter_is_rejected(self):
+        from pyramid.httpexceptions import HTTPBadRequest
+        from .views.simple_transaction import get_simple_transactions
+        request = self.make_request(params={'from': '05/01/2025'})
+        self.assertRaises(HTTPBadRequest, get_simple_transactions, request)
+
+
+class TestTransactionRollups(RepositoryTest):
+
+    def _cells(self):
+        import sqlite3
+        conn = sqlite3.connect(self.path)
+        try:
+            return sorted(conn.execute(
+                'SELECT year, month, category, type, total, transaction_count FROM transaction_rollups'
+            ))
+        finally:
+            conn.close()
+
+    def test_rollup_follows_updates_and_deletes(self):
+        repo = self.make_request().repo
+        first = repo.create_transaction(1, 10.0, '', '2025-05-01', 'Food', 'expense', None)
+        second = repo.create_transaction(1, 5.0, '', '2025-05-20', None, None, None)
+        repo.commit()
+        self.assertEqual(self._cells(), [
+            (2025, 5, 'Food', 'expense', 10.0, 1),
+            (2025, 5, 'Uncategorized', 'expense', 5.0, 1),
+        ])
+
+        repo.update_transaction(first, 1, {'created_at': '2025-06-02', 'amount': 12.0})
+        repo.delete_transaction(second, 1)
+        repo.commit()
+        self.assertEqual(self._cells(), [(2025, 6, 'Food', 'expense', 12.0, 1)])
+
+    def test_new_rollup_table_is_backfilled(self):
+        import sqlite3
+        from .schema import SimpleSchemaManager
+        repo = self.make_request().repo
+        repo.create_transaction(1, 7.0, '', '2025-01-09', 'Food', 'expense', None)
+        repo.create_transaction(1, 3.0, '', '2025-01-10', 'Food', 'expense', None)
+        repo.commit()
+        conn = sqlite3.connect(self.path)
+        conn.execute('DROP TABLE transaction_rollups')
+        conn.commit()
+        conn.close()
+        SimpleSchemaManager().ensure(self.path)
+        self.assertEqual(self._cells(), [(2025, 1, 'Food', 'expense', 10.0, 2)])
+
+    def test_stats_range_fills_empty_months(self):
+        from .views.default import stats_range, stats_by_category
+        repo = self.make_request().repo
+        repo.create_transaction(1, 100.0, '', '2024-12-05', 'Salary', 'income', None)
+        repo.create_transaction(1, 40.0, '', '2025-02-11', 'Food', 'expense', None)
+        repo.commit()
+        info = stats_range(self.make_request(params={'from': '2024-12', 'to': '2025-02'}))
+        self.assertEqual(
+            [(m['month'], m['total_income'], m['total_expense']) for m in info['months']],
+            [(12, 100.0, 0), (1, 0, 0), (2, 0, 40.0)]
+        )
+        by_category = stats_by_category(self.make_request(params={'from': '2025-01'}))
+        self.assertEqual(by_category['stats'], [{'category': 'Food', 'total': 40.0}])
+
+    def test_stats_range_requires_bounds(self):
+        from pyramid.httpexceptions import HTTPBadRequest
+        from .views.default import stats_range
+        self.assertRaises(HTTPBadRequest, stats_range, self.make_request(params={'from': '2025-01'}))
+
+    def test_stats_monthly_weekly_buckets(self):
+        from .views.default import stats_monthly
+        repo = self.make_request().repo
+        repo.create_transaction(1, 100.0, '', '2025-09-01', 'Salary', 'income', None)
+        repo.create_transaction(1, 15.0, '', '2025-09-03', 'Food', 'expense', None)
+        repo.create_transaction(1, 25.0, '', '2025-09-30', 'Food', 'expense', None)
+        repo.create_transaction(1, 99.0, '', '2025-10-01', 'Food', 'expense', None)
+        repo.commit()
+        info = stats_monthly(self.make_request(params={'month': '9', 'year': '2025', 'granularity': 'week'}))
+        self.assertEqual(info['buckets'][0], {'date': '2025-09-01', 'total_income': 100.0, 'total_expense': 15.0})
+        self.assertEqual(info['buckets'][-1], {'date': '2025-09-29', 'total_income': 0, 'total_expense': 25.0})
+        self.assertEqual(len(info['buckets']), 5)
+        self.assertEqual((info['total_income'], info['total_expense']), (100.0, 40.0))
+        daily = stats_monthly(self.make_request(params={'month': '9', 'year': '2025', 'granularity': 'day'}))
+        self.assertEqual(len(daily['buckets']), 30)
+
+
+class TestBudgetSpent(RepositoryTest):
+
+    def _budget(self, budget_id):
+        from .views.simple_budget import get_simple_budget_by_id
+        return get_simple_budget_by_id(self.make_request(matchdict={'id': budget_id}))['budget']
+
+    def test_spent_tracks_expense_changes(self):
+        repo = self.make_request().repo
+        budget_id = repo.create_budget(1, 200.0, 'Food')
+        lunch = repo.create_transaction(1, 50.0, '', '2025-05-02', 'Food', 'expense', budget_id)
+        repo.create_transaction(1, 80.0, '', '2025-05-03', 'Salary', 'income', budget_id)
+        repo.create_transaction(1, 30.0, '', '2025-05-04', 'Food', 'expense', budget_id)
+        repo.commit()
+        budget = self._budget(budget_id)
+        self.assertEqual((budget['spent'], budget['remaining'], budget['utilization']), (80.0, 120.0, 0.4))
+
+        repo.update_transaction(lunch, 1, {'amount': 70.0})
+        repo.commit()
+        self.assertEqual(self._budget(budget_id)['spent'], 100.0)
+
+        repo.update_transaction(lunch, 1, {'type': 'income'})
+        repo.commit()
+        self.assertEqual(self._budget(budget_id)['spent'], 30.0)
+
+        repo.delete_transaction(lunch, 1)
+        repo.update_transaction(3, 1, {'amount': 10.0})
+        repo.commit()
+        self.assertEqual(self._budget(budget_id)['spent'], 10.0)
+
+    def test_created_budgets_show_the_stored_figures(self):
+        from .views.default import create_budget
+        from .views.named_budget import create_named_budget
+        for create in (create_budget, create_named_budget):
+            created = create(self.make_request(method='POST', json_body={'amount': '250', 'name': 'Rent'}))['budget']
+            stored = self._budget(created['id'])
+            self.assertEqual(created, {field: stored[field] for field in created})
+            self.assertEqual((created['spent'], created['remaining'], created['utilization']), (0.0, 250.0, 0))
+
+    def test_spent_column_is_backfilled(self):
+        import sqlite3
+        from .schema import SimpleSchemaManager
+        repo = self.make_request().repo
+        budget_id = repo.create_budget(1, 100.0, 'Food')
+        repo.create_transaction(1, 25.0, '', '2025-05-02', 'Food', None, budget_id)
+        repo.commit()
+        conn = sqlite3.connect(self.path)
+        conn.execute('ALTER TABLE simple_budgets DROP COLUMN spent')
+        conn.commit()
+        conn.close()
+        SimpleSchemaManager().ensure(self.path)
+        self.assertEqual(self._budget(budget_id)['spent'], 25.0)
+
+
+class TestDashboard(RepositoryTest):
+
+    def test_dashboard_combines_stats_transactions_and_budgets(self):
+        from .views.dashboard import get_dashboard
+        repo = self.make_request().repo
+        budget_id = repo.create_budget(1, 100.0, 'Food')
+        repo.create_transaction(1, 1000.0, '', '2025-04-25', 'Salary', 'income', None)
+        repo.create_transaction(1, 30.0, '', '2025-05-02', 'Food', 'expense', budget_id)
+        repo.create_transaction(1, 50.0, '', '2025-05-03', 'Rent', 'expense', None)
+        repo.create_transaction(1, 20.0, '', '2025-05-04', 'Food', 'expense', budget_id)
+        repo.commit()
+        info = get_dashboard(self.make_request(params={'month': '5', 'year': '2025'}))
+        self.assertEqual(info['totals'], {'total_income': 1000.0, 'total_expense': 100.0, 'balance': 900.0})
+        self.assertEqual((info['current_month']['total_income'], info['current_month']['total_expense']), (0, 100.0))
+        self.assertEqual(info['top_categories'], [
+            {'category': 'Food', 'total': 50.0}, {'category': 'Rent', 'total': 50.0}
+        ])
+        self.assertEqual([t['id'] for t in info['recent_transactions']], [4, 3, 2, 1])
+        self.assertEqual(info['budget_summary']['total_spent'], 50.0)
+        self.assertEqual(info['budgets'][0]['utilization'], 0.5)
+
+
+class TestBulkImport(RepositoryTest):
+
+    def _import(self, body, content_type='application/json'):
+        from pyramid.request import Request
+        from .repository import get_repository
+        from .views.bulk_transactions import import_transactions
+        request = Request.blank('/api/transactions/bulk', method='POST', body=body, content_type=content_type)
+        request.registry = self.config.registry
+        request.repo = get_repository(request)
+        self.requests.append(request)
+        return import_transactions(request)
+
+    def test_json_rows_are_validated_and_inserted(self):
+        import json
+        result = self._import(json.dumps([
+            {'amount': 10, 'date': '2025-05-01', 'category': 'Food'},
+            {'amount': 'ten', 'date': '2025-05-01'},
+            {'amount': 5, 'date': '01/05/2025'},
+            {'amount': 500, 'date': '2025-05-02', 'type': 'income'},
+            {'amount': 1, 'budget_id': 999},
+        ]).encode('utf-8'))
+        self.assertEqual((result['imported'], result['failed']), (2, 3))
+        self.assertEqual([e['row'] for e in result['errors']], [2, 3, 5])
+        repo = self.make_request().repo
+        self.assertEqual(repo.monthly_totals(1, 2025, 5), {'expense': 10.0, 'income': 500.0})
+        self.assertEqual(repo.list_budgets(1)[0]['spent'], 10.0)
+
+    def test_non_string_text_fields_are_row_errors(self):
+        import json
+        result = self._import(json.dumps([
+            {'amount': 1, 'description': {'a': 1}},
+            {'amount': 2, 'category': ['Food']},
+            {'amount': 3, 'description': 'Lunch', 'category': None},
+        ]).encode('utf-8'))
+        self.assertEqual((result['imported'], result['failed']), (1, 2))
+        self.assertEqual(
+            [(e['row'], e['error']) for e in result['errors']],
+            [(1, 'description must be a string'), (2, 'category must be a string')]
+        )
+        rows = self.make_request().repo.list_transactions(1)
+        self.assertEqual([(row['description'], row['category']) for row in rows], [('Lunch', 'Uncategorized')])
+
+    def test_csv_upload_in_chunks(self):
+        self.config.registry.settings['momono.bulk_chunk_size'] = '3'
+        lines = ['date,amount,category,type'] + [f'2025-06-{day:02d},{day},Food,expense' for day in range(1, 11)]
+        result = self._import('\n'.join(lines).encode('utf-8'), 'text/csv')
+        self.assertEqual((result['imported'], result['failed']), (10, 0))
+        repo = self.make_request().repo
+        self.assertEqual(len(repo.list_transactions(1)), 10)
+        self.assertEqual(repo.monthly_totals(1, 2025, 6), {'expense': 55.0})
+
+    def test_unreadable_body_is_rejected(self):
+        from pyramid.httpexceptions import HTTPBadRequest
+        self.assertRaises(HTTPBadRequest, self._import, b'{"amount": 1}')
+
+
+class TestBulkChanges(RepositoryTest):
+
+    def setUp(self):
+        super(TestBulkChanges, self).setUp()
+        repo = self.make_request().repo
+        self.budget_id = repo.create_budget(1, 100.0, 'Food', category='Food')
+        self.other_budget_id = repo.create_budget(1, 50.0, 'Fun', category='Fun')
+        repo.create_transaction(1, 10.0, '', '2025-05-01', 'Food', 'expense', self.budget_id)
+        repo.create_transaction(1, 20.0, '', '2025-05-20', 'Food', 'expense', self.budget_id)
+        repo.create_transaction(1, 30.0, '', '2025-06-02', 'Food', 'expense', self.budget_id)
+        repo.create_transaction(1, 40.0, '', '2025-05-03', 'Rent', 'expense', None)
+        repo.commit()
+
+    def test_bulk_update_by_filter_moves_counters(self):
+        from .views.bulk_transactions import bulk_update_transactions
+        result = bulk_update_transactions(self.make_request(method='PATCH', json_body={
+            'filter': {'category': 'Food', 'from': '2025-05-01', 'to': '2025-05-31'},
+            'set': {'category': 'Groceries', 'budget_id': self.other_budget_id},
+        }))
+        self.assertEqual(result['updated'], 2)
+        repo = self.make_request().repo
+        by_category = {row['category']: row['total'] for row in repo.totals_by_category(1, (2025, 5), (2025, 5))}
+        self.assertEqual(by_category, {'Groceries': 30.0, 'Rent': 40.0})
+        spent = {row['id']: row['spent'] for row in repo.list_budgets(1)}
+        self.assertEqual(spent, {self.budget_id: 30.0, self.other_budget_id: 30.0})
+
+    def test_bulk_delete_by_ids(self):
+        from .views.bulk_transactions import bulk_delete_transactions
+        result = bulk_delete_transactions(self.make_request(method='DELETE', json_body={'ids': [1, 3, 99]}))
+        self.assertEqual(result['deleted'], 2)
+        repo = self.make_request().repo
+        self.assertEqual([row['id'] for row in repo.list_transactions(1)], [2, 4])
+        self.assertEqual(repo.monthly_totals(1, 2025, 6), {})
+        self.assertEqual(repo.get_budget(self.budget_id)['spent'], 20.0)
+
+    def test_selection_is_required(self):
+        from pyramid.httpexceptions import HTTPBadRequest
+        from .views.bulk_transactions import bulk_delete_transactions
+        request = self.make_request(method='DELETE', json_body={'filter': {'sort': 'amount'}})
+        self.assertRaises(HTTPBadRequest, bulk_delete_transactions, request)
+
+    def test_non_string_filter_values_are_rejected(self):
+        from pyramid.httpexceptions import HTTPBadRequest
+        from .views.bulk_transactions import bulk_delete_transactions, bulk_update_transactions
+        for selection in ({'from': 20250101}, {'min_amount': [1]}, {'category': ['Food']}, {'sort': ['amount']}):
+            for view, method, body in (
+                (bulk_delete_transactions, 'DELETE', {'filter': selection}),
+                (bulk_update_transactions, 'PATCH', {'filter': selection, 'set': {'category': 'Groceries'}}),
+            ):
+                request = self.make_request(method=method, json_body=body)
+                self.assertRaises(HTTPBadRequest, view, request)
+                # Hand the connection back to the pool
+                request._process_finished_callbacks()
+        self.assertEqual(len(self.make_request().repo.list_transactions(1)), 4)
+
+    def test_non_string_text_values_are_rejected(self):
+        from pyramid.httpexceptions import HTTPBadRequest
+        from .views.bulk_transactions import bulk_update_transactions
+        from .views.bulk_budgets import bulk_delete_budgets, bulk_update_budgets
+        cases = [
+            (bulk_update_transactions, 'PATCH', {'ids': [1], 'set': {'category': {'a': 1}}}),
+            (bulk_update_transactions, 'PATCH', {'ids': [1], 'set': {'description': ['x']}}),
+            (bulk_update_budgets, 'PATCH', {'filter': {'category': ['Food']}, 'set': {'amount': 10}}),
+            (bulk_update_budgets, 'PATCH', {'ids': [self.budget_id], 'set': {'name': {'a': 1}}}),
+            (bulk_update_budgets, 'PATCH', {'ids': [self.budget_id], 'set': {'description': ['x']}}),
+            (bulk_update_budgets, 'PATCH', {'ids': [self.budget_id], 'set': {'category': 5}}),
+            (bulk_delete_budgets, 'DELETE', {'filter': {'category': ['Food']}}),
+        ]
+        for view, method, body in cases:
+            request = self.make_request(method=method, json_body=body)
+            self.assertRaises(HTTPBadRequest, view, request)
+            # Hand the connection back to the pool
+            request._process_finished_callbacks()
+        repo = self.make_request().repo
+        self.assertEqual(len(repo.list_budgets(1)), 2)
+        self.assertEqual(repo.get_transaction(1, 1)['category'], 'Food')
+
+    def test_bulk_budget_update_and_delete(self):
+        from .views.bulk_budgets import bulk_update_budgets, bulk_delete_budgets
+        result = bulk_update_budgets(self.make_request(method='PATCH', json_body={
+            'filter': {'category': 'Food'}, 'set': {'amount': 300},
+        }))
+        self.assertEqual(result['updated'], 1)
+        result = bulk_delete_budgets(self.make_request(method='DELETE', json_body={'ids': [self.other_budget_id]}))
+        self.assertEqual(result['deleted'], 1)
+        budgets = self.make_request().repo.list_budgets(1)
+        self.assertEqual([(row['id'], row['amount']) for row in budgets], [(self.budget_id, 300.0)])
+
+
+class TestTransactionExport(RepositoryTest):
+
+    def setUp(self):
+        super(TestTransactionExport, self).setUp()
+        repo = self.make_request().repo
+        repo.create_transaction(1, 12.5, '=SUM(A1)', '2025-05-01', 'Food', 'expense', None)
+        repo.create_transaction(1, 900.0, 'Pay <May>', '2025-05-25', 'Salary', 'income', None)
+        repo.commit()
+
+    def test_csv_export_streams_filtered_rows(self):
+        import csv
+        from .views.transaction_export import export_transactions
+        response = export_transactions(self.make_request(params={'type': 'expense'}))
+        self.assertIn('attachment', response.content_disposition)
+        rows = list(csv.reader(b''.join(response.app_iter).decode('utf-8').splitlines()))
+        self.assertEqual(rows[0][:3], ['id', 'date', 'type'])
+        self.assertEqual(rows[1], ['1', '2025-05-01', 'expense', 'Food', "'=SUM(A1)", '12.5', ''])
+        self.assertEqual(len(rows), 2)
+
+    def test_xlsx_export_is_a_workbook(self):
+        import io
+        import zipfile
+        from .views.transaction_export import export_transactions
+        response = export_transactions(self.make_request(params={'format': 'xlsx'}))
+        body = b''.join(response.app_iter)
+        self.assertEqual(len(body), response.content_length)
+        sheet = zipfile.ZipFile(io.BytesIO(body)).read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertEqual(sheet.count('<row '), 3)
+        self.assertIn('Pay &lt;May&gt;', sheet)
+
+    def test_unknown_format_is_rejected(self):
+        from pyramid.httpexceptions import HTTPBadRequest
+        from .views.transaction_export import export_transactions
+        self.assertRaises(HTTPBadRequest, export_transactions, self.make_request(params={'format': 'pdf'}))
+
+
+class TestFastJSON(unittest.TestCase):
+
+    def native_payload(self):
+        import datetime
+        import decimal
+        import sqlite3
+        from .models.models import TransactionType
+        conn = sqlite3.connect(':memory:')
+        conn.row_factory = sqlite3.Row
+        row = conn.execute("SELECT 1 AS id, 'Food' AS category").fetchone()
+        conn.close()
+        return {
+            'date': datetime.date(2025, 5, 1),
+            'at': datetime.datetime(2025, 5, 1, 12, 30),
+            'amount': decimal.Decimal('12.50'),
+            'type': TransactionType.expense,
+            'row': row,
+            2025: 'int key',
+        }
+
+    def test_native_values(self):
+        import json
+        from .renderers import dumps
+        expected = {
+            'date': '2025-05-01',
+            'at': '2025-05-01T12:30:00',
+            'amount': 12.5,
+            'type': 'expense',
+            'row': {'id': 1, 'category': 'Food'},
+            '2025': 'int key',
+        }
+        self.assertEqual(json.loads(dumps(self.native_payload())), expected)
+
+    def test_stdlib_fallback_matches(self):
+        from unittest import mock
+        from . import renderers
+        fast = renderers.dumps(self.native_payload())
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(renderers.dumps(self.native_payload()), fast)
+
+    def test_renderer_sets_json_content_type(self):
+        from .renderers import FastJSON
+        request = testing.DummyRequest()
+        render = FastJSON()(None)
+        self.assertEqual(render({'ok': True}, {'request': request}), b'{"ok":true}')
+        self.assertEqual(request.response.content_type, 'application/json')
+
+
+class TestRecords(unittest.TestCase):
+
+    row = {
+        'id': 7, 'user_id': 1, 'amount': 12.5, 'description': 'Lunch',
+        'created_at': '2025-05-01', 'category': None, 'type': None, 'budget_id': None,
+    }
+
+    def test_row_serializer_matches_records(self):
+        import json
+        from .records import TransactionRecord, as_dict, row_serializer
+        from .renderers import dumps
+        record = TransactionRecord.from_row(self.row)
+        serialized = row_serializer(TransactionRecord)(self.row)
+        self.assertEqual(serialized, as_dict(record))
+        self.assertEqual(json.loads(dumps(record)), serialized)
+        self.assertEqual((record['category'], record.type), ('Uncategorized', 'expense'))
+        self.assertIs(record.date, record.created_at)
+        self.assertFalse(hasattr(record, '__dict__'))
+
+    def test_serializers_are_built_once_per_field_set(self):
+        from .records import BudgetRecord, TransactionRecord, row_serializer, serializer
+        fields = ('id', 'date', 'category')
+        self.assertIs(row_serializer(TransactionRecord, fields), row_serializer(TransactionRecord, fields))
+        self.assertEqual(
+            row_serializer(TransactionRecord, fields)(self.row),
+            {'id': 7, 'date': '2025-05-01', 'category': 'Uncategorized'},
+        )
+        with self.assertRaises(ValueError):
+            serializer(TransactionRecord, ('id', 'missing'))
+        with self.assertRaises(ValueError):
+            row_serializer(BudgetRecord)
+
+
+class TestJWTClaimsCache(unittest.TestCase):
+
+    def request(self, token):
+        return testing.DummyRequest(headers={'Authorization': f'Bearer {token}'})
+
+    def test_claims_are_decoded_once(self):
+        from unittest import mock
+        import jwt
+        from .security.security import JWTAuthenticationPolicy, SECRET_KEY, create_jwt_token
+        policy = JWTAuthenticationPolicy(SECRET_KEY)
+        token = create_jwt_token(5)
+        with mock.patch('jwt.decode', wraps=jwt.decode) as decode:
+            request = self.request(token)
+            self.assertEqual(policy.authenticated_userid(request), 5)
+            self.assertEqual(policy.unauthenticated_userid(request), 5)
+            # Same token on a later request: served from the LRU
+            self.assertEqual(policy.authenticated_userid(self.request(token)), 5)
+        self.assertEqual(decode.call_count, 1)
+        self.assertEqual((policy.token_cache.hits, policy.token_cache.misses), (1, 1))
+        self.assertIsNone(policy.authenticated_userid(self.request('not-a-token')))
+
+    def test_entries_expire_with_the_token(self):
+        import time
+        from .security.security import TokenCache
+        cache = TokenCache(max_entries=2)
+        cache.set('expired', {'sub': '1', 'exp': time.time() - 1})
+        cache.set('a', {'sub': '2', 'exp': time.time() + 60})
+        cache.set('b', {'sub': '3'})
+        self.assertIsNone(cache.get('expired'))
+        self.assertEqual(cache.get('a')['sub'], '2')
+        cache.set('c', {'sub': '4'})
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['size'], 2)
+
+
+class TestPasswordHasher(unittest.TestCase):
+
+    def test_hash_verify_and_rehash(self):
+        from .security.passwords import PasswordHasher
+        hasher = PasswordHasher(rounds=4, workers=1)
+        self.addCleanup(hasher.shutdown)
+        hashed = hasher.hash('secret')
+        self.assertTrue(hashed.startswith('$2b$04$'))
+        self.assertTrue(hasher.verify('secret', hashed))
+        self.assertFalse(hasher.verify('wrong', hashed))
+        self.assertFalse(hasher.needs_rehash(hashed))
+        hasher.rounds = 5
+        self.assertTrue(hasher.needs_rehash(hashed))
+        stats = hasher.stats()
+        self.assertEqual((stats['hash']['count'], stats['verify']['count'], stats['queue_wait']['count']), (1, 2, 3))
+
+    def test_full_queue_is_rejected(self):
+        import threading
+        from .security.passwords import PasswordBusy, PasswordHasher
+        hasher = PasswordHasher(rounds=4, workers=1, max_queue=0)
+        self.addCleanup(hasher.shutdown)
+        release = threading.Event()
+        blocker = threading.Thread(target=hasher._run, args=(hasher.hash_time, release.wait))
+        blocker.start()
+        while not hasher.stats()['pending']:
+            pass
+        with self.assertRaises(PasswordBusy):
+            hasher.hash('secret')
+        release.set()
+        blocker.join()
+        self.assertEqual(hasher.stats()['rejected'], 1)
+        self.assertTrue(hasher.verify('secret', hasher.hash('secret')))
+
+
+class TestTokenBucketStore(unittest.TestCase):
+
+    def test_burst_refill_and_eviction(self):
+        from .ratelimit import TokenBucketStore
+        store = TokenBucketStore(rate=10, burst=2, max_keys=2)
+        self.assertEqual((store.take('a'), store.take('a')), (0, 0))
+        retry_after = store.take('a')
+        self.assertTrue(0 < retry_after <= 0.1)
+        store.take('b')
+        store.take('c')
+        self.assertEqual(store.stats()['evictions'], 1)
+        # 'a' was evicted, so it starts over with a full bucket
+        self.assertEqual(store.take('a'), 0)
+
+
+class AppTest(unittest.TestCase):
+    """Functional tests against the full WSGI app on temporary SQLite files."""
+
+    settings = {}
+
+    def setUp(self):
+        import tempfile
+        from webtest import TestApp
+        from . import main
+        self.tmpdir = tempfile.TemporaryDirectory()
+        settings = {
+            'sqlalchemy.url': f'sqlite:///{self.tmpdir.name}/orm.sqlite',
+            'models.create_all': 'true',
+            'momono.sqlite_path': f'{self.tmpdir.name}/repo.sqlite',
+        }
+        settings.update(self.settings)
+        self.app = main({}, **settings)
+        self.testapp = TestApp(self.app)
+
+    def tearDown(self):
+        from .schema import schema_manager
+        from .sqlite_pool import close_pools
+        self.app.registry['dbengine'].dispose()
+        close_pools()
+        schema_manager.reset()
+        self.tmpdir.cleanup()
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def test_lru_bound_and_ttl(self):
+        import time
+        from .cache import ResponseCache
+        from pyramid.response import Response
+        cache = ResponseCache(max_entries=2, ttl=0.05)
+        for key in ('a', 'b', 'c'):
+            cache.set(key, (0, 0), Response(body=b'{}'))
+        self.assertIsNone(cache.get('a', (0, 0)))
+        self.assertIsNotNone(cache.get('b', (0, 0)))
+        time.sleep(0.06)
+        self.assertIsNone(cache.get('c', (0, 0)))
+        self.assertEqual((cache.evictions, cache.expirations), (1, 1))
+
+
+class TestResponseCacheApp(AppTest):
+
+    def test_repeated_reads_hit_until_the_user_writes(self):
+        cache = self.app.registry['momono.response_cache']
+        self.testapp.get('/api/simple/transactions')
+        self.testapp.get('/api/simple/transactions')
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        self.testapp.post_json('/api/simple/transactions', {'amount': 5, 'date': '2025-05-01'})
+        listed = self.testapp.get('/api/simple/transactions').json
+        self.assertEqual(len(listed['transactions']), 1)
+        self.assertEqual(cache.invalidations, 1)
+
+    def test_budget_listing_follows_other_users_expenses(self):
+        from .security.security import create_jwt_token
+        headers = {'Authorization': f'Bearer {create_jwt_token(5)}'}
+        self.testapp.post_json('/api/simple/transactions', {'amount': 5, 'date': '2025-05-01'})
+        budgets = self.testapp.get('/api/simple/budgets', headers=headers).json['budgets']
+        self.assertEqual(budgets[0]['spent'], 5.0)
+
+        self.testapp.post_json('/api/simple/transactions', {'amount': 40, 'date': '2025-05-02'})
+        budgets = self.testapp.get('/api/simple/budgets', headers=headers).json['budgets']
+        self.assertEqual((budgets[0]['spent'], budgets[0]['remaining']), (45.0, budgets[0]['amount'] - 45.0))
+
+
+class TestConditionalGet(AppTest):
+
+    def test_unchanged_poll_gets_304_until_a_write(self):
+        first = self.testapp.get('/api/simple/transactions')
+        etag = first.headers['ETag']
+        self.assertTrue(etag.startswith('W/"u1-'))
+        self.assertIn('Authorization', first.headers['Vary'])
+
+        again = self.testapp.get('/api/simple/transactions', headers={'If-None-Match': etag}, status=304)
+        self.assertEqual(again.body, b'')
+
+        self.testapp.post_json('/api/simple/transactions', {'amount': 5, 'date': '2025-05-01'})
+        changed = self.testapp.get('/api/simple/transactions', headers={'If-None-Match': etag}, status=200)
+        self.assertNotEqual(changed.headers['ETag'], etag)
+        self.assertEqual(len(changed.json['transactions']), 1)
+
+    def test_shared_writes_change_every_users_tag(self):
+        etag = self.testapp.get('/api/simple/budgets').headers['ETag']
+        self.testapp.post_json('/api/simple/budgets', {'amount': 100, 'name': 'Food'})
+        self.assertNotEqual(self.testapp.get('/api/simple/budgets').headers['ETag'], etag)
+
+    def test_other_users_expenses_change_the_budgets_tag(self):
+        from .security.security import create_jwt_token
+        headers = {'Authorization': f'Bearer {create_jwt_token(5)}'}
+        self.testapp.post_json('/api/simple/transactions', {'amount': 5, 'date': '2025-05-01'})
+        etag = self.testapp.get('/api/simple/budgets', headers=headers).headers['ETag']
+        self.assertTrue(etag.startswith('W/"u5-'))
+
+        # The default user's expense moves the spent total user 5 is shown
+        self.testapp.post_json('/api/simple/transactions', {'amount': 40, 'date': '2025-05-02'})
+        self.testapp.get('/api/simple/budgets', headers=dict(headers, **{'If-None-Match': etag}), status=200)
+
+    def test_notifications_inserted_outside_the_app_change_the_tag(self):
+        import sqlite3
+        first = self.testapp.get('/api/notifications')
+        self.assertEqual(first.json['notifications'], [])
+        etag = first.headers['ETag']
+        self.testapp.get('/api/notifications', headers={'If-None-Match': etag}, status=304)
+
+        with sqlite3.connect(f'{self.tmpdir.name}/repo.sqlite') as conn:
+            conn.execute(
+                "INSERT INTO notifications (user_id, message, date) VALUES (1, 'Budget almost spent', '2025-05-03')"
+            )
+        changed = self.testapp.get('/api/notifications', headers={'If-None-Match': etag}, status=200)
+        self.assertEqual([n['message'] for n in changed.json['notifications']], ['Budget almost spent'])
+        self.assertNotEqual(changed.headers['ETag'], etag)
+
+    def get_raw(self, path, **headers):
+        # webtest transparently decodes gzip, so call the app directly
+        from webob import Request
+        return Request.blank(path, headers=headers).get_response(self.app)
+
+    def test_large_json_is_gzipped_when_accepted(self):
+        import gzip
+        rows = [{'amount': i, 'date': '2025-05-01', 'description': 'Groceries'} for i in range(1, 60)]
+        self.testapp.post_json('/api/transactions/bulk', rows)
+
+        plain = self.get_raw('/api/simple/transactions')
+        self.assertIsNone(plain.content_encoding)
+        self.assertIn('Accept-Encoding', plain.headers['Vary'])
+
+        packed = self.get_raw('/api/simple/transactions', **{'Accept-Encoding': 'gzip'})
+        self.assertEqual(packed.content_encoding, 'gzip')
+        self.assertLess(len(packed.body), len(plain.body))
+        self.assertEqual(gzip.decompress(packed.body), plain.body)
+
+    def test_small_bodies_are_sent_as_is(self):
+        small = self.get_raw('/api/simple/budgets', **{'Accept-Encoding': 'gzip'})
+        self.assertIsNone(small.content_encoding)
+
+    def test_precompressed_static_siblings(self):
+        import gzip
+        import os
+        import shutil
+        import tempfile
+        from .compression import brotli
+        from .scripts.precompress_static import precompress
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(os.path.dirname(__file__), 'static', 'theme.css')
+            target = shutil.copy(source, directory)
+            expected = 2 if brotli is not None else 1
+            self.assertEqual(precompress(directory), expected)
+            self.assertEqual(precompress(directory), 0)
+            with open(target + '.gz', 'rb') as packed, open(source, 'rb') as original:
+                self.assertEqual(gzip.decompress(packed.read()), original.read())
+
+        served = self.testapp.get('/static/theme.css', headers={'Accept-Encoding': 'gzip'})
+        self.assertIn('max-age=3600', served.headers['Cache-Control'])
+
+
+class TestStatelessAuth(AppTest):
+
+    settings = {'security.bcrypt_rounds': '4'}
+
+    def setUp(self):
+        super().setUp()
+        import sqlite3
+        from .security.security import hash_password
+        conn = sqlite3.connect(f'{self.tmpdir.name}/orm.sqlite')
+        conn.execute(
+            "INSERT INTO users (id, email, name, password_hash) VALUES (5, 'a@example.com', 'A', ?)",
+            (hash_password('secret123'),)
+        )
+        conn.commit()
+        conn.close()
+
+    def login(self):
+        body = self.testapp.post_json('/api/auth/login', {'email': 'a@example.com', 'password': 'secret123'}).json
+        return {'Authorization': f"Bearer {body['token']}"}
+
+    def test_roles_come_from_the_token(self):
+        import jwt
+        from sqlalchemy import event
+        headers = self.login()
+        claims = jwt.decode(headers['Authorization'][7:], options={'verify_signature': False})
+        self.assertEqual((claims['sub'], claims['roles'], claims['ver']), ('5', ['user'], 0))
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        engine = self.app.registry['dbengine']
+        event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            self.testapp.get('/api/stats/by-category', headers=headers, status=200)
+        finally:
+            event.remove(engine, 'before_cursor_execute', listener)
+        self.assertFalse([s for s in statements if 'FROM users' in s])
+
+    def test_logout_revokes_issued_tokens(self):
+        headers = self.login()
+        self.testapp.post('/api/auth/logout', headers=headers, status=200)
+        self.testapp.post('/api/auth/logout', headers=headers, status=401)
+        # A fresh login carries the new version
+        self.testapp.post('/api/auth/logout', headers=self.login(), status=200)
+
+    def test_version_check_on_writes_after_the_cache_expired(self):
+        from unittest import mock
+        from .repository import SQLiteRepository
+        headers = self.login()
+        versions = self.app.registry['momono.token_versions']
+        # As with jwt.version_check_seconds = 0: every request reloads the version
+        versions.ttl = 0
+        versions.remember(5, 0)
+        loads = versions.loads
+        with mock.patch.object(SQLiteRepository, '__init__', autospec=True,
+                               side_effect=SQLiteRepository.__init__) as built:
+            created = self.testapp.post_json(
+                '/api/simple/transactions', {'amount': 5, 'date': '2025-05-01'}, headers=headers
+            ).json
+        self.assertEqual(created['transaction']['id'], 1)
+        # One repository for the request, one for the token version lookup
+        self.assertEqual(versions.loads - loads, 1)
+        self.assertEqual(built.call_count, 2)
+        listed = self.testapp.get('/api/simple/transactions', headers=headers).json
+        self.assertEqual(len(listed['transactions']), 1)
+
+
+class TestPasswordRehash(AppTest):
+
+    settings = {'security.bcrypt_rounds': '5'}
+
+    def test_login_rehashes_with_the_configured_cost(self):
+        import bcrypt
+        import sqlite3
+        path = f'{self.tmpdir.name}/orm.sqlite'
+        old_hash = bcrypt.hashpw(b'secret123', bcrypt.gensalt(4)).decode('utf-8')
+        with sqlite3.connect(path) as conn:
+            conn.execute(
+                "INSERT INTO users (id, email, name, password_hash) VALUES (5, 'a@example.com', 'A', ?)",
+                (old_hash,)
+            )
+        self.testapp.post_json('/api/auth/login', {'email': 'a@example.com', 'password': 'secret123'}, status=200)
+        conn = sqlite3.connect(path)
+        new_hash = conn.execute("SELECT password_hash FROM users WHERE id = 5").fetchone()[0]
+        conn.close()
+        self.assertTrue(new_hash.startswith('$2b$05$'))
+        self.testapp.post_json('/api/auth/login', {'email': 'a@example.com', 'password': 'secret123'}, status=200)
+
+
+class TestLoginRateLimit(AppTest):
+
+    settings = {
+        'security.bcrypt_rounds': '4',
+        'ratelimit.ip_burst': '3',
+        'ratelimit.ip_per_minute': '1',
+        'ratelimit.email_burst': '2',
+        'ratelimit.email_per_minute': '1',
+    }
+
+    def setUp(self):
+        super().setUp()
+        import sqlite3
+        from .security.security import hash_password
+        with sqlite3.connect(f'{self.tmpdir.name}/orm.sqlite') as conn:
+            conn.execute(
+                "INSERT INTO users (id, email, name, password_hash) VALUES (5, 'a@example.com', 'A', ?)",
+                (hash_password('secret123'),)
+            )
+
+    def attempt(self, email, ip, status):
+        return self.testapp.post_json(
+            '/api/auth/login', {'email': email, 'password': 'wrong'},
+            extra_environ={'REMOTE_ADDR': ip}, status=status
+        )
+
+    def test_limits_per_email_and_per_address(self):
+        from .security.passwords import password_stats
+        self.attempt('a@example.com', '10.0.0.1', 400)
+        self.attempt('A@example.com', '10.0.0.2', 400)
+        verified = password_stats()['verify']['count']
+        # Same email from a third address: the email bucket is empty
+        rejected = self.attempt('a@example.com', '10.0.0.3', 429)
+        self.assertGreaterEqual(int(rejected.headers['Retry-After']), 1)
+        self.assertEqual(password_stats()['verify']['count'], verified)
+
+        # One address trying many emails runs out of its own bucket
+        self.attempt('b@example.com', '10.0.0.4', 400)
+        self.attempt('c@example.com', '10.0.0.4', 400)
+        self.attempt('d@example.com', '10.0.0.4', 400)
+        self.attempt('e@example.com', '10.0.0.4', 429)
+
+    def test_spoofed_forwarded_entries_share_the_proxy_bucket(self):
+        self.app.registry['momono.rate_limiter'].trusted_proxies = 1
+        for attempt, status in enumerate((400, 400, 400, 429)):
+            # The client picks the leading entries; the proxy appends the real address
+            self.testapp.post_json(
+                '/api/auth/login', {'email': f'user{attempt}@example.com', 'password': 'wrong'},
+                headers={'X-Forwarded-For': f'198.51.100.{attempt}, 203.0.113.7'},
+                extra_environ={'REMOTE_ADDR': '10.0.0.1'}, status=status
+            )
+        # Another client behind the same proxy has its own bucket
+        self.testapp.post_json(
+            '/api/auth/login', {'email': 'other@example.com', 'password': 'wrong'},
+            headers={'X-Forwarded-For': '203.0.113.8'}, extra_environ={'REMOTE_ADDR': '10.0.0.1'}, status=400
+        )
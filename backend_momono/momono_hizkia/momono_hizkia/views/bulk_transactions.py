@@ -0,0 +1,131 @@
+import logging
+from datetime import datetime
+
+from pyramid.view import view_config
+from pyramid.httpexceptions import HTTPBadRequest, HTTPRequestEntityTooLarge
+
+from ..bulk import (
+    bulk_settings,
+    clean_bulk_row,
+    clean_transaction_changes,
+    parse_transaction_selection,
+    read_bulk_rows,
+)
+
+log = logging.getLogger(__name__)
+
+
+@view_config(
+    route_name="transactions_bulk",
+    request_method="POST",
+    renderer="json",
+    permission='__no_permission_required__'
+)
+def import_transactions(request):
+    """Import many transactions from a JSON array or a CSV upload.
+
+    Every row is validated before anything is written; rows with errors are
+    skipped and reported by their 1-based position. The rest are inserted
+    with ``executemany`` and committed every ``momono.bulk_chunk_size``
+    rows.
+    """
+    user_id = _request_user_id(request, "bulk import")
+
+    chunk_size, max_rows = bulk_settings(request.registry.settings)
+    try:
+        raw_rows = read_bulk_rows(request)
+    except ValueError as e:
+        raise HTTPBadRequest(json_body={"error": str(e)})
+    if len(raw_rows) > max_rows:
+        raise HTTPRequestEntityTooLarge(json_body={"error": f"At most {max_rows} rows per request"})
+
+    repo = request.repo
+
+    # Budgets are resolved once for the whole upload
+    budget_ids = {row["id"] for row in repo.list_budgets(user_id)}
+    default_budget_id = None
+    if any(isinstance(raw, dict) and raw.get("budget_id") in (None, "") for raw in raw_rows):
+        default_budget_id = repo.get_or_create_default_budget(user_id)
+
+    today = datetime.now().strftime("%Y-%m-%d")
+    rows = []
+    errors = []
+    for index, raw in enumerate(raw_rows, start=1):
+        try:
+            rows.append(clean_bulk_row(raw, budget_ids, default_budget_id, today))
+        except ValueError as e:
+            errors.append({"row": index, "error": str(e)})
+
+    imported = 0
+    for start in range(0, len(rows), chunk_size):
+        imported += repo.bulk_create_transactions(user_id, rows[start:start + chunk_size])
+        repo.commit()
+    log.info(f"Bulk import for user {user_id}: {imported} imported, {len(errors)} rejected")
+
+    return {
+        "success": not errors,
+        "imported": imported,
+        "failed": len(errors),
+        "errors": errors,
+    }
+
+
+def _request_user_id(request, action):
+    user_id = request.authenticated_userid
+    if not user_id:
+        log.info(f"No authenticated user, using default access for {action}")
+        user_id = 1  # Use default user ID
+        log.info(f"Using default user_id: {user_id}")
+    return user_id
+
+
+@view_config(
+    route_name="transactions_bulk",
+    request_method="PATCH",
+    renderer="json",
+    permission='__no_permission_required__'
+)
+def bulk_update_transactions(request):
+    """Apply ``set`` to the transactions chosen by ``ids`` and/or ``filter``.
+
+    Runs as one UPDATE in one transaction, e.g.
+    ``{"filter": {"category": "Food"}, "set": {"category": "Groceries"}}``.
+    """
+    user_id = _request_user_id(request, "bulk update")
+    try:
+        data = request.json_body
+        ids, filters = parse_transaction_selection(data)
+        changes = clean_transaction_changes(data)
+    except ValueError as e:
+        raise HTTPBadRequest(json_body={"error": str(e)})
+
+    repo = request.repo
+    if changes.get("budget_id") is not None:
+        if changes["budget_id"] not in {row["id"] for row in repo.list_budgets(user_id)}:
+            raise HTTPBadRequest(json_body={"error": f"budget {changes['budget_id']} not found"})
+
+    updated = repo.bulk_update_transactions(user_id, changes, ids=ids, filters=filters)
+    repo.commit()
+    log.info(f"Bulk update for user {user_id}: {updated} transactions")
+    return {"success": True, "updated": updated}
+
+
+@view_config(
+    route_name="transactions_bulk",
+    request_method="DELETE",
+    renderer="json",
+    permission='__no_permission_required__'
+)
+def bulk_delete_transactions(request):
+    """Delete the transactions chosen by ``ids`` and/or ``filter`` with one DELETE."""
+    user_id = _request_user_id(request, "bulk delete")
+    try:
+        ids, filters = parse_transaction_selection(request.json_body)
+    except ValueError as e:
+        raise HTTPBadRequest(json_body={"error": str(e)})
+
+    repo = request.repo
+    deleted = repo.bulk_delete_transactions(user_id, ids=ids, filters=filters)
+    repo.commit()
+    log.info(f"Bulk delete for user {user_id}: {deleted} transactions")
+    return {"success": True, "deleted": deleted}
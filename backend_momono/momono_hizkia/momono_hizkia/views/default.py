@@ -1,22 +1,33 @@
 import logging
 from pyramid.view import view_config
-from pyramid.httpexceptions import HTTPNotFound, HTTPBadRequest, HTTPInternalServerError, HTTPForbidden
+from pyramid.httpexceptions import HTTPNotFound, HTTPBadRequest, HTTPInternalServerError, HTTPForbidden, HTTPUnauthorized, HTTPServiceUnavailable
 from sqlalchemy.exc import DBAPIError
-from sqlalchemy import func, text
+from sqlalchemy import text
 from datetime import datetime
 from pyramid.security import NO_PERMISSION_REQUIRED
 
-from momono_hizkia.security.security import hash_password, verify_password, create_jwt_token
-from ..models.models import Transaction, Category, User, Budget, TransactionType
+from ..cache import cached_view
+from ..conditional import etag_view, etag_view_with
+from ..ratelimit import rate_limited
+from ..filters import month_span, parse_month_range
+from ..stats import STATS_GRANULARITIES, bucket_totals, month_bounds
+from ..records import BudgetRecord, CategoryRecord, NotificationRecord, row_serializer, serializer
+from momono_hizkia.security.security import hash_password, verify_password, password_needs_rehash, issue_token
+from ..models.models import User, Budget
 from ..resources import PERMISSIONS
 
 log = logging.getLogger(__name__)
 
+# Constants
+BUDGET_SUMMARY_FIELDS = ('id', 'user_id', 'amount', 'spent', 'remaining', 'utilization')
+CREATED_BUDGET_FIELDS = ('id', 'user_id', 'amount', 'name', 'description', 'spent', 'remaining', 'utilization')
+
 @view_config(
     route_name="auth_register",
     request_method="POST",
     renderer="json",
-    permission='__no_permission_required__'
+    permission='__no_permission_required__',
+    decorator=rate_limited
 )
 def register(request):
     try:
@@ -54,7 +65,7 @@ def register(request):
         request.dbsession.flush()
         
         # Generate token
-        token = create_jwt_token(new_user.id)
+        token = issue_token(request, new_user.id)
         return {
             'token': token,
             'user': {
@@ -66,6 +77,8 @@ def register(request):
         }
     except ValueError as e:
         raise HTTPBadRequest(json_body={'error': str(e)})
+    except HTTPServiceUnavailable:
+        raise
     except Exception as e:
         log.error(f"Registration error: {str(e)}")
         raise HTTPInternalServerError(json_body={'error': 'Internal server error'})
@@ -174,9 +187,9 @@ def get_budgets(request):
                     'id': budget.id,
                     'category_id': budget.category_id,
                     'amount': budget.amount,
-                    'start_date': budget.start_date.isoformat(),
-                    'end_date': budget.end_date.isoformat(),
-                    'created_at': budget.created_at.isoformat()
+                    'start_date': budget.start_date,
+                    'end_date': budget.end_date,
+                    'created_at': budget.created_at
                 }
                 for budget in budgets
             ]
@@ -216,49 +229,13 @@ def create_budget(request):
         budget_name = data.get("name", f"Budget {datetime.now().strftime('%B %Y')}")
         description = data.get("description", "")
         
-        # Use direct SQLite connection to avoid ORM issues
-        from .simple_budget import get_db_connection
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Check if simple_budgets table exists
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='simple_budgets'")
-        if not cursor.fetchone():
-            # Create a simple budgets table if it doesn't exist
-            cursor.execute('''
-                CREATE TABLE simple_budgets (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    amount REAL NOT NULL,
-                    name TEXT NOT NULL,
-                    description TEXT
-                )
-            ''')
-            conn.commit()
-        
         # Insert the budget into the simple_budgets table
-        cursor.execute(
-            "INSERT INTO simple_budgets (user_id, amount, name, description) VALUES (?, ?, ?, ?)",
-            (user_id, float(amount), budget_name, description)
-        )
-        conn.commit()
-        
-        # Get the last inserted ID
-        last_id = cursor.lastrowid
+        repo = request.repo
+        last_id = repo.create_budget(user_id, float(amount), budget_name, description)
+        repo.commit()
         
-        # Close the connection
-        conn.close()
-        
-        return {
-            'budget': {
-                'id': last_id,
-                'user_id': user_id,
-                'amount': float(amount),
-                'name': budget_name,
-                'description': description
-            }
-        }
+        budget = BudgetRecord.new(last_id, user_id, float(amount), budget_name, description)
+        return {'budget': serializer(BudgetRecord, CREATED_BUDGET_FIELDS)(budget)}
     except ValueError as e:
         raise HTTPBadRequest(json_body={'error': str(e)})
     except Exception as e:
@@ -269,7 +246,8 @@ def create_budget(request):
     route_name="auth_login",
     request_method="POST",
     renderer="json",
-    permission='__no_permission_required__'
+    permission='__no_permission_required__',
+    decorator=rate_limited
 )
 def login(request):
     log.info("Login view called")
@@ -304,8 +282,17 @@ def login(request):
             raise HTTPBadRequest(json_body={'error': 'Invalid email or password'})
             
         log.debug(f"Password verified for user: {user.id}")
+        # Re-hash with the configured bcrypt cost when it changed since the password was set
+        if password_needs_rehash(user.password_hash):
+            try:
+                user.password_hash = hash_password(password)
+                log.info(f"Re-hashed password of user {user.id} with the configured cost")
+            except HTTPServiceUnavailable:
+                # Retried on a later login; not worth failing this one
+                log.warning(f"Skipped re-hashing password of user {user.id}: password queue busy")
+        
         # Create token
-        token = create_jwt_token(user.id)
+        token = issue_token(request, user.id)
         log.debug(f"Token created for user: {user.id}")
         return {
             'token': token,
@@ -321,12 +308,14 @@ def login(request):
     except HTTPBadRequest as e:
         log.error(f"Bad request in login: {str(e)}")
         raise
+    except HTTPServiceUnavailable:
+        raise
     except Exception as e:
         log.error(f"Unexpected error in login: {str(e)}", exc_info=True)
         raise HTTPInternalServerError(json_body={'error': 'Internal server error'})
         user = request.dbsession.query(User).filter_by(email=email).first()
         if user and verify_password(password, user.password_hash):
-            token = create_jwt_token(user.id)
+            token = issue_token(request, user.id)
             return {
                 "token": token,
                 "user": {"id": user.id, "email": user.email, "name": user.name},
@@ -336,7 +325,30 @@ def login(request):
     except DBAPIError:
         raise HTTPInternalServerError(json_body={"error": "Database error"})
 
-@view_config(route_name="transactions", request_method="GET", renderer="json", permission='__no_permission_required__')
+@view_config(
+    route_name="auth_logout",
+    request_method="POST",
+    renderer="json",
+    permission='__no_permission_required__'
+)
+def logout(request):
+    """Revoke every token issued to the user so far (logout everywhere)."""
+    user_id = request.authenticated_userid
+    if not user_id:
+        raise HTTPUnauthorized(json_body={"error": "Not logged in"})
+    
+    repo = request.repo
+    version = repo.revoke_tokens(user_id)
+    repo.commit()
+    
+    # Other processes notice within jwt.version_check_seconds
+    token_versions = request.registry.get('momono.token_versions')
+    if token_versions is not None:
+        token_versions.remember(user_id, version)
+    log.info(f"Revoked tokens of user {user_id} (version {version})")
+    return {"message": "Logged out"}
+
+@view_config(route_name="transactions", request_method="GET", renderer="json", permission='__no_permission_required__', decorator=cached_view)
 def get_transactions(request):
     try:
         log.info(f"Authenticated user id: {request.authenticated_userid}")
@@ -344,6 +356,8 @@ def get_transactions(request):
         # Redirect to simple_transaction implementation
         from .simple_transaction import get_simple_transactions
         return get_simple_transactions(request)
+    except HTTPBadRequest:
+        raise
     except Exception as e:
         log.error(f"Error in get_transactions: {str(e)}")
         raise HTTPInternalServerError(json_body={"error": "Internal server error"})
@@ -364,7 +378,8 @@ def create_transaction(request):
     route_name="budgets",
     request_method="GET",
     renderer="json",
-    permission='__no_permission_required__'
+    permission='__no_permission_required__',
+    decorator=cached_view
 )
 def get_budgets(request):
     try:
@@ -378,22 +393,10 @@ def get_budgets(request):
             user_id = 1  # Assuming user with ID 1 exists
             log.info(f"Using default user_id: {user_id}")
             
-        user = request.dbsession.query(User).filter_by(id=user_id).first()
-        if not user:
-            raise HTTPNotFound(json_body={"error": "User not found"})
-            
-        # Use raw SQL to get budgets to avoid ORM mapping issues
-        query = text("SELECT id, user_id, amount FROM budgets WHERE user_id = :user_id")
-        result = request.dbsession.execute(query, {"user_id": user.id}).fetchall()
-        
-        # Convert to list of dictionaries
+        # This listing exposes only the figures, not the budget's name or category
+        serialize = serializer(BudgetRecord, BUDGET_SUMMARY_FIELDS)
         budgets_list = [
-            {
-                "id": row[0],
-                "user_id": row[1],
-                "amount": row[2]
-            }
-            for row in result
+            serialize(BudgetRecord.from_row(row)) for row in request.repo.list_budgets(user_id)
         ]
         return {"budgets": budgets_list}
         
@@ -460,25 +463,20 @@ def delete_transaction(request):
 def delete_budget(request):
     try:
         budget_id = int(request.matchdict["id"])
-        budget = request.dbsession.query(Budget).filter_by(id=budget_id).first()
-        if not budget:
+        repo = request.repo
+        if not repo.delete_budget(budget_id):
             raise HTTPNotFound(json_body={"error": "Budget not found"})
 
-        request.dbsession.delete(budget)
+        repo.commit()
         return {"message": "Budget deleted"}
     except Exception:
         raise HTTPBadRequest(json_body={"error": "Invalid request"})
 
 
-@view_config(route_name="categories", request_method="GET", renderer="json", permission='__no_permission_required__')
+@view_config(route_name="categories", request_method="GET", renderer="json", permission='__no_permission_required__', decorator=cached_view)
 def get_categories(request):
-    categories = request.dbsession.query(Category).all()
-    result = []
-    for c in categories:
-        result.append(
-            {"id": c.id, "name": c.name, "type": c.type.value if c.type else None}
-        )
-    return {"categories": result}
+    serialize = row_serializer(CategoryRecord)
+    return {"categories": [serialize(c) for c in request.repo.list_categories()]}
 
 
 @view_config(route_name="categories", request_method="POST", renderer="json", permission='__no_permission_required__')
@@ -490,28 +488,42 @@ def create_category(request):
     if data["type"] not in ["income", "expense"]:
         raise HTTPBadRequest(json_body={"error": "Invalid category type"})
 
-    existing = request.dbsession.query(Category).filter_by(name=data["name"]).first()
+    repo = request.repo
+    existing = repo.get_category_by_name(data["name"])
     if existing:
         raise HTTPBadRequest(json_body={"error": "Category already exists"})
 
-    category = Category(name=data["name"], type=TransactionType[data["type"]])
-    request.dbsession.add(category)
-    request.dbsession.flush()
+    user_id = request.authenticated_userid or 1  # Default user ID for demonstration
+    category_id = repo.create_category(user_id, data["name"], data["type"])
+    repo.commit()
 
     return {
         "message": "Category created",
         "category": {
-            "id": category.id,
-            "name": category.name,
-            "type": category.type.value,
+            "id": category_id,
+            "name": data["name"],
+            "type": data["type"],
         },
     }
 
 
-@view_config(route_name="stats_monthly", request_method="GET", renderer="json", permission='public_access')
+@view_config(route_name="stats_monthly", request_method="GET", renderer="json", permission='public_access', decorator=(etag_view, cached_view))
 def stats_monthly(request):
-    month = int(request.params.get("month"))
-    year = int(request.params.get("year"))
+    """Income and expense totals for ``?month=&year=``.
+
+    ``granularity=day|week`` adds zero-filled ``buckets`` for the chart; the
+    totals are then summed from the same rows so both always agree.
+    """
+    try:
+        month = int(request.params.get("month"))
+        year = int(request.params.get("year"))
+        start, end = month_bounds(year, month)
+    except (TypeError, ValueError):
+        raise HTTPBadRequest(json_body={"error": "month and year must be valid numbers"})
+
+    granularity = request.params.get("granularity")
+    if granularity and granularity not in STATS_GRANULARITIES:
+        raise HTTPBadRequest(json_body={"error": "granularity must be day or week"})
 
     user_id = request.authenticated_userid
     
@@ -522,43 +534,22 @@ def stats_monthly(request):
         user_id = 1  # Assuming user with ID 1 exists
         log.info(f"Using default user_id: {user_id}")
     
-    user = request.dbsession.query(User).filter_by(id=user_id).first()
-    if not user:
-        raise HTTPNotFound(json_body={"error": "User not found"})
-
-    income_sum = (
-        request.dbsession.query(func.sum(Transaction.amount))
-        .filter(
-            Transaction.user_id == user_id,
-            Transaction.type == TransactionType.income,
-            func.extract("month", Transaction.date) == month,
-            func.extract("year", Transaction.date) == year,
-        )
-        .scalar()
-        or 0
-    )
-
-    expense_sum = (
-        request.dbsession.query(func.sum(Transaction.amount))
-        .filter(
-            Transaction.user_id == user.id,
-            Transaction.type == TransactionType.expense,
-            func.extract("month", Transaction.date) == month,
-            func.extract("year", Transaction.date) == year,
-        )
-        .scalar()
-        or 0
-    )
-
-    return {
-        "month": month,
-        "year": year,
-        "total_income": income_sum,
-        "total_expense": expense_sum,
-    }
-
-
-@view_config(route_name="stats_by_category", request_method="GET", renderer="json", permission='public_access')
+    result = {"month": month, "year": year}
+    if granularity:
+        # One GROUP BY over [month_start, next_month_start) on the date index
+        rows = request.repo.daily_totals(user_id, start.isoformat(), end.isoformat())
+        result["granularity"] = granularity
+        result["buckets"], totals = bucket_totals(rows, start, end, granularity)
+    else:
+        # Read from the monthly rollup instead of scanning the transactions
+        totals = request.repo.monthly_totals(user_id, year, month)
+
+    result["total_income"] = totals.get("income", 0)
+    result["total_expense"] = totals.get("expense", 0)
+    return result
+
+
+@view_config(route_name="stats_by_category", request_method="GET", renderer="json", permission='public_access', decorator=(etag_view, cached_view))
 def stats_by_category(request):
     user_id = request.authenticated_userid
     
@@ -569,23 +560,64 @@ def stats_by_category(request):
         user_id = 1  # Assuming user with ID 1 exists
         log.info(f"Using default user_id: {user_id}")
     
-    user = request.dbsession.query(User).filter_by(id=user_id).first()
-    if not user:
-        raise HTTPNotFound(json_body={"error": "User not found"})
+    # Optional ?from=YYYY-MM&to=YYYY-MM limits the stats to those months
+    try:
+        start, end = parse_month_range(request.params)
+    except ValueError as e:
+        raise HTTPBadRequest(json_body={"error": str(e)})
+    
+    result = [
+        {"category": row["category"], "total": row["total"]}
+        for row in request.repo.totals_by_category(user_id, start, end)
+    ]
 
-    query = (
-        request.dbsession.query(Category.name, func.sum(Transaction.amount).label("total"))
-        .join(Transaction)
-        .filter(Transaction.user_id == user.id)
-        .group_by(Category.name)
-    )
+    return {"stats": result}
 
-    result = [{"category": row.name, "total": row.total} for row in query]
 
-    return {"stats": result}
+@view_config(route_name="stats_range", request_method="GET", renderer="json", permission='public_access', decorator=(etag_view, cached_view))
+def stats_range(request):
+    """Income and expense totals for every month in ``?from=YYYY-MM&to=YYYY-MM``."""
+    user_id = request.authenticated_userid
+    
+    # For demonstration purposes, we'll use a default user_id if not authenticated
+    if not user_id:
+        log.info("No authenticated user, using default access for range stats")
+        user_id = 1  # Assuming user with ID 1 exists
+        log.info(f"Using default user_id: {user_id}")
+    
+    try:
+        start, end = parse_month_range(request.params, required=True)
+    except ValueError as e:
+        raise HTTPBadRequest(json_body={"error": str(e)})
+    
+    totals = {}
+    for row in request.repo.monthly_series(user_id, start, end):
+        totals[(row["year"], row["month"], row["type"])] = row["total"]
+    
+    # Months without transactions are reported with zero totals
+    months = [
+        {
+            "year": year,
+            "month": month,
+            "total_income": totals.get((year, month, "income"), 0),
+            "total_expense": totals.get((year, month, "expense"), 0),
+        }
+        for year, month in month_span(start, end)
+    ]
 
+    return {
+        "from": f"{start[0]:04d}-{start[1]:02d}",
+        "to": f"{end[0]:04d}-{end[1]:02d}",
+        "months": months,
+    }
+
+
+def notifications_version(request):
+    # Notifications are inserted outside the app; see BaseRepository.notifications_version
+    return request.repo.notifications_version(request.authenticated_userid or 1)
 
-@view_config(route_name="notifications", request_method="GET", renderer="json", permission='public_access')
+
+@view_config(route_name="notifications", request_method="GET", renderer="json", permission='public_access', decorator=etag_view_with(notifications_version))
 def get_notifications(request):
     user_id = request.authenticated_userid
     
@@ -596,20 +628,7 @@ def get_notifications(request):
         user_id = 1  # Assuming user with ID 1 exists
         log.info(f"Using default user_id: {user_id}")
     
-    user = request.dbsession.query(User).filter_by(id=user_id).first()
-    if not user:
-        raise HTTPNotFound(json_body={"error": "User not found"})
-
-    notifications = (
-        request.dbsession.query(Notification)
-        .filter_by(user_id=user.id)
-        .order_by(Notification.date.desc())
-        .all()
-    )
-
-    result = []
-    for n in notifications:
-        result.append({"id": n.id, "message": n.message, "date": n.date.strftime("%Y-%m-%d")})
+    result = [NotificationRecord.from_row(n) for n in request.repo.list_notifications(user_id)]
 
     return {"notifications": result}
 
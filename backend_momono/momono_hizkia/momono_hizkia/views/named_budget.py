@@ -1,13 +1,16 @@
 import logging
-import sqlite3
 from datetime import datetime
 from pyramid.view import view_config
 from pyramid.httpexceptions import HTTPBadRequest, HTTPInternalServerError
 from sqlalchemy.exc import DBAPIError
-from sqlalchemy.sql import text
+
+from ..records import BudgetRecord, serializer
 
 log = logging.getLogger(__name__)
 
+# Constants
+NAMED_BUDGET_FIELDS = ('id', 'user_id', 'amount', 'name', 'spent', 'remaining', 'utilization')
+
 @view_config(
     route_name="named_budget",
     request_method="POST",
@@ -34,33 +37,16 @@ def create_named_budget(request):
         # Get or generate a name for the budget
         budget_name = data.get("name", f"Budget {datetime.now().strftime('%B %Y')}")
         
-        # Use raw SQL to insert budget with name field
-        query = text("""
-            INSERT INTO budgets (user_id, amount, name) 
-            VALUES (:user_id, :amount, :name)
-        """)
-        
-        # Execute the query
-        request.dbsession.execute(query, {
-            "user_id": user_id,
-            "amount": float(amount),
-            "name": budget_name
-        })
-        request.dbsession.flush()
-        
-        # Get the last inserted ID
-        last_id_query = text("SELECT last_insert_rowid()")
-        budget_id = request.dbsession.execute(last_id_query).scalar()
+        # Insert budget with name field
+        repo = request.repo
+        budget_id = repo.create_budget(user_id, float(amount), budget_name)
+        repo.commit()
         
+        budget = BudgetRecord.new(budget_id, user_id, float(amount), budget_name)
         return {
             "success": True,
             "message": "Budget created successfully",
-            "budget": {
-                "id": budget_id,
-                "user_id": user_id,
-                "amount": float(amount),
-                "name": budget_name
-            }
+            "budget": serializer(BudgetRecord, NAMED_BUDGET_FIELDS)(budget)
         }
         
     except DBAPIError as e:
@@ -3,108 +3,44 @@ from pyramid.view import view_config
 from pyramid.httpexceptions import HTTPNotFound, HTTPBadRequest, HTTPInternalServerError
 from pyramid.response import Response
 import json
-import sqlite3
-import os
 
-log = logging.getLogger(__name__)
-
-# Get the database path
-def get_db_path():
-    # Get the correct path to the database file
-    # The database should be in the root of the project, not in the momono_hizkia subfolder
-    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    db_path = os.path.join(base_dir, 'momono_hizkia.sqlite')
-    log.info(f"Using database at: {db_path}")
-    return db_path
+from ..cache import cached_view
+from ..conditional import etag_view
+from ..records import BudgetRecord
+from ..streaming import stream_mode, streaming_response
 
-# Simple function to connect to the database
-def get_db_connection():
-    conn = sqlite3.connect(get_db_path())
-    conn.row_factory = sqlite3.Row
-    return conn
-
-# Ensure the simple_budgets table exists
-def ensure_simple_budgets_table():
-    try:
-        db_path = get_db_path()
-        log.info(f"Ensuring simple_budgets table exists in database at: {db_path}")
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Check if simple_budgets table exists
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='simple_budgets'")
-        table_exists = cursor.fetchone()
-        
-        if not table_exists:
-            log.info("simple_budgets table does not exist, creating it now...")
-            # Create a simple budgets table if it doesn't exist
-            cursor.execute('''
-                CREATE TABLE simple_budgets (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    amount REAL NOT NULL,
-                    name TEXT NOT NULL,
-                    description TEXT,
-                    category TEXT
-                )
-            ''')
-            conn.commit()
-            log.info("Created simple_budgets table successfully")
-        else:
-            log.info("simple_budgets table already exists")
-            # Check if the category column exists
-            cursor.execute("PRAGMA table_info(simple_budgets)")
-            columns = [column[1] for column in cursor.fetchall()]
-            log.info(f"Existing columns in simple_budgets: {columns}")
-            
-            if 'category' not in columns:
-                log.info("Adding category column to simple_budgets table")
-                # Add category column if it doesn't exist
-                cursor.execute("ALTER TABLE simple_budgets ADD COLUMN category TEXT")
-                conn.commit()
-                log.info("Added category column to simple_budgets table successfully")
-        
-        # Verify table structure after changes
-        cursor.execute("PRAGMA table_info(simple_budgets)")
-        columns = cursor.fetchall()
-        log.info(f"Final table structure: {columns}")
-        
-        conn.close()
-    except Exception as e:
-        log.error(f"Error ensuring simple_budgets table: {str(e)}")
-        raise
+log = logging.getLogger(__name__)
 
 @view_config(
     route_name="simple_budgets",
     request_method="GET",
     renderer="json",
-    permission='__no_permission_required__'
+    permission='__no_permission_required__',
+    decorator=(etag_view, cached_view)
 )
 def get_simple_budgets(request):
     try:
-        # Make sure the table exists
-        ensure_simple_budgets_table()
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
         # Get user_id from request or use default
         user_id = 1  # Default user_id
         log.info(f"Fetching budgets for user_id: {user_id}")
+        
+        # Stream large listings instead of building them in memory
+        mode = stream_mode(request)
+        if mode:
+            return streaming_response(
+                request, mode, "budgets", lambda repo: repo.stream_budgets(user_id), BudgetRecord.from_row
+            )
             
         # Get all budgets for the user
-        cursor.execute("SELECT id, user_id, amount, name, description, category FROM simple_budgets WHERE user_id = ?", (user_id,))
-        rows = cursor.fetchall()
+        rows = request.repo.list_budgets(user_id)
         log.info(f"Found {len(rows)} budgets in database")
         
         budgets = []
         for row in rows:
-            budget_dict = dict(row)
-            log.info(f"Budget: {budget_dict}")
-            budgets.append(budget_dict)
+            budget = BudgetRecord.from_row(row)
+            log.info(f"Budget: {budget}")
+            budgets.append(budget)
         
-        conn.close()
         return {"budgets": budgets}
     except Exception as e:
         log.error(f"Error retrieving budgets: {str(e)}")
@@ -119,9 +55,6 @@ def get_simple_budgets(request):
 )
 def create_simple_budget(request):
     try:
-        # Make sure the table exists
-        ensure_simple_budgets_table()
-        
         data = request.json_body
         amount = data.get('amount')
         description = data.get('description', '')
@@ -141,25 +74,16 @@ def create_simple_budget(request):
                 content_type='application/json'
             )
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        repo = request.repo
         
         # Insert new budget
-        cursor.execute(
-            "INSERT INTO simple_budgets (user_id, amount, name, description, category) VALUES (?, ?, ?, ?, ?)",
-            (1, amount, name, description, category)
-        )
-        conn.commit()
-        
-        # Get the last inserted ID
-        budget_id = cursor.lastrowid
+        budget_id = repo.create_budget(1, amount, name, description, category)
+        repo.commit()
         log.info(f"Created new budget with ID: {budget_id}, category: {category}")
         
         # Get the inserted budget
-        cursor.execute("SELECT id, user_id, amount, name, description, category FROM simple_budgets WHERE id = ?", (budget_id,))
-        budget = dict(cursor.fetchone())
+        budget = BudgetRecord.from_row(repo.get_budget(budget_id))
         
-        conn.close()
         return {"budget": budget}
     except Exception as e:
         log.error(f"Error creating budget: {str(e)}")
@@ -177,9 +101,6 @@ def create_simple_budget(request):
 )
 def update_simple_budget(request):
     try:
-        # Make sure the table exists
-        ensure_simple_budgets_table()
-        
         budget_id = request.matchdict['id']
         data = request.json_body
         amount = data.get('amount')
@@ -193,32 +114,21 @@ def update_simple_budget(request):
                 content_type='application/json'
             )
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        repo = request.repo
         
-        # Check if budget exists
-        cursor.execute("SELECT id FROM simple_budgets WHERE id = ?", (budget_id,))
-        if not cursor.fetchone():
-            conn.close()
+        # Update budget if it exists
+        name = data.get('name', 'Updated Budget')
+        if not repo.update_budget(budget_id, amount, name, description, category):
             return Response(
                 json.dumps({"error": "Budget not found"}),
                 status=404,
                 content_type='application/json'
             )
-        
-        # Update budget
-        name = data.get('name', 'Updated Budget')
-        cursor.execute(
-            "UPDATE simple_budgets SET amount = ?, description = ?, name = ?, category = ? WHERE id = ?",
-            (amount, description, name, category, budget_id)
-        )
-        conn.commit()
+        repo.commit()
         
         # Get the updated budget
-        cursor.execute("SELECT id, user_id, amount, name, description, category FROM simple_budgets WHERE id = ?", (budget_id,))
-        budget = dict(cursor.fetchone())
+        budget = BudgetRecord.from_row(repo.get_budget(budget_id))
         
-        conn.close()
         return {"budget": budget}
     except Exception as e:
         log.error(f"Error updating budget: {str(e)}")
@@ -236,29 +146,19 @@ def update_simple_budget(request):
 )
 def delete_simple_budget(request):
     try:
-        # Make sure the table exists
-        ensure_simple_budgets_table()
-        
         budget_id = request.matchdict['id']
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        repo = request.repo
         
-        # Check if budget exists
-        cursor.execute("SELECT id FROM simple_budgets WHERE id = ?", (budget_id,))
-        if not cursor.fetchone():
-            conn.close()
+        # Delete budget if it exists
+        if not repo.delete_budget(budget_id):
             return Response(
                 json.dumps({"error": "Budget not found"}),
                 status=404,
                 content_type='application/json'
             )
+        repo.commit()
         
-        # Delete budget
-        cursor.execute("DELETE FROM simple_budgets WHERE id = ?", (budget_id,))
-        conn.commit()
-        
-        conn.close()
         return {"message": "Budget deleted successfully"}
     except Exception as e:
         log.error(f"Error deleting budget: {str(e)}")
@@ -272,33 +172,24 @@ def delete_simple_budget(request):
     route_name="simple_budget",
     request_method="GET",
     renderer="json",
-    permission='__no_permission_required__'
+    permission='__no_permission_required__',
+    decorator=cached_view
 )
 def get_simple_budget_by_id(request):
     try:
-        # Make sure the table exists
-        ensure_simple_budgets_table()
-        
         budget_id = request.matchdict['id']
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
         # Get the budget
-        cursor.execute("SELECT id, user_id, amount, name, description, category FROM simple_budgets WHERE id = ?", (budget_id,))
-        budget = cursor.fetchone()
+        budget = request.repo.get_budget(budget_id)
         
         if not budget:
-            conn.close()
             return Response(
                 json.dumps({"error": "Budget not found"}),
                 status=404,
                 content_type='application/json'
             )
         
-        budget_dict = dict(budget)
-        conn.close()
-        return {"budget": budget_dict}
+        return {"budget": BudgetRecord.from_row(budget)}
     except Exception as e:
         log.error(f"Error getting budget: {str(e)}")
         return Response(
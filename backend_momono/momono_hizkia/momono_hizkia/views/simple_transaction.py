@@ -3,77 +3,30 @@ from pyramid.view import view_config
 from pyramid.httpexceptions import HTTPNotFound, HTTPBadRequest, HTTPInternalServerError
 from pyramid.response import Response
 import json
-import sqlite3
-import os
 from datetime import datetime
 
-log = logging.getLogger(__name__)
-
-# Get the database path
-def get_db_path():
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    return os.path.join(base_dir, 'momono.sqlite')
+from ..cache import cached_view
+from ..conditional import etag_view
+from ..filters import TRANSACTION_SORTS, parse_transaction_filters
+from ..pagination import encode_cursor, parse_page_params
+from ..records import TransactionRecord, row_serializer
+from ..streaming import stream_mode, streaming_response
 
-# Simple function to connect to the database
-def get_db_connection():
-    conn = sqlite3.connect(get_db_path())
-    conn.row_factory = sqlite3.Row
-    return conn
+log = logging.getLogger(__name__)
 
-def ensure_tables_exist():
-    """Ensure that the simple_transactions and simple_budgets tables exist."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Check if simple_transactions table exists
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='simple_transactions'")
-    if not cursor.fetchone():
-        # Create a simple transactions table if it doesn't exist
-        cursor.execute('''
-            CREATE TABLE simple_transactions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                amount REAL NOT NULL,
-                description TEXT,
-                created_at TEXT NOT NULL,
-                category TEXT,
-                type TEXT DEFAULT 'expense',
-                budget_id INTEGER
-            )
-        ''')
-        conn.commit()
-        log.info("Created simple_transactions table")
-    
-    # Check if simple_budgets table exists
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='simple_budgets'")
-    if not cursor.fetchone():
-        # Create a simple budgets table if it doesn't exist
-        cursor.execute('''
-            CREATE TABLE simple_budgets (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                amount REAL NOT NULL,
-                name TEXT NOT NULL,
-                description TEXT
-            )
-        ''')
-        conn.commit()
-        log.info("Created simple_budgets table")
-    
-    conn.close()
+# Rows go straight to API dicts; listings never need the record objects
+serialize_transaction = row_serializer(TransactionRecord)
 
 @view_config(
     route_name="simple_transactions",
     request_method="GET",
     renderer="json",
-    permission='__no_permission_required__'
+    permission='__no_permission_required__',
+    decorator=(etag_view, cached_view)
 )
 def get_simple_transactions(request):
-    """Get all transactions for a user using the simple_transactions table."""
+    """Get transactions for a user, optionally one keyset page at a time."""
     try:
-        # Ensure tables exist
-        ensure_tables_exist()
-        
         # Get user ID (use default if not authenticated)
         user_id = request.authenticated_userid
         if not user_id:
@@ -81,32 +34,44 @@ def get_simple_transactions(request):
             user_id = 1  # Use default user ID
             log.info(f"Using default user_id: {user_id}")
         
-        # Get all transactions for the user
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, amount, description, created_at, category, type, budget_id 
-            FROM simple_transactions 
-            WHERE user_id = ? 
-            ORDER BY created_at DESC
-        """, (user_id,))
+        # Filters (?from=&to=&category=&type=&min_amount=&max_amount=&sort=)
+        # and keyset pagination (?limit=N&after=<next_cursor>)
+        try:
+            filters = parse_transaction_filters(request.params)
+            limit, after = parse_page_params(request.params)
+        except ValueError as e:
+            raise HTTPBadRequest(json_body={"error": str(e)})
+        
+        # Large histories can be streamed instead of built in memory
+        mode = stream_mode(request)
+        if mode:
+            return streaming_response(
+                request,
+                mode,
+                "transactions",
+                lambda repo: repo.stream_transactions(user_id, limit=limit, after=after, filters=filters),
+                serialize_transaction
+            )
         
-        transactions = []
-        for row in cursor.fetchall():
-            transactions.append({
-                "id": row["id"],
-                "amount": row["amount"],
-                "description": row["description"],
-                "date": row["created_at"],  # Use date field for frontend compatibility
-                "created_at": row["created_at"],
-                "category": row["category"] or "Uncategorized",
-                "type": row["type"] or "expense",
-                "budget_id": row["budget_id"]
-            })
+        # Fetch one extra row to know whether there is a next page
+        rows = request.repo.list_transactions(
+            user_id,
+            limit=limit + 1 if limit else None,
+            after=after,
+            filters=filters
+        )
+        next_cursor = None
+        if limit and len(rows) > limit:
+            rows = rows[:limit]
+            sort_column = TRANSACTION_SORTS[filters["sort"]][0]
+            next_cursor = encode_cursor(rows[-1][sort_column], rows[-1]["id"])
+        
+        transactions = [serialize_transaction(row) for row in rows]
         
-        conn.close()
-        return {"transactions": transactions}
+        return {"transactions": transactions, "next_cursor": next_cursor}
         
+    except HTTPBadRequest:
+        raise
     except Exception as e:
         log.error(f"Error getting transactions: {str(e)}")
         return {"error": str(e)}, 500
@@ -120,9 +85,6 @@ def get_simple_transactions(request):
 def create_simple_transaction(request):
     """Create a transaction using the simple_transactions table."""
     try:
-        # Ensure tables exist
-        ensure_tables_exist()
-        
         # Get user ID (use default if not authenticated)
         user_id = request.authenticated_userid
         if not user_id:
@@ -154,57 +116,27 @@ def create_simple_transaction(request):
             created_at = datetime.now().strftime("%Y-%m-%d")
         
         # Get or create a budget
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Check if a budget exists for this user
-        cursor.execute("SELECT id FROM simple_budgets WHERE user_id = ? LIMIT 1", (user_id,))
-        budget_result = cursor.fetchone()
-        
-        if budget_result:
-            budget_id = budget_result["id"]
-        else:
-            # Create a default budget
-            budget_name = f"Default Budget {datetime.now().strftime('%B %Y')}"
-            cursor.execute(
-                "INSERT INTO simple_budgets (user_id, amount, name, description) VALUES (?, ?, ?, ?)",
-                (user_id, 0, budget_name, "Default budget created automatically")
-            )
-            conn.commit()
-            budget_id = cursor.lastrowid
+        repo = request.repo
+        budget_id = repo.get_or_create_default_budget(user_id)
         
         # Insert the transaction
-        cursor.execute("""
-            INSERT INTO simple_transactions 
-            (user_id, amount, description, created_at, category, type, budget_id) 
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (
-            user_id, 
-            amount, 
-            description, 
-            created_at, 
-            category, 
-            transaction_type, 
+        transaction_id = repo.create_transaction(
+            user_id,
+            amount,
+            description,
+            created_at,
+            category,
+            transaction_type,
             budget_id
-        ))
-        
-        conn.commit()
-        transaction_id = cursor.lastrowid
-        conn.close()
+        )
+        repo.commit()
         
         return {
             "success": True,
             "message": "Transaction created successfully",
-            "transaction": {
-                "id": transaction_id,
-                "amount": amount,
-                "description": description,
-                "date": created_at,
-                "created_at": created_at,
-                "category": category,
-                "type": transaction_type,
-                "budget_id": budget_id
-            }
+            "transaction": TransactionRecord.new(
+                transaction_id, amount, description, created_at, category, transaction_type, budget_id
+            )
         }
         
     except Exception as e:
@@ -220,9 +152,6 @@ def create_simple_transaction(request):
 def update_simple_transaction(request):
     """Update a transaction using the simple_transactions table."""
     try:
-        # Ensure tables exist
-        ensure_tables_exist()
-        
         # Get transaction ID from URL
         transaction_id = request.matchdict.get('id')
         if not transaction_id:
@@ -238,85 +167,51 @@ def update_simple_transaction(request):
         # Get request data
         data = request.json_body
         
-        # Connect to database
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        repo = request.repo
         
         # Check if transaction exists and belongs to user
-        cursor.execute(
-            "SELECT * FROM simple_transactions WHERE id = ? AND user_id = ?", 
-            (transaction_id, user_id)
-        )
-        transaction = cursor.fetchone()
+        transaction = repo.get_transaction(transaction_id, user_id)
         
         if not transaction:
-            conn.close()
             return {"error": "Transaction not found or access denied"}, 404
         
         # Prepare update fields
-        update_fields = []
-        params = []
+        update_fields = {}
         
         if 'amount' in data:
-            update_fields.append("amount = ?")
-            params.append(float(data['amount']))
+            update_fields["amount"] = float(data['amount'])
             
         if 'description' in data:
-            update_fields.append("description = ?")
-            params.append(data['description'])
+            update_fields["description"] = data['description']
             
         if 'category' in data:
-            update_fields.append("category = ?")
-            params.append(data['category'])
+            update_fields["category"] = data['category']
             
         if 'type' in data:
-            update_fields.append("type = ?")
-            params.append(data['type'])
+            update_fields["type"] = data['type']
             
         if 'date' in data:
             try:
                 date_obj = datetime.strptime(data['date'], "%Y-%m-%d")
-                created_at = date_obj.strftime("%Y-%m-%d")
-                update_fields.append("created_at = ?")
-                params.append(created_at)
+                update_fields["created_at"] = date_obj.strftime("%Y-%m-%d")
             except ValueError:
                 log.warning(f"Invalid date format: {data['date']}")
         
         if not update_fields:
-            conn.close()
             return {"error": "No fields to update"}, 400
         
-        # Add transaction ID and user ID to params
-        params.append(transaction_id)
-        params.append(user_id)
-        
         # Update transaction
-        query = f"UPDATE simple_transactions SET {', '.join(update_fields)} WHERE id = ? AND user_id = ?"
-        cursor.execute(query, params)
-        conn.commit()
+        repo.update_transaction(transaction_id, user_id, update_fields)
+        repo.commit()
         
         # Get updated transaction
-        cursor.execute(
-            "SELECT * FROM simple_transactions WHERE id = ?", 
-            (transaction_id,)
-        )
-        updated = cursor.fetchone()
+        updated = repo.get_transaction(transaction_id, user_id)
         
         if updated:
-            result = {
-                "id": updated["id"],
-                "amount": updated["amount"],
-                "description": updated["description"],
-                "date": updated["created_at"],
-                "created_at": updated["created_at"],
-                "category": updated["category"] or "Uncategorized",
-                "type": updated["type"] or "expense",
-                "budget_id": updated["budget_id"]
-            }
+            result = serialize_transaction(updated)
         else:
             result = {"error": "Failed to retrieve updated transaction"}
         
-        conn.close()
         return {"success": True, "transaction": result}
         
     except Exception as e:
@@ -344,29 +239,12 @@ def delete_simple_transaction(request):
             user_id = 1  # Use default user ID
             log.info(f"Using default user_id: {user_id}")
         
-        # Connect to database
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Check if transaction exists and belongs to user
-        cursor.execute(
-            "SELECT id FROM simple_transactions WHERE id = ? AND user_id = ?", 
-            (transaction_id, user_id)
-        )
-        transaction = cursor.fetchone()
-        
-        if not transaction:
-            conn.close()
+        # Delete transaction if it exists and belongs to user
+        repo = request.repo
+        if not repo.delete_transaction(transaction_id, user_id):
             return {"error": "Transaction not found or access denied"}, 404
+        repo.commit()
         
-        # Delete transaction
-        cursor.execute(
-            "DELETE FROM simple_transactions WHERE id = ? AND user_id = ?", 
-            (transaction_id, user_id)
-        )
-        conn.commit()
-        
-        conn.close()
         return {"success": True, "message": "Transaction deleted successfully"}
         
     except Exception as e:
@@ -4,9 +4,13 @@ from pyramid.httpexceptions import HTTPNotFound, HTTPBadRequest, HTTPInternalSer
 from datetime import datetime
 
 from ..models.models import Transaction, Category, User, TransactionType
+from ..records import TransactionRecord, row_serializer
 
 log = logging.getLogger(__name__)
 
+# Constants
+TRANSACTION_DETAIL_FIELDS = ('id', 'type', 'amount', 'category', 'date', 'description')
+
 @view_config(route_name="transaction", request_method="GET", renderer="json", permission='public_access')
 def get_transaction_by_id(request):
     try:
@@ -21,18 +25,11 @@ def get_transaction_by_id(request):
             user_id = 1  # Assuming user with ID 1 exists
             log.info(f"Using default user_id: {user_id}")
         
-        transaction = request.dbsession.query(Transaction).filter_by(id=transaction_id).first()
+        transaction = request.repo.get_transaction(transaction_id, user_id)
         if not transaction:
             raise HTTPNotFound(json_body={"error": "Transaction not found"})
 
-        return {
-            "id": transaction.id,
-            "type": transaction.type.value if transaction.type else None,
-            "amount": transaction.amount,
-            "category": transaction.category.name if transaction.category else None,
-            "date": transaction.date.strftime("%Y-%m-%d"),
-            "description": transaction.description,
-        }
+        return row_serializer(TransactionRecord, TRANSACTION_DETAIL_FIELDS)(transaction)
     except Exception as e:
         log.error(f"Error getting transaction: {str(e)}")
         raise HTTPBadRequest(json_body={"error": "Invalid request"})
@@ -88,7 +85,7 @@ def update_transaction(request):
             "message": "Transaction updated",
             "transaction": {
                 "id": transaction.id,
-                "type": transaction.type.value,
+                "type": transaction.type,
                 "amount": transaction.amount,
                 "category": transaction.category.name if transaction.category else None,
                 "date": transaction.date.strftime("%Y-%m-%d"),
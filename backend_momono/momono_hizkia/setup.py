@@ -22,6 +22,12 @@ requires = [
     'waitress',
 ]
 
+# Optional C-accelerated encoders picked up at runtime when installed
+speedups_require = [
+    'brotli',
+    'orjson',
+]
+
 tests_require = [
     'WebTest >= 1.3.1',  # py3 compat
     'pytest>=3.7.4',
@@ -48,6 +54,7 @@ setup(
     zip_safe=False,
     extras_require={
         'testing': tests_require,
+        'speedups': speedups_require,
     },
     install_requires=requires,
     entry_points={
@@ -56,6 +63,10 @@ setup(
         ],
         'console_scripts': [
             'initialize_momono_hizkia_db = momono_hizkia.scripts.initialize_db:main',
+            'precompress_momono_static = momono_hizkia.scripts.precompress_static:main',
+            'benchmark_momono_json = momono_hizkia.scripts.benchmark_json:main',
+            'benchmark_momono_records = momono_hizkia.scripts.benchmark_records:main',
+            'import_momono_legacy_sqlite = momono_hizkia.scripts.import_legacy_sqlite:main',
         ],
     },
 )